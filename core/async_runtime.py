@@ -0,0 +1,152 @@
+import asyncio
+import threading
+import httpx
+from core.config import settings
+
+# ======================================================
+# 🔥 WORKER-LIFETIME ASYNC RUNTIME 🔥
+# ======================================================
+# Pehle har task asyncio.run() chalata tha: naya loop, naye connections,
+# har video par dobara TLS handshake. Ab har worker process mein AIK loop
+# background thread par chalta hai aur saare tasks usi par coroutines submit karte hain.
+# HTTP clients bhi isi loop ke saath zinda rehte hain (keep-alive + HTTP/2).
+
+class HttpPoolMetrics:
+    """Counts requests vs new connections, via httpcore trace events."""
+
+    def __init__(self):
+        self.requests = 0
+        self.tcp_connects = 0
+        self.tls_handshakes = 0
+
+    async def on_request(self, request: httpx.Request):
+        self.requests += 1
+        request.extensions["trace"] = self._trace
+
+    async def _trace(self, event_name: str, info: dict):
+        if event_name == "connection.connect_tcp.complete":
+            self.tcp_connects += 1
+        elif event_name == "connection.start_tls.complete":
+            self.tls_handshakes += 1
+
+    def snapshot(self) -> dict:
+        reused = max(0, self.requests - self.tcp_connects)
+        return {
+            "requests": self.requests,
+            "new_connections": self.tcp_connects,
+            "tls_handshakes": self.tls_handshakes,
+            "reused_connections": reused,
+            "reuse_rate": round(reused / self.requests, 3) if self.requests else 0.0,
+        }
+
+http_metrics = HttpPoolMetrics()
+
+def create_http_client() -> httpx.AsyncClient:
+    """Tuned keep-alive pool shared by all requests on a loop."""
+    return httpx.AsyncClient(
+        http2=settings.LLM_HTTP2,
+        limits=httpx.Limits(
+            max_connections=settings.LLM_POOL_MAX_CONNECTIONS,
+            max_keepalive_connections=settings.LLM_POOL_MAX_KEEPALIVE,
+            keepalive_expiry=settings.LLM_POOL_KEEPALIVE_EXPIRY,
+        ),
+        timeout=httpx.Timeout(600.0, connect=10.0),
+        event_hooks={"request": [http_metrics.on_request]},
+    )
+
+class AsyncRuntime:
+    def __init__(self):
+        self.loop = None
+        self._thread = None
+        self._closers = []  # async callbacks run on shutdown (e.g. close HTTP clients)
+        # Thread pool workers (-P threads) never get worker_process_init, so the first
+        # concurrent tasks all start the runtime lazily -> only one of them may create the loop
+        self._lock = threading.Lock()
+
+    @property
+    def running(self) -> bool:
+        return self.loop is not None and self.loop.is_running()
+
+    def start(self):
+        with self._lock:
+            if self.running:
+                return
+            loop = asyncio.new_event_loop()
+            ready = threading.Event()
+
+            def _run():
+                asyncio.set_event_loop(loop)
+                loop.call_soon(ready.set)
+                loop.run_forever()
+
+            self._thread = threading.Thread(target=_run, name="async-runtime", daemon=True)
+            self._thread.start()
+            ready.wait()
+            self.loop = loop  # published only once it is running
+        print("🔁 Async runtime started (persistent event loop).")
+
+    def run(self, coro, timeout: float = None):
+        """Blocking: runs 'coro' on the runtime loop and returns its result."""
+        if not self.running:
+            self.start()
+        return asyncio.run_coroutine_threadsafe(coro, self.loop).result(timeout)
+
+    def add_closer(self, closer):
+        self._closers.append(closer)
+
+    def stop(self, timeout: float = 10.0):
+        with self._lock:
+            self._stop(timeout)
+
+    def _stop(self, timeout: float):
+        if not self.running:
+            return
+
+        async def _shutdown():
+            for closer in self._closers:
+                try:
+                    await closer()
+                except Exception as e:
+                    print(f"⚠️ Async runtime closer failed: {e}")
+            self._closers.clear()
+            pending = [t for t in asyncio.all_tasks() if t is not asyncio.current_task()]
+            for task in pending:
+                task.cancel()
+            await asyncio.gather(*pending, return_exceptions=True)
+
+        try:
+            asyncio.run_coroutine_threadsafe(_shutdown(), self.loop).result(timeout)
+        except Exception as e:
+            print(f"⚠️ Async runtime shutdown incomplete: {e}")
+
+        self.loop.call_soon_threadsafe(self.loop.stop)
+        self._thread.join(timeout)
+        self.loop.close()
+        self.loop = None
+        print(f"🛑 Async runtime stopped. HTTP pool: {http_metrics.snapshot()}")
+
+runtime = AsyncRuntime()
+
+async def gather_or_cancel(*aws):
+    """
+    asyncio.gather, but if one awaitable fails the others are cancelled instead of
+    running on (and sending API requests) in the persistent loop after the caller gave up.
+    """
+    tasks = [asyncio.ensure_future(aw) for aw in aws]
+    try:
+        return await asyncio.gather(*tasks)
+    except BaseException:
+        await cancel_tasks(tasks)
+        raise
+
+async def cancel_tasks(tasks):
+    for task in tasks:
+        task.cancel()
+    await asyncio.gather(*tasks, return_exceptions=True)
+
+def run_async(coro):
+    """
+    Entry point for sync code (Celery tasks).
+    Uses the worker's persistent loop; starts it on first use outside Celery.
+    """
+    return runtime.run(coro)
@@ -15,9 +15,13 @@ celery_app = Celery(
     "video_docs_worker",
     broker=broker_url,   # Use the fixed variable
     backend=broker_url,  # Use the fixed variable
-    include=["workers.tasks"]
+    include=["workers.tasks", "workers.stages", "workers.lifecycle"]
 )
 
+# Task names - API sirf naam se enqueue karta hai (workers.tasks import nahi karta,
+# warna Whisper/OpenAI sab API process mein load ho jaate)
+PROCESS_VIDEO_TASK = "workers.tasks.process_video_task"
+
 celery_app.conf.update(
     task_serializer="json",
     accept_content=["json"],
@@ -26,6 +30,15 @@ celery_app.conf.update(
     enable_utc=True,
     broker_connection_retry_on_startup=True,
     
+    # Staged pipeline: CPU stages -> prefork pool, network stages -> threads pool
+    # (everything else stays on the default "celery" queue)
+    task_routes={
+        "workers.stages.extract_stage_task": {"queue": settings.CELERY_CPU_QUEUE},
+        "workers.stages.transcribe_stage_task": {"queue": settings.CELERY_CPU_QUEUE},
+        "workers.stages.generate_stage_task": {"queue": settings.CELERY_IO_QUEUE},
+        "workers.stages.persist_stage_task": {"queue": settings.CELERY_IO_QUEUE},
+    },
+
     # SSL Settings
     broker_use_ssl={'ssl_cert_reqs': ssl.CERT_NONE},
     redis_backend_use_ssl={'ssl_cert_reqs': ssl.CERT_NONE}
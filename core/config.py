@@ -24,4 +24,124 @@ class Settings:
     NVIDIA_API_KEY:str = os.getenv("NVIDIA_API_KEY")
     NVIDIA_MODEL_NAME:str = os.getenv("NVIDIA_MODEL_NAME")
 
+    # --- FRAME PIPELINE ---
+    # "stream" = ffmpeg pipes raw frames into NumPy (no temp JPEGs)
+    # "disk"   = legacy mode, ffmpeg writes every frame as JPEG first
+    # "keyframes" = fast: only I-frames are decoded. Good recall only with short GOPs (~2s, OBS default)
+    # "scene"     = fast: B-frames skipped, only scene changes passed on. Safe for any GOP
+    #   (both timed by frame PTS; compare on your videos: python -m services.extraction_benchmark)
+    FRAME_EXTRACTION_MODE: str = os.getenv("FRAME_EXTRACTION_MODE", "stream")
+    # ffmpeg scene score (0-1) a frame must exceed in "scene" mode
+    FRAME_SCENE_THRESHOLD: float = float(os.getenv("FRAME_SCENE_THRESHOLD", "0.002"))
+    # Static filter metric: "mse" | "mad" | "ssim" (threshold empty = metric default)
+    FRAME_DIFF_METRIC: str = os.getenv("FRAME_DIFF_METRIC", "mse")
+    FRAME_DIFF_THRESHOLD: float = float(os.getenv("FRAME_DIFF_THRESHOLD")) if os.getenv("FRAME_DIFF_THRESHOLD") else None
+
+    # Audio for Whisper: "pcm" = 16 kHz mono float32 straight from ffmpeg | "mp3" = legacy
+    AUDIO_FORMAT: str = os.getenv("AUDIO_FORMAT", "pcm")
+
+    # Start LLM calls while Whisper is still transcribing (True/False)
+    PIPELINED_GENERATION: bool = os.getenv("PIPELINED_GENERATION", "true").lower() == "true"
+
+    # Frames packed into one vision request (1 = one screenshot per request; >1 = opt-in batching)
+    LLM_FRAMES_PER_REQUEST: int = int(os.getenv("LLM_FRAMES_PER_REQUEST", "1"))
+
+    # --- WHISPER (local transcription) ---
+    # 'tiny' = fastest, 'base' = production default, 'small' = more accurate
+    WHISPER_MODEL_SIZE: str = os.getenv("WHISPER_MODEL_SIZE", "base")
+    WHISPER_DEVICE: str = os.getenv("WHISPER_DEVICE", "cpu")
+    WHISPER_COMPUTE_TYPE: str = os.getenv("WHISPER_COMPUTE_TYPE", "int8")
+    WHISPER_CPU_THREADS: int = int(os.getenv("WHISPER_CPU_THREADS", "0"))  # 0 = CTranslate2 default
+    WHISPER_NUM_WORKERS: int = int(os.getenv("WHISPER_NUM_WORKERS", "1"))  # parallel transcriptions per model
+    # "local" = model per worker child | "server" = one shared model process per worker node
+    WHISPER_MODE: str = os.getenv("WHISPER_MODE", "local")
+    WHISPER_PRELOAD: bool = os.getenv("WHISPER_PRELOAD", "true").lower() == "true"
+    WHISPER_SOCKET_DIR: str = os.getenv("WHISPER_SOCKET_DIR", "/tmp")
+    # "sequential" = one decoder pass over the whole file
+    # "batched"    = VAD cuts out silence, speech chunks are decoded in batches
+    WHISPER_TRANSCRIBE_MODE: str = os.getenv("WHISPER_TRANSCRIBE_MODE", "sequential")
+    WHISPER_BEAM_SIZE: int = int(os.getenv("WHISPER_BEAM_SIZE", "5"))
+    WHISPER_BATCH_SIZE: int = int(os.getenv("WHISPER_BATCH_SIZE", "8"))
+    WHISPER_CHUNK_LENGTH: int = int(os.getenv("WHISPER_CHUNK_LENGTH", "0"))  # seconds, 0 = model default (30)
+    WHISPER_LANGUAGE: str = os.getenv("WHISPER_LANGUAGE") or None  # e.g. "en", empty = auto-detect
+    # VAD filter: empty = off for sequential; batched mode always uses VAD (it needs the speech chunks)
+    WHISPER_VAD_FILTER: bool = os.getenv("WHISPER_VAD_FILTER").lower() == "true" if os.getenv("WHISPER_VAD_FILTER") else None
+
+    # --- DEDUPLICATION ---
+    # After generation: drop steps with cosine similarity >= threshold vs the last N kept steps
+    STEP_DEDUP_ENABLED: bool = os.getenv("STEP_DEDUP_ENABLED", "true").lower() == "true"
+    STEP_DEDUP_THRESHOLD: float = float(os.getenv("STEP_DEDUP_THRESHOLD", "0.8"))
+    STEP_DEDUP_WINDOW: int = int(os.getenv("STEP_DEDUP_WINDOW", "5"))
+    # Before generation: skip frames that RETURN to a recently sent screen (A -> B -> A, dHash within N bits)
+    # with the same narration. Off by default: dHash is coarse, a wrong skip loses a real step
+    FRAME_PREDEDUP_ENABLED: bool = os.getenv("FRAME_PREDEDUP_ENABLED", "false").lower() == "true"
+    FRAME_PREDEDUP_WINDOW: int = int(os.getenv("FRAME_PREDEDUP_WINDOW", "8"))
+    FRAME_PREDEDUP_MAX_DISTANCE: int = int(os.getenv("FRAME_PREDEDUP_MAX_DISTANCE", "3"))
+    # At ingestion: same source file (SHA-256) -> clone a completed video's steps / follow the running job
+    VIDEO_DEDUP_ENABLED: bool = os.getenv("VIDEO_DEDUP_ENABLED", "true").lower() == "true"
+    UPLOAD_DIR: str = os.getenv("UPLOAD_DIR", os.path.join(BASE_DIR, "uploads"))
+
+    # --- VISION API CONCURRENCY (adaptive, per provider) ---
+    LLM_INITIAL_CONCURRENCY: int = int(os.getenv("LLM_INITIAL_CONCURRENCY", "7"))
+    LLM_MIN_CONCURRENCY: int = int(os.getenv("LLM_MIN_CONCURRENCY", "1"))
+    LLM_MAX_CONCURRENCY: int = int(os.getenv("LLM_MAX_CONCURRENCY", "32"))
+    # Account-level quota shared by ALL workers via Redis (0 = no limit)
+    LLM_RPM_LIMIT: int = int(os.getenv("LLM_RPM_LIMIT", "0"))
+    LLM_TPM_LIMIT: int = int(os.getenv("LLM_TPM_LIMIT", "0"))
+    LLM_CLUSTER_MAX_CONCURRENCY: int = int(os.getenv("LLM_CLUSTER_MAX_CONCURRENCY", "0"))
+
+    # --- HTTP POOL (one per worker process, lives as long as the worker) ---
+    LLM_HTTP2: bool = os.getenv("LLM_HTTP2", "true").lower() == "true"
+    LLM_POOL_MAX_CONNECTIONS: int = int(os.getenv("LLM_POOL_MAX_CONNECTIONS", "64"))
+    LLM_POOL_MAX_KEEPALIVE: int = int(os.getenv("LLM_POOL_MAX_KEEPALIVE", "32"))
+    LLM_POOL_KEEPALIVE_EXPIRY: float = float(os.getenv("LLM_POOL_KEEPALIVE_EXPIRY", "120"))
+
+    # --- IMAGE PAYLOADS (shrunk in memory before base64) ---
+    IMAGE_OPTIMIZER_ENABLED: bool = os.getenv("IMAGE_OPTIMIZER_ENABLED", "true").lower() == "true"
+    IMAGE_MAX_EDGE: int = int(os.getenv("IMAGE_MAX_EDGE", "1568"))  # long edge in px
+    IMAGE_FORMAT: str = os.getenv("IMAGE_FORMAT", "jpeg")  # "jpeg" | "webp"
+    IMAGE_QUALITY: int = int(os.getenv("IMAGE_QUALITY", "85"))
+    IMAGE_GRAYSCALE: bool = os.getenv("IMAGE_GRAYSCALE", "false").lower() == "true"
+
+    # --- ROI CROP (vision requests get the changed region instead of the whole screen) ---
+    # Off by default: a crop alone hides where on the screen the change happened
+    ROI_CROP_ENABLED: bool = os.getenv("ROI_CROP_ENABLED", "false").lower() == "true"
+    ROI_TILE_SIZE: int = int(os.getenv("ROI_TILE_SIZE", "10"))  # tile edge on the 100x100 comparison frame
+    ROI_TILE_THRESHOLD: float = float(os.getenv("ROI_TILE_THRESHOLD", "2.0"))  # mean abs diff (0-255) = changed tile
+    ROI_MARGIN: float = float(os.getenv("ROI_MARGIN", "0.1"))  # context around the box, fraction of the frame
+    ROI_MAX_AREA: float = float(os.getenv("ROI_MAX_AREA", "0.5"))  # bigger crops -> full frame is sent
+    ROI_THUMBNAIL_EDGE: int = int(os.getenv("ROI_THUMBNAIL_EDGE", "256"))  # full-frame thumbnail next to the crop (0 = crop only)
+
+    # --- STAGED PIPELINE (extract/transcribe on a CPU queue, generate/persist on an I/O queue) ---
+    STAGED_PIPELINE_ENABLED: bool = os.getenv("STAGED_PIPELINE_ENABLED", "false").lower() == "true"
+    CELERY_CPU_QUEUE: str = os.getenv("CELERY_CPU_QUEUE", "cpu")
+    CELERY_IO_QUEUE: str = os.getenv("CELERY_IO_QUEUE", "io")
+
+    # --- CHUNKED MODE (long videos fan out over workers as a Celery chord) ---
+    # Needs video + temp_data on storage that every worker can read
+    CHUNKED_PROCESSING_ENABLED: bool = os.getenv("CHUNKED_PROCESSING_ENABLED", "false").lower() == "true"
+    CHUNK_MIN_VIDEO_SECONDS: float = float(os.getenv("CHUNK_MIN_VIDEO_SECONDS", "900"))  # shorter videos: one task
+    CHUNK_SECONDS: float = float(os.getenv("CHUNK_SECONDS", "300"))
+    CHUNK_OVERLAP_SECONDS: float = float(os.getenv("CHUNK_OVERLAP_SECONDS", "5"))
+
+    # --- DATABASE WRITES ---
+    # Steps per incremental flush (0 = all steps + final status in one transaction)
+    STEP_WRITE_BATCH_SIZE: int = int(os.getenv("STEP_WRITE_BATCH_SIZE", "0"))
+    # "auto" (COPY on Postgres, executemany elsewhere) | "copy" | "executemany"
+    STEP_WRITE_METHOD: str = os.getenv("STEP_WRITE_METHOD", "auto")
+
+    # --- CACHING ---
+    CACHE_DIR: str = os.getenv("CACHE_DIR", os.path.join(BASE_DIR, "cache"))
+    # LLM results per (frame hash, audio context, prompt version, model)
+    # Backend: "sqlite" | "redis" | "none"
+    LLM_CACHE_BACKEND: str = os.getenv("LLM_CACHE_BACKEND", "sqlite")
+    LLM_CACHE_TTL: int = int(os.getenv("LLM_CACHE_TTL", str(30 * 24 * 3600)))  # 30 days
+    LLM_CACHE_MAX_ENTRIES: int = int(os.getenv("LLM_CACHE_MAX_ENTRIES", "100000"))
+    # Transcripts per (audio content hash, model, decoder options, language)
+    TRANSCRIPT_CACHE_BACKEND: str = os.getenv("TRANSCRIPT_CACHE_BACKEND", "sqlite")
+    TRANSCRIPT_CACHE_TTL: int = int(os.getenv("TRANSCRIPT_CACHE_TTL", str(90 * 24 * 3600)))  # 90 days
+    TRANSCRIPT_CACHE_MAX_ENTRIES: int = int(os.getenv("TRANSCRIPT_CACHE_MAX_ENTRIES", "10000"))
+    # True = ignore cached transcripts (fresh ones still get stored)
+    TRANSCRIPT_CACHE_REFRESH: bool = os.getenv("TRANSCRIPT_CACHE_REFRESH", "false").lower() == "true"
+
 settings = Settings()
\ No newline at end of file
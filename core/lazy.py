@@ -0,0 +1,50 @@
+import time
+import threading
+
+# ======================================================
+# 🔥 LAZY PROVIDER / MODEL REGISTRY 🔥
+# ======================================================
+# Heavy cheezein (Whisper model, Gemini/OpenAI clients) import time par load nahi hoti.
+# Services sirf ek factory register karti hain (sasta), asli load pehli dafa get() par
+# ya worker ke init hook mein preload() se hota hai. API process inhein kabhi nahi chhoota.
+
+class LazyRegistry:
+    def __init__(self):
+        self._factories = {}
+        self._instances = {}
+        self._locks = {}
+
+    def register(self, name: str, factory):
+        """factory: zero-arg callable that builds the resource (imports inside it)."""
+        self._factories[name] = factory
+        self._locks.setdefault(name, threading.Lock())
+
+    def get(self, name: str):
+        if name in self._instances:
+            return self._instances[name]
+        if name not in self._factories:
+            raise KeyError(f"No provider registered as '{name}'. Options: {list(self._factories)}")
+
+        # Per-name lock: two threads asking at once -> only one load
+        with self._locks[name]:
+            if name not in self._instances:
+                start = time.perf_counter()
+                instance = self._factories[name]()
+                if instance is not None:
+                    print(f"📦 Loaded '{name}' in {time.perf_counter() - start:.2f}s")
+                # None (failed load) is cached too - same as the old import-time behaviour
+                self._instances[name] = instance
+        return self._instances[name]
+
+    def loaded(self, name: str) -> bool:
+        return name in self._instances
+
+    def preload(self, *names):
+        for name in names or list(self._factories):
+            self.get(name)
+
+    def reset(self, name: str):
+        """Drops the instance; the next get() builds it again."""
+        self._instances.pop(name, None)
+
+providers = LazyRegistry()
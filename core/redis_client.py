@@ -0,0 +1,18 @@
+import ssl
+import redis
+from core.config import settings
+
+_client = None
+
+def get_redis():
+    """
+    Shared Redis client for app-level data (caches, rate limits).
+    Same Upstash rules as the Celery broker: 'rediss://' + no cert verification.
+    """
+    global _client
+    if _client is None:
+        url = settings.REDIS_URL
+        if url and url.startswith("redis://"):
+            url = url.replace("redis://", "rediss://", 1)
+        _client = redis.Redis.from_url(url, ssl_cert_reqs=ssl.CERT_NONE)
+    return _client
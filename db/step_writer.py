@@ -0,0 +1,115 @@
+import io
+import csv
+from sqlalchemy import insert, update, delete
+from sqlalchemy.orm import Session
+from core.config import settings
+from models.step import Step
+from models.video import Video
+from db.video_dedup import settle_duplicates
+
+# ======================================================
+# 🔥 BULK STEP PERSISTENCE 🔥
+# ======================================================
+# Pehle har Step ek ORM object tha (db.add x N) aur status alag commits mein jata tha.
+# Ab saare steps Core insert se ek hi statement/COPY mein jate hain, aur final
+# video status usi transaction mein commit hota hai.
+# Streaming callers 'batch_size' de kar har N steps par flush + commit kar sakte hain.
+
+_COPY_COLUMNS = ("video_id", "step_number", "timestamp", "description", "image_url")
+# csv writes None as a quoted "" and CSV COPY loads that as an empty string, not NULL
+# (a NULL timestamp would even abort the COPY). FORCE_NULL maps "" back to NULL for these.
+_COPY_NULLABLE = tuple(column for column in _COPY_COLUMNS if Step.__table__.c[column].nullable)
+_COPY_SQL = (f"COPY {Step.__tablename__} ({', '.join(_COPY_COLUMNS)}) FROM STDIN "
+             f"WITH (FORMAT csv, FORCE_NULL ({', '.join(_COPY_NULLABLE)}))")
+
+def step_rows(video_id: int, steps: list) -> list:
+    """Generator output (dicts) -> plain rows for the 'steps' table."""
+    return [
+        {
+            "video_id": video_id,
+            "step_number": step["step_number"],
+            "timestamp": step.get("timestamp"),
+            "description": step["description"],
+            "image_url": step.get("image_path"),
+        }
+        for step in steps
+    ]
+
+class StepWriter:
+    """
+    Usage:
+        writer = StepWriter(db, video_id)
+        writer.add(steps)            # may flush + commit every 'batch_size' steps
+        writer.finish("completed")   # remaining steps + status, one transaction
+
+    replace=True deletes the video's existing steps in the first write transaction,
+    so a retried/resumed persist never duplicates steps.
+    """
+
+    def __init__(self, db: Session, video_id: int, batch_size: int = None, method: str = None,
+                 replace: bool = False):
+        self.db = db
+        self.video_id = video_id
+        self.replace = replace
+        self.batch_size = settings.STEP_WRITE_BATCH_SIZE if batch_size is None else batch_size
+        self.method = (method or settings.STEP_WRITE_METHOD).lower()
+        self._buffer = []
+        self.written = 0
+
+    def add(self, steps: list):
+        self._buffer.extend(step_rows(self.video_id, steps))
+        if self.batch_size and len(self._buffer) >= self.batch_size:
+            self.flush(commit=True)
+
+    def flush(self, commit: bool = False):
+        if self.replace:
+            self.db.execute(delete(Step).where(Step.video_id == self.video_id))
+            self.replace = False
+        if self._buffer:
+            rows, self._buffer = self._buffer, []
+            self._insert(rows)
+            self.written += len(rows)
+        if commit:
+            self.db.commit()
+
+    def finish(self, status: str = "completed"):
+        self.flush()
+        self.db.execute(update(Video).where(Video.id == self.video_id).values(status=status))
+        settle_duplicates(self.db, self.video_id, status)  # duplicate uploads waiting on this job
+        self.db.commit()
+        return self.written
+
+    # --- INSERT STRATEGIES ---
+    def _use_copy(self) -> bool:
+        if self.method == "executemany":
+            return False
+        bind = self.db.get_bind()
+        is_psycopg2 = bind.dialect.name == "postgresql" and bind.dialect.driver == "psycopg2"
+        if self.method == "copy" and not is_psycopg2:
+            print(f"⚠️ COPY needs Postgres + psycopg2 (got {bind.dialect.name}). Using executemany.")
+            self.method = "executemany"
+            return False
+        return is_psycopg2
+
+    def _insert(self, rows: list):
+        if self._use_copy():
+            self._copy(rows)
+        else:
+            # One statement, executemany / multi-row VALUES under the hood
+            self.db.execute(insert(Step.__table__), rows)
+
+    def _copy(self, rows: list):
+        buffer = copy_buffer(rows)
+        # Same DBAPI connection as the session -> COPY is part of the same transaction
+        raw = self.db.connection().connection.driver_connection
+        with raw.cursor() as cursor:
+            cursor.copy_expert(_COPY_SQL, buffer)
+
+def copy_buffer(rows: list) -> io.StringIO:
+    """Rows -> CSV for _COPY_SQL. QUOTE_NONNUMERIC: strings (and None, as "") quoted, numbers bare."""
+    buffer = io.StringIO()
+    writer = csv.writer(buffer, quoting=csv.QUOTE_NONNUMERIC)
+    for row in rows:
+        writer.writerow([row[column] for column in _COPY_COLUMNS])
+    buffer.seek(0)
+    return buffer
@@ -0,0 +1,54 @@
+from sqlalchemy import select, insert, update, literal, Integer
+from sqlalchemy.orm import Session
+from models.step import Step
+from models.video import Video
+
+# ======================================================
+# 🔥 SOURCE VIDEO DEDUP (content hash) 🔥
+# ======================================================
+# Same file dobara aye (double submit, re-upload) to pipeline dobara nahi chalti:
+# - pehle wali video "completed" hai -> uske steps DB ke andar hi clone (INSERT ... SELECT)
+# - pehle wali abhi chal rahi hai -> nayi video us job ki "follower" banti hai (duplicate_of);
+#   job khatam hone par settle_duplicates followers ko steps + status de deta hai
+
+ACTIVE_STATUSES = ("pending", "processing")
+_STEP_COLUMNS = ("video_id", "step_number", "timestamp", "description", "image_url")
+
+def find_source_video(db: Session, content_hash: str):
+    """Earlier video with the same content: newest completed one, else the job still running. None = new file."""
+    if not content_hash:
+        return None
+    same_content = db.query(Video).filter(Video.content_hash == content_hash)
+    completed = same_content.filter(Video.status == "completed").order_by(Video.id.desc()).first()
+    if completed:
+        return completed
+    # Followers only wait, the job that actually runs is the one without duplicate_of
+    return (
+        same_content.filter(Video.status.in_(ACTIVE_STATUSES), Video.duplicate_of.is_(None))
+        .order_by(Video.id.desc())
+        .first()
+    )
+
+def clone_steps(db: Session, source_id: int, target_id: int) -> int:
+    """Copies source's steps to target in one statement (rows never leave the DB). No commit."""
+    rows = select(
+        literal(target_id, Integer), Step.step_number, Step.timestamp, Step.description, Step.image_url
+    ).where(Step.video_id == source_id)
+    return db.execute(insert(Step.__table__).from_select(_STEP_COLUMNS, rows)).rowcount
+
+def settle_duplicates(db: Session, video_id: int, status: str) -> list:
+    """
+    Call when 'video_id' reaches its final status (same transaction, caller commits).
+    Waiting followers get a copy of the steps on "completed", or the same status otherwise.
+    """
+    followers = db.execute(
+        select(Video.id).where(Video.duplicate_of == video_id, Video.status.in_(ACTIVE_STATUSES))
+    ).scalars().all()
+    if not followers:
+        return []
+    if status == "completed":
+        for follower_id in followers:
+            clone_steps(db, video_id, follower_id)
+    db.execute(update(Video).where(Video.id.in_(followers)).values(status=status))
+    print(f"🔗 Video {video_id} {status}: settled {len(followers)} duplicate upload(s) {followers}")
+    return followers
@@ -1,4 +1,4 @@
-from sqlalchemy import Column, Integer, String, Text, Float, ForeignKey
+from sqlalchemy import Column, Integer, String, Text, Float, ForeignKey, Index
 from sqlalchemy.orm import relationship
 from db.session import Base
 
@@ -23,4 +23,10 @@ class Step(Base):
     image_url = Column(String, nullable=True)
 
     # Relationship
-    video = relationship("Video", back_populates="steps")
\ No newline at end of file
+    video = relationship("Video", back_populates="steps")
+
+    # Steps hamesha (video_id, step_number) order mein parhe jaate hain
+    # Note: create_all sirf nayi tables par index banata hai, purani DB par manually banayein
+    __table_args__ = (
+        Index("ix_steps_video_id_step_number", "video_id", "step_number"),
+    )
\ No newline at end of file
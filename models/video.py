@@ -22,6 +22,12 @@ class Video(Base):
     status = Column(String, default=ProcessingStatus.PENDING)
     
     created_at = Column(DateTime, default=datetime.utcnow)
+
+    # Source file ka SHA-256 (same file dobara aye to pipeline nahi chalti)
+    # Note: create_all purani table mein columns add nahi karta, purani DB par manually add karein
+    content_hash = Column(String(64), nullable=True, index=True)
+    # Duplicate upload jo chalti hui video ke result ka wait kar rahi hai
+    duplicate_of = Column(Integer, ForeignKey("videos.id"), nullable=True)
     
     # Foreign Key: Yeh video kis user ki hai?
     user_id = Column(Integer, ForeignKey("users.id"))
@@ -1,10 +1,15 @@
-from fastapi import APIRouter, Depends
+import os
+from fastapi import APIRouter, Depends, HTTPException, File, Form, UploadFile
 from sqlalchemy.orm import Session
 from db.session import get_db
 from models.video import Video
 from models.user import User
 from pydantic import BaseModel
-from workers.tasks import process_video_task # 
+from core.celery_app import celery_app, PROCESS_VIDEO_TASK
+from core.config import settings
+from services.checkpoint import STAGES
+from services.ingest import save_upload, source_content_hash
+from db.video_dedup import find_source_video, clone_steps, settle_duplicates, ACTIVE_STATUSES
 
 router = APIRouter()
 
@@ -22,35 +27,104 @@ def create_video(video_in: VideoCreate, db: Session = Depends(get_db)):
     #    create new user... (ERROR: Duplicate Email)
 
     # --- NEW LOGIC (SMART) ---
-    # 1. Pehle check karo kya 'test@example.com' wala user exist karta hai?
+    # 1. Hardcoded test user (see _get_default_user)
+    user = _get_default_user(db)
+
+    # 2. Save Video (+ dedup: same file already processed / processing?)
+    return _ingest_video(db, user, video_in.title, video_in.video_url, source_content_hash(video_in.video_url))
+
+
+@router.post("/upload")
+def upload_video(title: str = Form(None), file: UploadFile = File(...), db: Session = Depends(get_db)):
+    # Streamed to UPLOAD_DIR, SHA-256 computed in the same pass (never fully in memory)
+    video_path, content_hash = save_upload(file.file, file.filename)
+    return _ingest_video(db, _get_default_user(db), title or file.filename, video_path, content_hash, uploaded=True)
+
+
+def _get_default_user(db: Session) -> User:
+    # Pehle check karo kya 'test@example.com' wala user exist karta hai?
     # (Real app mein hum token se user nikalenge, abhi hardcode kar rahe hain)
-    
+
     HARDCODED_EMAIL = "test@example.com"
-    
+
     user = db.query(User).filter(User.email == HARDCODED_EMAIL).first()
-    
+
     if not user:
         # Agar bilkul pehli baar aye ho to user banao
         user = User(email=HARDCODED_EMAIL, full_name="Test User")
         db.add(user)
         db.commit()
         db.refresh(user)
-        
+    return user
+
+
+def _ingest_video(db: Session, user: User, title: str, video_url: str, content_hash: str, uploaded: bool = False):
+    """
+    New content -> new Video + Celery task.
+    Same content as a completed video -> its steps are cloned, nothing is queued.
+    Same content as a video still processing -> the new Video follows that job (duplicate_of).
+    """
+    source = find_source_video(db, content_hash) if settings.VIDEO_DEDUP_ENABLED else None
+    if source is not None and uploaded and video_url != source.video_url:
+        os.remove(video_url)  # same bytes are already stored
+        video_url = source.video_url
 
-    # 2. Save Video
     new_video = Video(
-        title=video_in.title,
-        video_url=video_in.video_url,
+        title=title,
+        video_url=video_url,
         user_id=user.id, # Yahan hum database wala asli ID use karenge
-        status="pending"
+        status="pending",
+        content_hash=content_hash,
+        duplicate_of=source.id if source is not None else None,
     )
     db.add(new_video)
+
+    if source is None:
+        db.commit()
+        db.refresh(new_video)
+        # 3. Trigger Celery Task (by name - the worker code is never imported here)
+        celery_app.send_task(PROCESS_VIDEO_TASK, args=[new_video.id, video_url])
+        return {"message": "Video processing started", "video_id": new_video.id}
+
+    if source.status == "completed":
+        new_video.status = "completed"
+        db.flush()  # new_video.id
+        copied = clone_steps(db, source.id, new_video.id)
+        db.commit()
+        return {"message": f"Duplicate of video {source.id}: {copied} steps copied", "video_id": new_video.id,
+                "duplicate_of": source.id}
+
+    # Still running -> no second job; the worker settles this video when the source finishes
+    new_video.status = source.status
     db.commit()
-    db.refresh(new_video)
-    
-    # 3. Trigger Celery Task
-    process_video_task.delay(new_video.id, video_in.video_url) 
-    
-    return {"message": "Video processing started", "video_id": new_video.id}
+    db.refresh(source)
+    if source.status not in ACTIVE_STATUSES:
+        # Finished between the lookup and our commit, so the worker's settle missed us
+        settle_duplicates(db, source.id, source.status)
+        db.commit()
+    return {"message": f"Same video is already processing (video {source.id}), joined that job",
+            "video_id": new_video.id, "duplicate_of": source.id}
+
+
+@router.post("/{video_id}/resume")
+def resume_video(video_id: int, from_stage: str = None, force: bool = False, db: Session = Depends(get_db)):
+    """
+    Re-queues a video. Stages finished in an earlier run are skipped (worker-side manifest)
+    and only frames that failed go to the LLM again.
+    from_stage: force this stage and all later ones to re-run (extract/transcribe/generate/persist).
+    force: also re-queue a video stuck in "processing" (e.g. its worker was killed).
+    """
+    if from_stage is not None and from_stage not in STAGES:
+        raise HTTPException(status_code=400, detail=f"Unknown stage '{from_stage}'. Options: {list(STAGES)}")
 
+    video = db.query(Video).filter(Video.id == video_id).first()
+    if not video:
+        raise HTTPException(status_code=404, detail="Video not found")
+    if video.status == "processing" and not force:
+        raise HTTPException(status_code=409, detail="Video is already processing")
+
+    video.status = "pending"
+    db.commit()
+    celery_app.send_task(PROCESS_VIDEO_TASK, args=[video.id, video.video_url], kwargs={"resume_from": from_stage})
 
+    return {"message": "Video processing resumed", "video_id": video.id, "from_stage": from_stage}
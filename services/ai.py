@@ -1,9 +1,13 @@
 import os
-from openai import OpenAI
 from core.config import settings
+from core.lazy import providers
 
-# OpenAI Client initialize karo
-client = OpenAI(api_key=settings.OPENAI_API_KEY)
+# OpenAI Client - pehli call par initialize hota hai
+def _create_openai_client():
+    from openai import OpenAI
+    return OpenAI(api_key=settings.OPENAI_API_KEY)
+
+providers.register("openai", _create_openai_client)
 
 def transcribe_audio(audio_path: str):
     """
@@ -11,6 +15,7 @@ def transcribe_audio(audio_path: str):
     """
     print("🧠 AI Hearing: Transcribing audio...")
     
+    client = providers.get("openai")
     with open(audio_path, "rb") as audio_file:
         # Whisper Model Call
         transcript = client.audio.transcriptions.create(
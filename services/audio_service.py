@@ -1,63 +1,176 @@
 import os
 import time
-from faster_whisper import WhisperModel
+import hashlib
+import numpy as np
+from core.config import settings
+from services.whisper_manager import whisper_manager
+from services.cache import get_cache, make_cache_key, hash_file
+from services.processing import PCM_EXTENSION, PCM_SAMPLE_RATE
 
 # --- CONFIGURATION ---
-# Base Model is best for production (Speed vs Accuracy)
-# If need too fast then 'tiny', if need too accurate then 'small'
-# Agar bohot fast chahiye to 'tiny', agar bohot accurate chahiye to 'small' use karo.
-MODEL_SIZE = "base"
+# Model size / compute type / threads ab core/config.py (WHISPER_*) mein hain.
+# Model kahan load hota hai (har child ya ek shared server) -> services/whisper_manager.py
 
+def get_whisper_model():
+    """This process's own model (local mode). Loaded on first use or by the worker hook."""
+    return whisper_manager.get_model()
 
-DEVICE = "cpu"
-COMPUTE_TYPE = "int8"
+TRANSCRIBE_MODES = ("sequential", "batched")
 
-print(f"⏳ Loading Faster-Whisper model ({MODEL_SIZE})...")
+def transcription_options(mode: str = None) -> dict:
+    """faster-whisper options for a transcription mode, from settings (WHISPER_*)."""
+    mode = mode or settings.WHISPER_TRANSCRIBE_MODE
+    if mode not in TRANSCRIBE_MODES:
+        raise ValueError(f"Unknown transcription mode '{mode}'. Options: {list(TRANSCRIBE_MODES)}")
 
-try:
-    # Loads model into the memory (Global Instance)
-    # It downloads the model on first run
-    model = WhisperModel(MODEL_SIZE, device=DEVICE, compute_type=COMPUTE_TYPE)
-    print("✅ Faster-Whisper model loaded successfully!")
-except Exception as e:
-    print(f"❌ Error loading model: {e}")
-    model = None
+    vad_filter = settings.WHISPER_VAD_FILTER
+    if mode == "batched":
+        # Batched pipeline cuts audio on VAD speech chunks; without VAD anything over 30s
+        # fails with "No clip timestamps found" -> VAD is always on here
+        if vad_filter is False:
+            print("⚠️ WHISPER_VAD_FILTER=false ignored: batched transcription needs VAD.")
+        vad_filter = True
+    options = {
+        # Beam Size 5 = Behtar Accuracy (multiple paths explore)
+        "beam_size": settings.WHISPER_BEAM_SIZE,
+        "vad_filter": False if vad_filter is None else vad_filter,
+    }
+    if settings.WHISPER_LANGUAGE:
+        options["language"] = settings.WHISPER_LANGUAGE
+    if settings.WHISPER_CHUNK_LENGTH:
+        options["chunk_length"] = settings.WHISPER_CHUNK_LENGTH
+    if mode == "batched":
+        options["batch_size"] = settings.WHISPER_BATCH_SIZE
+    return options
 
-def transcribe_audio_local(audio_path: str):
+def load_audio(audio):
     """
-    Transcribes audio using Faster-Whisper.
+    '.f32' file (raw 16 kHz mono float32 from extract_media) -> memory-mapped array,
+    no decode or resample needed. Arrays and other paths (MP3 etc.) pass through.
     """
-    if not model:
-        print("❌ Model not loaded, skipping transcription.")
-        return []
+    if isinstance(audio, str) and audio.endswith(PCM_EXTENSION):
+        return np.memmap(audio, dtype=np.float32, mode="r")
+    return audio
+
+# --- TRANSCRIPT CACHE ---
+# Bump when the stored segment format changes
+TRANSCRIPT_CACHE_VERSION = "transcript-v1"
+
+_transcript_cache = None
 
-    if not os.path.exists(audio_path):
-        print(f"❌ Audio file not found: {audio_path}")
-        return []
+def _get_transcript_cache():
+    global _transcript_cache
+    if _transcript_cache is None:
+        _transcript_cache = get_cache(
+            "transcripts",
+            backend=settings.TRANSCRIPT_CACHE_BACKEND,
+            ttl=settings.TRANSCRIPT_CACHE_TTL,
+            max_entries=settings.TRANSCRIPT_CACHE_MAX_ENTRIES,
+        )
+    return _transcript_cache
 
-    print(f"🎧 Starting Optimized Transcription for: {audio_path}")
+def audio_content_hash(audio) -> str:
+    """SHA-256 of the extracted audio stream (PCM/MP3 file content or array bytes)."""
+    if isinstance(audio, str):
+        return hash_file(audio)
+    # Same digest as hash_file() on the matching .f32 file
+    return hashlib.sha256(memoryview(np.ascontiguousarray(audio, dtype=np.float32))).hexdigest()
+
+def _transcript_cache_key(audio_hash: str, options: dict) -> str:
+    """Same audio + same model + same decoder options/language = same transcript."""
+    return make_cache_key(
+        TRANSCRIPT_CACHE_VERSION, audio_hash,
+        whisper_manager.model_size, whisper_manager.compute_type,
+        *(f"{name}={options[name]}" for name in sorted(options)),
+    )
+
+def iter_transcript_segments(audio, mode: str = None, refresh: bool = None, store: bool = True):
+    """
+    Generator version of transcribe_audio_local.
+    audio: file path or a 16 kHz mono float32 NumPy array.
+    mode: "sequential" | "batched" (default: WHISPER_TRANSCRIBE_MODE).
+    refresh: True = skip the transcript cache lookup (default: TRANSCRIPT_CACHE_REFRESH).
+    store: False = don't write the result to the transcript cache (benchmarks, one-off runs).
+    Yields {"start", "end", "text"} dicts as soon as Whisper decodes them,
+    so downstream stages can start before the whole file is transcribed.
+    Errors end the stream early (same as returning [] in the list version); the generator
+    only returns True after a full run or a cache hit -> use TranscriptStream to read that.
+    """
+    if isinstance(audio, str):
+        if not os.path.exists(audio):
+            print(f"❌ Audio file not found: {audio}")
+            return
+        print(f"🎧 Starting Optimized Transcription for: {audio}")
+    else:
+        print(f"🎧 Starting Optimized Transcription for: {len(audio) / PCM_SAMPLE_RATE:.1f}s of PCM audio")
     start_time = time.time()
-    
+    count = 0
+    options = transcription_options(mode)
+    refresh = settings.TRANSCRIPT_CACHE_REFRESH if refresh is None else refresh
+
+    # --- CACHE CHECK (same audio seen before -> no Whisper at all) ---
+    cache = _get_transcript_cache()
+    cache_key = None
+    if store or not refresh:  # no lookup and no write = no need to hash the audio
+        try:
+            cache_key = _transcript_cache_key(audio_content_hash(audio), options)
+        except Exception as e:
+            print(f"⚠️ Audio hash failed, transcript cache bypassed: {e}")
+
+    if cache_key and not refresh:
+        cached = cache.get(cache_key)
+        if cached is not None:
+            print(f"⚡ Transcript cache hit: {len(cached)} segments (Whisper skipped)")
+            yield from cached
+            return True
+
+    collected = []
     try:
-        # Beam Size 5 = Behtar Accuracy (multiple paths explore)
-        segments, info = model.transcribe(audio_path, beam_size=5)
+        segments, info = whisper_manager.transcribe(load_audio(audio), **options)
         
-        transcript_data = []
-        
-        print(f"   ℹ️ Detected language: '{info.language}' (Probability: {info.language_probability:.2f})")
+        print(f"   ℹ️ Detected language: '{info['language']}' (Probability: {info['language_probability']:.2f})")
 
-        # Faster-Whisper generator return karta hai, loop chalana zaroori hai
+        # Faster-Whisper generator return karta hai, har segment decode hote hi aage bhej do
         for segment in segments:
-            transcript_data.append({
-                "start": segment.start,
-                "end": segment.end,
-                "text": segment.text.strip()
-            })
+            count += 1
+            item = {
+                "start": segment["start"],
+                "end": segment["end"],
+                "text": segment["text"].strip()
+            }
+            collected.append(item)
+            yield item
             
         duration = time.time() - start_time
-        print(f"✅ Transcription complete in {duration:.2f}s! Found {len(transcript_data)} segments.")
-        return transcript_data
+        print(f"✅ Transcription complete in {duration:.2f}s! Found {count} segments.")
+
+        # Sirf poori transcription cache hoti hai (failed/partial runs nahi)
+        if cache_key and store:
+            cache.set(cache_key, collected)
+        return True
 
     except Exception as e:
         print(f"❌ Transcription failed: {e}")
-        return []
\ No newline at end of file
+    return False
+
+class TranscriptStream:
+    """
+    iter_transcript_segments wrapped so the caller can tell a full transcript from a
+    failed/partial one after iterating: 'complete' is True only if Whisper finished
+    (or the cache had it). Checkpoints must not mark 'transcribe' done otherwise.
+    """
+
+    def __init__(self, audio, mode: str = None, refresh: bool = None):
+        self.audio = audio
+        self.mode = mode
+        self.refresh = refresh
+        self.complete = False
+
+    def __iter__(self):
+        self.complete = bool((yield from iter_transcript_segments(self.audio, self.mode, self.refresh)))
+
+def transcribe_audio_local(audio, mode: str = None, refresh: bool = None, store: bool = True):
+    """
+    Transcribes audio (path or 16 kHz float32 array) using Faster-Whisper.
+    """
+    return list(iter_transcript_segments(audio, mode, refresh, store))
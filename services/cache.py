@@ -0,0 +1,211 @@
+import os
+import json
+import time
+import sqlite3
+import hashlib
+import threading
+from core.config import settings
+
+# ======================================================
+# 🔥 PERSISTENT RESULT CACHE (SQLite / Redis) 🔥
+# ======================================================
+# Values are JSON-serializable. Entries expire after 'ttl' seconds and the
+# least recently used ones are evicted once 'max_entries' is crossed.
+# Cache kabhi pipeline ko fail nahi karta: backend error = miss (get) / skip (set).
+
+# SQLite: prefork children share one file -> wait for a writer's lock instead of failing at once
+SQLITE_BUSY_TIMEOUT = 5.0  # seconds
+# LRU trim scans the index, so it runs every N writes instead of on every write
+SQLITE_EVICT_EVERY = 500
+
+def make_cache_key(*parts) -> str:
+    """Stable SHA-256 key from any number of parts."""
+    raw = "|".join("" if p is None else str(p) for p in parts)
+    return hashlib.sha256(raw.encode("utf-8")).hexdigest()
+
+def hash_file(path: str, chunk_size: int = 1024 * 1024) -> str:
+    """Streaming SHA-256 of a file's content (constant memory, any file size)."""
+    digest = hashlib.sha256()
+    with open(path, "rb") as f:
+        for chunk in iter(lambda: f.read(chunk_size), b""):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+class _CacheStats:
+    def __init__(self):
+        self.hits = 0
+        self.misses = 0
+
+    def stats(self) -> dict:
+        total = self.hits + self.misses
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": round(self.hits / total, 3) if total else 0.0,
+        }
+
+class NullCache(_CacheStats):
+    """Caching disabled: every lookup is a miss."""
+
+    def get(self, key):
+        self.misses += 1
+        return None
+
+    def set(self, key, value):
+        pass
+
+class SQLiteCache(_CacheStats):
+    """Local disk cache (one SQLite file shared by all namespaces)."""
+
+    def __init__(self, path: str, namespace: str, ttl: int, max_entries: int, evict_every: int = SQLITE_EVICT_EVERY):
+        super().__init__()
+        self.namespace = namespace
+        self.ttl = ttl
+        self.max_entries = max_entries
+        self.evict_every = max(1, evict_every)
+        self._writes = 0
+        self._lock = threading.Lock()
+
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        self._conn = sqlite3.connect(path, timeout=SQLITE_BUSY_TIMEOUT, check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("""
+            CREATE TABLE IF NOT EXISTS cache (
+                namespace TEXT NOT NULL,
+                key TEXT NOT NULL,
+                value TEXT NOT NULL,
+                created_at REAL NOT NULL,
+                last_access REAL NOT NULL,
+                PRIMARY KEY (namespace, key)
+            )
+        """)
+        self._conn.execute("CREATE INDEX IF NOT EXISTS ix_cache_lru ON cache (namespace, last_access)")
+        self._conn.commit()
+
+    def get(self, key):
+        now = time.time()
+        try:
+            with self._lock:
+                row = self._conn.execute(
+                    "SELECT value, created_at FROM cache WHERE namespace = ? AND key = ?",
+                    (self.namespace, key)
+                ).fetchone()
+
+                if row and self.ttl and now - row[1] > self.ttl:
+                    self._conn.execute("DELETE FROM cache WHERE namespace = ? AND key = ?", (self.namespace, key))
+                    self._conn.commit()
+                    row = None
+
+                if row:
+                    self._conn.execute(
+                        "UPDATE cache SET last_access = ? WHERE namespace = ? AND key = ?",
+                        (now, self.namespace, key)
+                    )
+                    self._conn.commit()
+            value = json.loads(row[0]) if row else None
+        except (sqlite3.Error, ValueError) as e:
+            print(f"⚠️ SQLite cache read failed: {e}")
+            self._rollback()
+            value = None
+
+        if value is None:
+            self.misses += 1
+            return None
+        self.hits += 1
+        return value
+
+    def set(self, key, value):
+        now = time.time()
+        try:
+            with self._lock:
+                self._conn.execute(
+                    "INSERT OR REPLACE INTO cache (namespace, key, value, created_at, last_access) VALUES (?, ?, ?, ?, ?)",
+                    (self.namespace, key, json.dumps(value), now, now)
+                )
+                self._conn.commit()
+                self._writes += 1
+                if self._writes % self.evict_every == 0:
+                    self._evict()
+        except (sqlite3.Error, TypeError, ValueError) as e:
+            print(f"⚠️ SQLite cache write failed: {e}")
+            self._rollback()
+
+    def _evict(self):
+        # LRU: sirf newest 'max_entries' rakho (between trims the table may run up to evict_every over)
+        self._conn.execute("""
+            DELETE FROM cache WHERE namespace = ? AND key IN (
+                SELECT key FROM cache WHERE namespace = ?
+                ORDER BY last_access DESC LIMIT -1 OFFSET ?
+            )
+        """, (self.namespace, self.namespace, self.max_entries))
+        self._conn.commit()
+
+    def _rollback(self):
+        try:
+            with self._lock:
+                self._conn.rollback()
+        except sqlite3.Error:
+            pass
+
+class RedisCache(_CacheStats):
+    """Shared cache for all workers. TTL via EX, LRU via a sorted set of access times."""
+
+    def __init__(self, namespace: str, ttl: int, max_entries: int):
+        super().__init__()
+        from core.redis_client import get_redis
+        self.redis = get_redis()
+        self.prefix = f"docpilot:cache:{namespace}"
+        self.lru_key = f"{self.prefix}:lru"
+        self.ttl = ttl
+        self.max_entries = max_entries
+
+    def get(self, key):
+        try:
+            raw = self.redis.get(f"{self.prefix}:{key}")
+            value = json.loads(raw) if raw is not None else None  # corrupt entry = miss, not a failed frame
+            if raw is not None:
+                self.redis.zadd(self.lru_key, {key: time.time()})
+        except Exception as e:
+            print(f"⚠️ Redis cache read failed: {e}")
+            raw = None
+
+        if raw is None:
+            self.misses += 1
+            return None
+        self.hits += 1
+        return value
+
+    def set(self, key, value):
+        try:
+            pipe = self.redis.pipeline()
+            pipe.set(f"{self.prefix}:{key}", json.dumps(value), ex=self.ttl or None)
+            now = time.time()
+            pipe.zadd(self.lru_key, {key: now})
+            if self.ttl:
+                # Untouched for longer than the TTL = the value already expired (EX); drop it from the LRU set too
+                pipe.zremrangebyscore(self.lru_key, "-inf", now - self.ttl)
+            pipe.zcard(self.lru_key)
+            size = pipe.execute()[-1]
+
+            overflow = size - self.max_entries
+            if overflow > 0:
+                evicted = [k.decode() for k, _ in self.redis.zpopmin(self.lru_key, overflow)]
+                self.redis.delete(*[f"{self.prefix}:{k}" for k in evicted])
+        except Exception as e:
+            print(f"⚠️ Redis cache write failed: {e}")
+
+def get_cache(namespace: str, backend: str, ttl: int, max_entries: int):
+    """
+    Factory for a result cache.
+    backend: "sqlite" (local disk), "redis" (shared) or "none".
+    Falls back to no caching if the backend can't be reached.
+    """
+    try:
+        if backend == "redis":
+            return RedisCache(namespace, ttl, max_entries)
+        if backend == "sqlite":
+            path = os.path.join(settings.CACHE_DIR, "results.sqlite3")
+            return SQLiteCache(path, namespace, ttl, max_entries)
+    except Exception as e:
+        print(f"⚠️ Cache backend '{backend}' unavailable ({e}). Continuing without cache.")
+    return NullCache()
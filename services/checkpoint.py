@@ -0,0 +1,148 @@
+import os
+import json
+import time
+import threading
+from services.cache import hash_file, make_cache_key
+
+# ======================================================
+# 🔥 STAGE CHECKPOINTS (resumable processing) 🔥
+# ======================================================
+# temp_data/<video_id>/manifest.json record karta hai:
+# - kaunse stages complete hain + unke artifacts ke hashes aur size+mtime fingerprint
+#   (file badli ya missing = stage dobara; har check pe SHA-256 dobara nahi, sirf force=True pe)
+# - har frame ka LLM result: "ok" (step ya skip) / "failed" (error)
+# Retry ya resume completed stages skip karta hai aur API ko sirf failed (ya naye) frames bhejta hai.
+
+STAGES = ("extract", "transcribe", "generate", "persist")
+MANIFEST_VERSION = 1
+
+def artifact_hash(path: str):
+    """Content hash of a file, or of every file in a directory. None if it doesn't exist."""
+    if not path or not os.path.exists(path):
+        return None
+    if os.path.isfile(path):
+        return hash_file(path)
+    names = sorted(os.listdir(path))
+    return make_cache_key(*(f"{name}:{hash_file(os.path.join(path, name))}" for name in names))
+
+def artifact_stat(path: str):
+    """Cheap fingerprint: size + mtime of a file, or of every file in a directory. None if it doesn't exist."""
+    if not path or not os.path.exists(path):
+        return None
+    if os.path.isfile(path):
+        st = os.stat(path)
+        return f"{st.st_size}:{st.st_mtime_ns}"
+    with os.scandir(path) as entries:
+        files = sorted((entry.name, entry.stat()) for entry in entries)
+    return make_cache_key(*(f"{name}:{st.st_size}:{st.st_mtime_ns}" for name, st in files))
+
+def open_checkpoint(base_dir: str, resume_from: str = None, refresh_transcript: bool = False):
+    """
+    Manifest for one video (or chunk) directory.
+    resume_from: re-run this stage and everything after it.
+    refresh_transcript implies re-running transcription too.
+    """
+    checkpoint = VideoCheckpoint(base_dir)
+    if refresh_transcript and (resume_from is None or STAGES.index(resume_from) > STAGES.index("transcribe")):
+        resume_from = "transcribe"
+    if resume_from:
+        checkpoint.reset_from(resume_from)
+    return checkpoint
+
+class VideoCheckpoint:
+    def __init__(self, base_dir: str, save_every: int = 25):
+        self.path = os.path.join(base_dir, "manifest.json")
+        self.save_every = save_every  # frame results between manifest writes
+        self._lock = threading.Lock()
+        self._unsaved = 0
+        self.data = self._load()
+
+    def _load(self) -> dict:
+        try:
+            with open(self.path) as f:
+                data = json.load(f)
+        except (OSError, ValueError):
+            data = None
+        if not isinstance(data, dict) or data.get("version") != MANIFEST_VERSION:
+            data = {"version": MANIFEST_VERSION, "stages": {}, "frames": {}}
+        return data
+
+    def save(self):
+        with self._lock:
+            os.makedirs(os.path.dirname(self.path), exist_ok=True)
+            tmp_path = f"{self.path}.tmp"
+            with open(tmp_path, "w") as f:
+                json.dump(self.data, f, indent=2)
+            os.replace(tmp_path, self.path)  # crash mid-write never leaves a broken manifest
+            self._unsaved = 0
+
+    # --- STAGES ---
+    def is_complete(self, stage: str, force: bool = False) -> bool:
+        """
+        Stage recorded AND its artifacts are still on disk, unchanged (size + mtime).
+        force=True re-hashes the contents (SHA-256) instead of trusting the fingerprint.
+        """
+        record = self.data["stages"].get(stage)
+        if not record:
+            return False
+        for name, artifact in record["artifacts"].items():
+            if force or "stat" not in artifact:  # manifests from before the fingerprint only have the hash
+                unchanged = artifact_hash(artifact["path"]) == artifact["hash"]
+            else:
+                unchanged = artifact_stat(artifact["path"]) == artifact["stat"]
+            if not unchanged:
+                print(f"♻️ Checkpoint: '{stage}' artifact '{name}' changed or missing. Stage will re-run.")
+                return False
+        return True
+
+    def artifact(self, stage: str, name: str):
+        return self.data["stages"][stage]["artifacts"][name]["path"]
+
+    def complete(self, stage: str, **artifacts):
+        """artifacts: name -> path (None = stage legitimately produced nothing, e.g. silent video)."""
+        self.data["stages"][stage] = {
+            "completed_at": time.time(),
+            "artifacts": {name: {"path": path, "hash": artifact_hash(path), "stat": artifact_stat(path)}
+                          for name, path in artifacts.items()},
+        }
+        self.save()
+
+    def reset_from(self, stage: str):
+        if stage not in STAGES:
+            raise ValueError(f"Unknown stage '{stage}'. Options: {list(STAGES)}")
+        for name in STAGES[STAGES.index(stage):]:
+            self.data["stages"].pop(name, None)
+        if STAGES.index(stage) < STAGES.index("generate"):
+            # New frames / new transcript -> old LLM answers don't apply
+            self.data["frames"] = {}
+        self.save()
+
+    def completed_stages(self) -> list:
+        return [stage for stage in STAGES if stage in self.data["stages"]]
+
+    # --- PER-FRAME LLM RESULTS ---
+    @staticmethod
+    def _frame_key(frame_path: str, audio_text: str) -> str:
+        return f"{os.path.basename(frame_path)}:{make_cache_key(audio_text)[:16]}"
+
+    def frame_result(self, frame_path: str, audio_text: str):
+        """Recorded model JSON for this frame + narration (a 'skip' too), or None = must be requested."""
+        record = self.data["frames"].get(self._frame_key(frame_path, audio_text))
+        if record and record["status"] == "ok":
+            return record["result"]
+        return None
+
+    def record_frame(self, frame_path: str, audio_text: str, step_data: dict):
+        self._record(frame_path, audio_text, {"status": "ok", "result": step_data})
+
+    def record_failure(self, frame_path: str, audio_text: str, error):
+        self._record(frame_path, audio_text, {"status": "failed", "error": str(error)})
+
+    def failed_frames(self) -> list:
+        return sorted(key.split(":")[0] for key, record in self.data["frames"].items() if record["status"] == "failed")
+
+    def _record(self, frame_path, audio_text, record):
+        self.data["frames"][self._frame_key(frame_path, audio_text)] = record
+        self._unsaved += 1
+        if self._unsaved >= self.save_every:
+            self.save()
@@ -0,0 +1,58 @@
+import math
+
+# ======================================================
+# 🔥 CHUNKED MODE (long videos across many workers) 🔥
+# ======================================================
+# Video ko time ranges mein baanto, har chunk apne worker par poori pipeline chalaye
+# (extract -> filter -> transcribe -> generate), phir results merge hon.
+# Har chunk thora pehle se shuru hota hai (overlap): static filter ko reference frame
+# aur Whisper ko boundary par poora jumla mil jata hai. Steps sirf apne "owned" range
+# ke rakhe jaate hain, overlap wale pichle chunk ke hain.
+
+def plan_chunks(duration: float, chunk_seconds: float, overlap: float) -> list:
+    """
+    Splits [0, duration) into chunks.
+    Each chunk: {"index", "start", "end"} = owned range (steps kept), and
+    {"extract_start", "extract_duration"} = range actually processed (owned + overlap before it).
+    """
+    count = max(1, math.ceil(duration / chunk_seconds))
+    # A tiny tail (e.g. 0.3s) is not worth its own worker -> folded into the last chunk
+    if count > 1 and duration - (count - 1) * chunk_seconds < chunk_seconds / 4:
+        count -= 1
+    chunks = []
+    for index in range(count):
+        start = index * chunk_seconds
+        end = duration if index == count - 1 else start + chunk_seconds
+        extract_start = max(0.0, start - overlap)
+        chunks.append({
+            "index": index,
+            "start": start,
+            "end": end,
+            "extract_start": extract_start,
+            "extract_duration": end - extract_start,
+        })
+    return chunks
+
+def to_global_time(steps: list, chunk: dict) -> list:
+    """
+    Chunk-relative step timestamps -> video timestamps. Steps inside the
+    overlap (owned by the previous chunk) are dropped.
+    """
+    owned = []
+    for step in steps:
+        step["timestamp"] += chunk["extract_start"]
+        if chunk["start"] <= step["timestamp"] < chunk["end"]:
+            owned.append(step)
+    return owned
+
+def merge_chunk_results(chunk_results: list, finalize) -> list:
+    """
+    chunk_results: [{"index", "steps"}, ...] in any order (chord results).
+    finalize: step list -> ordered, deduplicated, renumbered list. It runs over
+    the whole video, so near-duplicates across a chunk boundary are removed too.
+    """
+    ordered = sorted(chunk_results, key=lambda result: result["index"])
+    steps = [step for result in ordered for step in result["steps"]]
+    merged = finalize(steps)
+    print(f"🧩 Merged {len(ordered)} chunks: {len(steps)} steps -> {len(merged)} after boundary dedup.")
+    return merged
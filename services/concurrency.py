@@ -0,0 +1,215 @@
+import time
+import asyncio
+
+# ======================================================
+# 🔥 ADAPTIVE CONCURRENCY LIMITER (AIMD) 🔥
+# ======================================================
+# Replaces the fixed asyncio.Semaphore(7) in front of the vision API.
+# - Success:          limit grows by ~1 per "round" of requests (additive increase)
+# - Latency spike:    limit shrinks gently (endpoint is queueing our requests)
+# - 429 / 5xx:        limit is cut in half (multiplicative decrease), once per congestion
+#                     event: requests already in flight when it was cut don't cut it again
+# - Retry-After:      no new requests start until the provider's deadline passes
+
+class AdaptiveLimiter:
+    def __init__(
+        self,
+        name: str,
+        initial: int = 7,
+        min_limit: int = 1,
+        max_limit: int = 32,
+        backoff: float = 0.5,
+        latency_tolerance: float = 2.0,
+    ):
+        self.name = name
+        self.limit = float(initial)
+        self.min_limit = min_limit
+        self.max_limit = max_limit
+        self.backoff = backoff
+        self.latency_tolerance = latency_tolerance
+
+        self.in_flight = 0
+        self.waiting = 0
+        self.paused_until = 0.0
+        self.baseline_latency = None  # slow-moving "healthy" latency
+        self.generation = 0  # bumped on every multiplicative decrease
+
+        # Counters
+        self.successes = 0
+        self.throttled = 0
+        self.errors = 0
+
+        self._cond = None
+        self._loop = None
+
+    # --- asyncio primitives are per event loop (workers may run asyncio.run per task) ---
+    def _condition(self):
+        loop = asyncio.get_running_loop()
+        if self._loop is not loop:
+            self._loop = loop
+            self._cond = asyncio.Condition()
+            self.in_flight = 0
+            self.waiting = 0
+        return self._cond
+
+    def slot(self):
+        """Usage: async with limiter.slot() as slot: ... (slot.retry_after can be set on failure)"""
+        return _LimiterSlot(self)
+
+    async def acquire(self) -> int:
+        """Waits for a free slot. Returns the decrease generation the slot was granted in."""
+        cond = self._condition()
+        async with cond:
+            self.waiting += 1
+            try:
+                while True:
+                    pause = self.paused_until - time.monotonic()
+                    if pause > 0:
+                        # Provider asked us to back off (Retry-After)
+                        try:
+                            await asyncio.wait_for(cond.wait(), timeout=pause)
+                        except asyncio.TimeoutError:
+                            pass
+                        continue
+                    if self.in_flight < int(self.limit):
+                        break
+                    await cond.wait()
+            finally:
+                self.waiting -= 1
+            self.in_flight += 1
+            return self.generation
+
+    async def release(self, latency: float = None, status: str = "ok", retry_after: float = None,
+                      generation: int = None):
+        """
+        status: "ok" | "throttled" (429/5xx) | "error" (anything else, limit untouched).
+        generation: what acquire() returned. A throttled slot from before the last decrease
+        belongs to the burst that already halved the limit, so it doesn't halve it again.
+        """
+        cond = self._condition()
+        async with cond:
+            self.in_flight = max(0, self.in_flight - 1)
+
+            if status == "ok":
+                self.successes += 1
+                self._on_success(latency)
+            elif status == "throttled":
+                self.throttled += 1
+                if retry_after:
+                    self.paused_until = max(self.paused_until, time.monotonic() + retry_after)
+                if generation is None or generation == self.generation:
+                    old = self.limit
+                    self.limit = max(self.min_limit, self.limit * self.backoff)
+                    self.generation += 1
+                    print(f"🚦 [{self.name}] Throttled -> limit {old:.1f} => {self.limit:.1f}"
+                          + (f", pausing {retry_after:.1f}s (Retry-After)" if retry_after else ""))
+            else:
+                self.errors += 1
+
+            cond.notify_all()
+
+    def _on_success(self, latency):
+        if latency is not None:
+            if self.baseline_latency is None:
+                self.baseline_latency = latency
+            elif latency > self.baseline_latency * self.latency_tolerance:
+                # Gradient signal: latency way above baseline = provider-side queueing
+                self.limit = max(self.min_limit, self.limit * 0.9)
+                self.baseline_latency = 0.95 * self.baseline_latency + 0.05 * latency
+                return
+            else:
+                self.baseline_latency = 0.9 * self.baseline_latency + 0.1 * latency
+
+        # Only grow while we are actually using the current limit
+        if self.in_flight + 1 >= int(self.limit):
+            self.limit = min(self.max_limit, self.limit + 1.0 / self.limit)
+
+    def metrics(self) -> dict:
+        return {
+            "provider": self.name,
+            "limit": round(self.limit, 2),
+            "in_flight": self.in_flight,
+            "queue_depth": self.waiting,
+            "successes": self.successes,
+            "throttled": self.throttled,
+            "errors": self.errors,
+            "baseline_latency": round(self.baseline_latency, 3) if self.baseline_latency else None,
+        }
+
+class _LimiterSlot:
+    def __init__(self, limiter: AdaptiveLimiter):
+        self.limiter = limiter
+        self.retry_after = None
+        self.generation = None
+        self._start = None
+
+    async def __aenter__(self):
+        self.generation = await self.limiter.acquire()
+        self._start = time.monotonic()
+        return self
+
+    async def __aexit__(self, exc_type, exc, tb):
+        latency = time.monotonic() - self._start
+        if exc is None:
+            await self.limiter.release(latency=latency, status="ok")
+        elif is_throttle_error(exc):
+            await self.limiter.release(status="throttled", retry_after=self.retry_after or get_retry_after(exc),
+                                       generation=self.generation)
+        else:
+            await self.limiter.release(status="error")
+        return False
+
+# --- ERROR CLASSIFICATION (OpenAI-compatible SDK errors) ---
+def error_status(exc):
+    """HTTP status of an SDK error (None for network errors / non-HTTP exceptions)."""
+    return getattr(exc, "status_code", None) or getattr(getattr(exc, "response", None), "status_code", None)
+
+def is_throttle_error(exc) -> bool:
+    """429 or 5xx from the provider."""
+    code = error_status(exc)
+    return code is not None and (code == 429 or code >= 500)
+
+def _network_errors() -> tuple:
+    """Connection / timeout errors of the SDK and its transport (imported lazily, the API process never needs them)."""
+    errors = []
+    try:
+        import openai
+        errors += [openai.APIConnectionError, openai.APITimeoutError]
+    except ImportError:
+        pass
+    try:
+        import httpx
+        errors.append(httpx.TransportError)
+    except ImportError:
+        pass
+    return tuple(errors)
+
+def is_retryable_error(exc) -> bool:
+    """
+    Throttling, server errors and network problems are worth retrying; 4xx (bad request/auth) are not.
+    Errors without a status code only when they are connection/timeout errors - a TypeError or a
+    JSON/payload bug fails the same way five times.
+    """
+    code = error_status(exc)
+    if code is None:
+        return isinstance(exc, _network_errors())
+    return code == 429 or code >= 500
+
+def get_retry_after(exc):
+    """Seconds from the Retry-After header (None if absent / not numeric)."""
+    headers = getattr(getattr(exc, "response", None), "headers", None)
+    if not headers:
+        return None
+    value = headers.get("retry-after")
+    try:
+        return float(value) if value is not None else None
+    except ValueError:
+        return None
+
+# --- PER-PROVIDER REGISTRY ---
+_limiters = {}
+
+def get_limiter(provider: str, **kwargs) -> AdaptiveLimiter:
+    if provider not in _limiters:
+        _limiters[provider] = AdaptiveLimiter(provider, **kwargs)
+    return _limiters[provider]
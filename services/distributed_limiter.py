@@ -0,0 +1,258 @@
+import time
+import uuid
+import asyncio
+import threading
+from core.config import settings
+
+# ======================================================
+# 🔥 CLUSTER-WIDE RATE LIMITER (Redis) 🔥
+# ======================================================
+# Har Celery worker apna semaphore chalata tha -> N workers = N x requests.
+# Yeh limiter provider ka account-level quota sab workers mein share karta hai:
+# - RPM: requests-per-minute token bucket
+# - TPM: tokens-per-minute token bucket (estimated prompt + output tokens)
+# - Concurrency: max in-flight requests across the cluster (leases expire if a worker dies)
+# Everything is checked and consumed atomically in one Lua script.
+# If Redis is unreachable, each process falls back to a local limiter with the same rules
+# and tries Redis again after a cooldown (local quotas = N x overshoot, so only temporarily).
+
+# Seconds on the local limiter before Redis is tried again
+REDIS_RETRY_COOLDOWN = 30.0
+
+_ACQUIRE_SCRIPT = """
+local t = redis.call('TIME')
+local now = tonumber(t[1]) + tonumber(t[2]) / 1000000
+
+local rpm = tonumber(ARGV[1])
+local tpm = tonumber(ARGV[2])
+local need = tonumber(ARGV[3])
+local max_conc = tonumber(ARGV[4])
+local lease_id = ARGV[5]
+local lease_ttl = tonumber(ARGV[6])
+
+local function refill(key, cap)
+    local v = redis.call('HMGET', key, 'tokens', 'ts')
+    local tokens = tonumber(v[1]) or cap
+    local ts = tonumber(v[2]) or now
+    return math.min(cap, tokens + (now - ts) * cap / 60)
+end
+
+local wait = 0
+local req_tokens = nil
+local tok_tokens = nil
+
+if rpm > 0 then
+    req_tokens = refill(KEYS[1], rpm)
+    if req_tokens < 1 then wait = math.max(wait, (1 - req_tokens) * 60 / rpm) end
+end
+
+if tpm > 0 then
+    need = math.min(need, tpm)
+    tok_tokens = refill(KEYS[2], tpm)
+    if tok_tokens < need then wait = math.max(wait, (need - tok_tokens) * 60 / tpm) end
+end
+
+if max_conc > 0 then
+    redis.call('ZREMRANGEBYSCORE', KEYS[3], '-inf', now)
+    if redis.call('ZCARD', KEYS[3]) >= max_conc then wait = math.max(wait, 0.1) end
+end
+
+if wait > 0 then
+    return tostring(wait)
+end
+
+if req_tokens then
+    redis.call('HSET', KEYS[1], 'tokens', req_tokens - 1, 'ts', now)
+    redis.call('EXPIRE', KEYS[1], 120)
+end
+if tok_tokens then
+    redis.call('HSET', KEYS[2], 'tokens', tok_tokens - need, 'ts', now)
+    redis.call('EXPIRE', KEYS[2], 120)
+end
+if max_conc > 0 then
+    redis.call('ZADD', KEYS[3], now + lease_ttl, lease_id)
+    redis.call('EXPIRE', KEYS[3], lease_ttl * 2)
+end
+return '0'
+"""
+
+# Rough tokens per image for TPM accounting (vision models bill images in tiles)
+IMAGE_TOKEN_ESTIMATE = 1000
+
+def estimate_tokens(messages: list, max_output_tokens: int = 1024) -> int:
+    """Cheap TPM estimate: ~4 characters per text token + a flat cost per image + output budget."""
+    chars = 0
+    images = 0
+    for message in messages:
+        content = message.get("content")
+        if isinstance(content, str):
+            chars += len(content)
+            continue
+        for part in content or []:
+            if part.get("type") == "text":
+                chars += len(part.get("text", ""))
+            elif part.get("type") == "image_url":
+                images += 1
+    return chars // 4 + images * IMAGE_TOKEN_ESTIMATE + max_output_tokens
+
+class LocalRateLimiter:
+    """In-process version of the same RPM/TPM/concurrency rules (fallback when Redis is down)."""
+
+    def __init__(self, rpm: int, tpm: int, max_concurrency: int):
+        self.rpm = rpm
+        self.tpm = tpm
+        self.max_concurrency = max_concurrency
+        self._req = (float(rpm), time.monotonic())
+        self._tok = (float(tpm), time.monotonic())
+        self._leases = set()
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def _refill(state, cap, now):
+        tokens, ts = state
+        return min(cap, tokens + (now - ts) * cap / 60)
+
+    def try_acquire(self, tokens: int, lease_id: str) -> float:
+        """0 = granted, otherwise seconds to wait before trying again."""
+        with self._lock:
+            now = time.monotonic()
+            wait = 0.0
+            req = tok = None
+
+            if self.rpm > 0:
+                req = self._refill(self._req, self.rpm, now)
+                if req < 1:
+                    wait = max(wait, (1 - req) * 60 / self.rpm)
+            if self.tpm > 0:
+                tokens = min(tokens, self.tpm)
+                tok = self._refill(self._tok, self.tpm, now)
+                if tok < tokens:
+                    wait = max(wait, (tokens - tok) * 60 / self.tpm)
+            if self.max_concurrency > 0 and len(self._leases) >= self.max_concurrency:
+                wait = max(wait, 0.1)
+
+            if wait > 0:
+                return wait
+
+            if req is not None:
+                self._req = (req - 1, now)
+            if tok is not None:
+                self._tok = (tok - tokens, now)
+            if self.max_concurrency > 0:
+                self._leases.add(lease_id)
+            return 0.0
+
+    def holds(self, lease_id: str) -> bool:
+        with self._lock:
+            return lease_id in self._leases
+
+    def release(self, lease_id: str):
+        with self._lock:
+            self._leases.discard(lease_id)
+
+class ClusterRateLimiter:
+    """
+    Shared limiter for all workers. Usage:
+        async with limiter.limit(estimated_tokens): await call_api()
+    """
+
+    def __init__(self, name: str, rpm: int, tpm: int, max_concurrency: int, lease_ttl: int = 120, redis_client=None,
+                 retry_cooldown: float = REDIS_RETRY_COOLDOWN):
+        self.name = name
+        self.rpm = rpm
+        self.tpm = tpm
+        self.max_concurrency = max_concurrency
+        self.lease_ttl = lease_ttl
+        self.keys = [f"docpilot:ratelimit:{name}:{k}" for k in ("rpm", "tpm", "leases")]
+        self.local = LocalRateLimiter(rpm, tpm, max_concurrency)
+
+        self.redis = redis_client
+        self._script = None
+        self.retry_cooldown = retry_cooldown
+        self._fallback_until = None  # monotonic deadline while Redis is considered down
+        self.fallbacks = 0
+        self.waits = 0
+
+    @property
+    def using_fallback(self) -> bool:
+        return self._fallback_until is not None and time.monotonic() < self._fallback_until
+
+    @property
+    def enabled(self) -> bool:
+        return bool(self.rpm or self.tpm or self.max_concurrency)
+
+    def _redis_script(self):
+        if self._script is None:
+            if self.redis is None:
+                from core.redis_client import get_redis
+                self.redis = get_redis()
+            self._script = self.redis.register_script(_ACQUIRE_SCRIPT)
+        return self._script
+
+    def try_acquire(self, tokens: int, lease_id: str) -> float:
+        if not self.using_fallback:
+            try:
+                wait = self._redis_script()(
+                    keys=self.keys,
+                    args=[self.rpm, self.tpm, tokens, self.max_concurrency, lease_id, self.lease_ttl],
+                )
+                if self._fallback_until is not None:
+                    print(f"✅ [{self.name}] Redis rate limiter back, cluster-wide quotas again.")
+                    self._fallback_until = None
+                return float(wait)
+            except Exception as e:
+                print(f"⚠️ [{self.name}] Redis rate limiter unavailable ({e}). "
+                      f"Using local limiter, retrying Redis in {self.retry_cooldown:.0f}s.")
+                self._fallback_until = time.monotonic() + self.retry_cooldown
+                self.fallbacks += 1
+        return self.local.try_acquire(tokens, lease_id)
+
+    def release(self, lease_id: str):
+        if self.max_concurrency <= 0:
+            return
+        if self.local.holds(lease_id):
+            # Granted by the local limiter (Redis was down at acquire time), even if Redis is back now
+            self.local.release(lease_id)
+            return
+        try:
+            self.redis.zrem(self.keys[2], lease_id)
+        except Exception as e:
+            print(f"⚠️ [{self.name}] Lease release failed (expires in {self.lease_ttl}s): {e}")
+
+    def limit(self, tokens: int = 0):
+        return _ClusterLease(self, tokens)
+
+class _ClusterLease:
+    def __init__(self, limiter: ClusterRateLimiter, tokens: int):
+        self.limiter = limiter
+        self.tokens = tokens
+        self.lease_id = uuid.uuid4().hex
+
+    async def __aenter__(self):
+        if not self.limiter.enabled:
+            return self
+        while True:
+            # Redis call is blocking -> thread, so the event loop keeps serving other frames
+            wait = await asyncio.to_thread(self.limiter.try_acquire, self.tokens, self.lease_id)
+            if wait <= 0:
+                return self
+            self.limiter.waits += 1
+            await asyncio.sleep(min(wait, 5.0))
+
+    async def __aexit__(self, exc_type, exc, tb):
+        if self.limiter.enabled:
+            await asyncio.to_thread(self.limiter.release, self.lease_id)
+        return False
+
+# --- PER-PROVIDER REGISTRY ---
+_cluster_limiters = {}
+
+def get_cluster_limiter(provider: str) -> ClusterRateLimiter:
+    if provider not in _cluster_limiters:
+        _cluster_limiters[provider] = ClusterRateLimiter(
+            provider,
+            rpm=settings.LLM_RPM_LIMIT,
+            tpm=settings.LLM_TPM_LIMIT,
+            max_concurrency=settings.LLM_CLUSTER_MAX_CONCURRENCY,
+        )
+    return _cluster_limiters[provider]
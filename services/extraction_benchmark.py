@@ -0,0 +1,79 @@
+import os
+import json
+import time
+import shutil
+import tempfile
+import argparse
+import resource
+from services.processing import extract_frames, FAST_EXTRACTION_MODES
+
+# ======================================================
+# 🔥 FRAME EXTRACTION BENCHMARK (stream vs fast modes) 🔥
+# ======================================================
+# Usage: python -m services.extraction_benchmark recording.mp4 [--tolerance 2] [--events events.json]
+# Har mode same video par chalta hai. Report: wall time, CPU time (ffmpeg children + Python),
+# keyframes kept aur recall = "stream" mode ke kitne keyframes ke paas (± tolerance sec)
+# is mode ka bhi koi frame hai. events.json (change times, sec) ho to unka recall bhi.
+
+def _cpu_seconds() -> float:
+    usage = [resource.getrusage(who) for who in (resource.RUSAGE_SELF, resource.RUSAGE_CHILDREN)]
+    return sum(u.ru_utime + u.ru_stime for u in usage)
+
+def recall(reference: list, candidate: list, tolerance: float) -> float:
+    """Share of reference times with a candidate time within ± tolerance."""
+    if not reference:
+        return 1.0
+    hits = sum(1 for t in reference if any(abs(t - c) <= tolerance for c in candidate))
+    return hits / len(reference)
+
+def event_recall(events: list, candidate: list, tolerance: float) -> float:
+    """Share of known change times followed by a frame within 'tolerance' seconds."""
+    if not events:
+        return 1.0
+    hits = sum(1 for e in events if any(e - 1 <= c <= e + tolerance for c in candidate))
+    return hits / len(events)
+
+def run_benchmark(video_path: str, interval: int = 1, tolerance: float = 2.0, events: list = None) -> dict:
+    results = {}
+    for mode in ("stream", *FAST_EXTRACTION_MODES):
+        frames_dir = tempfile.mkdtemp(prefix=f"frames_{mode}_")
+        try:
+            cpu_start, wall_start = _cpu_seconds(), time.perf_counter()
+            frames = extract_frames(video_path, frames_dir, interval=interval, mode=mode)
+            results[mode] = {
+                "wall_s": round(time.perf_counter() - wall_start, 2),
+                "cpu_s": round(_cpu_seconds() - cpu_start, 2),
+                "times": frames.timestamps,  # manifest PTS
+            }
+        finally:
+            shutil.rmtree(frames_dir, ignore_errors=True)
+
+    reference = results["stream"]["times"]
+    for mode, result in results.items():
+        times = result.pop("times")
+        result["frames"] = len(times)
+        result["recall_vs_stream"] = round(recall(reference, times, tolerance), 3)
+        if events is not None:
+            result["event_recall"] = round(event_recall(events, times, tolerance), 3)
+
+    print(f"\n📊 Extraction benchmark: {video_path} (interval {interval}s, tolerance ±{tolerance}s)")
+    for mode, result in results.items():
+        line = (f"   {mode:<10} wall {result['wall_s']:>7.2f}s  CPU {result['cpu_s']:>7.2f}s  "
+                f"frames {result['frames']:>4}  recall vs stream {result['recall_vs_stream']:.3f}")
+        if events is not None:
+            line += f"  event recall {result['event_recall']:.3f}"
+        print(line)
+    return results
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Compare stream vs keyframe-only / scene-select frame extraction.")
+    parser.add_argument("video_path")
+    parser.add_argument("--interval", type=int, default=1)
+    parser.add_argument("--tolerance", type=float, default=2.0)
+    parser.add_argument("--events", help="JSON list of known change times (seconds)")
+    args = parser.parse_args()
+    known_events = None
+    if args.events:
+        with open(args.events) as f:
+            known_events = json.load(f)
+    run_benchmark(args.video_path, args.interval, args.tolerance, known_events)
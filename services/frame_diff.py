@@ -0,0 +1,215 @@
+import numpy as np
+from PIL import Image
+
+# ======================================================
+# 🔥 VECTORIZED FRAME DIFFERENCE ENGINE 🔥
+# ======================================================
+# Frames are stacked into one contiguous (N, H, W) uint8 array and compared
+# against the last kept frame in blocks. MSE/MAD stay in integers: int16 diff
+# (uint8 subtraction wraps) + int32 sums, exact and cheaper than float32.
+
+# --- METRICS ---
+# Every metric takes a (H, W) reference (uint8, or int16 to skip a cast per call)
+# and an (N, H, W) uint8 block and returns N scores. Higher score = more different.
+# A single (H, W) frame returns one scalar score (no block wrapping per call).
+
+def _int_diff(reference: np.ndarray, frames: np.ndarray) -> np.ndarray:
+    """int16 difference, flat per frame - flat rows reduce faster than summing over (H, W)."""
+    if reference.dtype != np.int16:
+        reference = reference.astype(np.int16)
+    diff = np.subtract(frames, reference)
+    return diff.reshape(-1) if frames.ndim == 2 else diff.reshape(len(frames), -1)
+
+def mse(reference: np.ndarray, frames: np.ndarray):
+    """Mean Squared Error per frame."""
+    squared = _int_diff(reference, frames)
+    # Squared in place: 255^2 = 65025 wraps in int16 but is exact read back as uint16
+    np.square(squared, out=squared)
+    return squared.view(np.uint16).sum(axis=-1, dtype=np.uint32) / reference.size
+
+def mean_abs_diff(reference: np.ndarray, frames: np.ndarray):
+    """Mean Absolute Difference per frame (less sensitive to single noisy pixels)."""
+    diff = _int_diff(reference, frames)
+    np.abs(diff, out=diff)
+    return diff.sum(axis=-1, dtype=np.int32) / reference.size
+
+def block_ssim(reference: np.ndarray, frames: np.ndarray, block: int = 8) -> np.ndarray:
+    """
+    Structural dissimilarity (1 - mean SSIM) over non-overlapping blocks.
+    Edges that don't fill a whole block are ignored.
+    """
+    if frames.ndim == 2:
+        return block_ssim(reference, frames[None], block)[0]
+    c1 = (0.01 * 255) ** 2
+    c2 = (0.03 * 255) ** 2
+    reference = reference.astype(np.float32)
+    frames = frames.astype(np.float32)  # only SSIM needs the float window
+
+    h = (reference.shape[0] // block) * block
+    w = (reference.shape[1] // block) * block
+    ref = reference[:h, :w].reshape(h // block, block, w // block, block)
+    cur = frames[:, :h, :w].reshape(len(frames), h // block, block, w // block, block)
+
+    mu_x = ref.mean(axis=(1, 3))
+    var_x = (ref * ref).mean(axis=(1, 3)) - mu_x ** 2
+    mu_y = cur.mean(axis=(2, 4))
+    var_y = (cur * cur).mean(axis=(2, 4)) - mu_y ** 2
+    cov = (cur * ref).mean(axis=(2, 4)) - mu_x * mu_y
+
+    ssim = ((2 * mu_x * mu_y + c1) * (2 * cov + c2)) / ((mu_x ** 2 + mu_y ** 2 + c1) * (var_x + var_y + c2))
+    return 1.0 - ssim.mean(axis=(1, 2))
+
+METRICS = {
+    "mse": mse,
+    "mad": mean_abs_diff,
+    "ssim": block_ssim,
+}
+
+# Score below threshold = static frame (dropped)
+# MSE 2.0 = the value tuned for UI recordings (<1% change)
+# MAD 1.0 = measured: encoder/sensor noise on static screens reaches MAD 0.66-0.91 (MSE <= 1.4),
+#           so 1.0 is the lowest value above it; agrees with MSE 2.0 on 99% of frame pairs.
+#           Smaller than MSE on tiny edits (a few pixels) - MSE stays the default.
+DEFAULT_THRESHOLDS = {
+    "mse": 2.0,
+    "mad": 1.0,
+    "ssim": 0.01,
+}
+
+# --- CHANGE LOCALIZATION ---
+# Screen recordings mostly change in a small region (dropdown, typed field).
+# The frame is cut into tiles; tiles whose mean absolute difference crosses the
+# threshold form the changed region, returned as a normalized (x0, y0, x1, y1) box.
+
+def tile_diffs(reference: np.ndarray, frame: np.ndarray, tile: int = 10) -> np.ndarray:
+    """(rows, cols) mean absolute difference per tile. Edges that don't fill a whole tile are ignored."""
+    h = (reference.shape[0] // tile) * tile
+    w = (reference.shape[1] // tile) * tile
+    if frame.dtype.kind in "iu" and reference.dtype.kind in "iu":
+        diff = np.abs(np.subtract(frame[:h, :w], reference[:h, :w], dtype=np.int16))
+        acc = np.int32
+    else:
+        diff = np.abs(np.subtract(frame[:h, :w], reference[:h, :w], dtype=np.float32))
+        acc = np.float32
+    edges = np.arange(0, h, tile), np.arange(0, w, tile)
+    # reduceat = tile sums without the strided 4-D mean (twice as fast on 100x100)
+    sums = np.add.reduceat(np.add.reduceat(diff, edges[1], axis=1, dtype=acc), edges[0], axis=0)
+    return sums / (tile * tile)
+
+def changed_region(reference: np.ndarray, frame: np.ndarray, tile: int = 10, threshold: float = 2.0):
+    """
+    Bounding box of the changed tiles as (x0, y0, x1, y1) fractions of the frame,
+    or None when no single tile crosses the threshold (change spread thin = whole screen).
+    """
+    diffs = tile_diffs(reference, frame, tile)
+    rows, cols = np.nonzero(diffs >= threshold)
+    if rows.size == 0:
+        return None
+    n_rows, n_cols = diffs.shape
+    return (float(cols.min() / n_cols), float(rows.min() / n_rows),
+            float((cols.max() + 1) / n_cols), float((rows.max() + 1) / n_rows))
+
+def merge_regions(a, b):
+    """Union of two boxes (None = whole frame wins)."""
+    if a is None or b is None:
+        return None
+    return (min(a[0], b[0]), min(a[1], b[1]), max(a[2], b[2]), max(a[3], b[3]))
+
+# --- KEYFRAME SELECTOR ---
+class KeyframeSelector:
+    """
+    Keeps the "compare to last kept frame" behaviour, but scores a whole window
+    of upcoming frames in one vectorized pass. The window grows while the screen
+    is static and shrinks when changes come quickly, so busy videos don't waste work.
+
+    Blocks can be pushed one after another (e.g. straight from an ffmpeg pipe);
+    frame indices stay global across pushes.
+
+    Every kept frame's changed region vs the previous kept frame is recorded in
+    'regions' (global index -> box, None for the first frame / whole-screen changes).
+    tile=0 skips the localization (all regions None) - only ROI crops need it.
+    """
+
+    def __init__(self, metric: str = "mse", threshold: float = None, min_window: int = 1, max_window: int = 16,
+                 tile: int = 10, tile_threshold: float = 2.0):
+        if metric not in METRICS:
+            raise ValueError(f"Unknown frame diff metric '{metric}'. Options: {list(METRICS)}")
+        self.metric = metric
+        self.score_fn = METRICS[metric]
+        self.threshold = DEFAULT_THRESHOLDS[metric] if threshold is None else threshold
+        self.min_window = min_window
+        self.max_window = max_window
+        self.window = min_window
+        self.tile = tile
+        self.tile_threshold = tile_threshold
+
+        self.reference = None  # int16 copy of the last kept frame
+        self.seen = 0          # frames consumed so far (global index offset)
+        self.regions = {}
+
+    def push(self, frames: np.ndarray):
+        """
+        Consumes an (N, H, W) block. Returns (kept_indices, kept_scores) for this block,
+        with indices relative to the whole stream. The very first frame is always kept (score inf).
+        """
+        frames = np.ascontiguousarray(frames)
+        n = len(frames)
+        kept_indices = []
+        kept_scores = []
+        i = 0
+
+        if self.reference is None and n:
+            self.reference = frames[0].astype(np.int16)
+            kept_indices.append(self.seen)
+            kept_scores.append(float("inf"))
+            self.regions[self.seen] = None
+            i = 1
+
+        while i < n:
+            end = min(i + self.window, n)
+            if end - i == 1:
+                # Busy stretch, one frame per call: scalar score, no block/mask/argmax overhead
+                score = float(self.score_fn(self.reference, frames[i]))
+                first = 0 if score >= self.threshold else -1
+            else:
+                scores = self.score_fn(self.reference, frames[i:end])
+                changed = scores >= self.threshold
+                first = int(changed.argmax())
+                if not changed[first]:
+                    first = -1
+                score = float(scores[first])
+
+            if first < 0:
+                # Static stretch -> look further ahead next time
+                self.window = min(self.window * 2, self.max_window)
+                i = end
+                continue
+
+            j = i + first
+            kept_indices.append(self.seen + j)
+            kept_scores.append(score)
+            self.regions[self.seen + j] = (changed_region(self.reference, frames[j], self.tile, self.tile_threshold)
+                                           if self.tile else None)
+            self.reference = frames[j].astype(np.int16)
+            # Next window = the static run just seen: back-to-back changes score one frame at a time
+            self.window = max(self.min_window, min(self.max_window, first + 1))
+            i = j + 1
+
+        self.seen += n
+        return kept_indices, kept_scores
+
+def select_keyframes(frames: np.ndarray, metric: str = "mse", threshold: float = None):
+    """One-shot helper: returns (kept_indices, kept_scores) for an (N, H, W) stack."""
+    return KeyframeSelector(metric=metric, threshold=threshold).push(frames)
+
+# --- PERCEPTUAL HASH ---
+def compute_dhash(image, hash_size: int = 8) -> str:
+    """
+    Difference hash (64 bit by default) of an image path or PIL image, as hex.
+    The same UI screen gives the same hash even after re-encoding / re-recording.
+    """
+    if not isinstance(image, Image.Image):
+        image = Image.open(image)
+    pixels = np.asarray(image.convert("L").resize((hash_size + 1, hash_size)), dtype=np.int16)
+    bits = (pixels[:, 1:] > pixels[:, :-1]).ravel()
+    return f"{int(''.join('1' if b else '0' for b in bits), 2):0{hash_size * hash_size // 4}x}"
@@ -0,0 +1,107 @@
+import time
+import argparse
+import numpy as np
+from services.frame_diff import KeyframeSelector, METRICS, DEFAULT_THRESHOLDS
+from services.processing import COMPARE_SIZE, DIFF_BLOCK_SIZE
+
+# ======================================================
+# 🔥 FRAME DIFF BENCHMARK (vectorized selector vs per-pair loop) 🔥
+# ======================================================
+# Usage: python -m services.frame_diff_benchmark [--frames 1000 10000 50000] [--max-run 20] [--metric mse] [--roi]
+# Synthetic 100x100 grayscale "screen": static stretches (1..max-run frames, light noise) ke baad
+# naya screen. Frames 256 ke blocks mein bante hain (jaise ffmpeg pipe se aate hain), dono
+# engines ko same blocks milte hain. Decode time shamil nahi - sirf comparison.
+# --roi = selector changed regions bhi nikalta hai (ROI_CROP_ENABLED path; purane loop mein yeh kaam tha hi nahi).
+
+def synthetic_blocks(total: int, max_run: int, seed: int = 0, block_size: int = DIFF_BLOCK_SIZE):
+    """Yields (N, 100, 100) uint8 blocks. Same seed = same frames, so both engines see identical input."""
+    rng = np.random.default_rng(seed)
+    screen = rng.integers(0, 256, (COMPARE_SIZE, COMPARE_SIZE), dtype=np.uint8)
+    run_left = int(rng.integers(1, max_run + 1))
+    produced = 0
+    while produced < total:
+        n = min(block_size, total - produced)
+        block = np.empty((n, COMPARE_SIZE, COMPARE_SIZE), dtype=np.uint8)
+        for k in range(n):
+            if run_left == 0:
+                # New screen: a random rectangle changes (dialog, typed field, page switch)
+                screen = screen.copy()
+                h, w = rng.integers(10, COMPARE_SIZE, 2)
+                y, x = rng.integers(0, COMPARE_SIZE - h + 1), rng.integers(0, COMPARE_SIZE - w + 1)
+                screen[y:y + h, x:x + w] = rng.integers(0, 256, (h, w), dtype=np.uint8)
+                run_left = int(rng.integers(1, max_run + 1))
+            noise = rng.integers(-1, 2, screen.shape)  # encoder noise, far below the threshold
+            block[k] = np.clip(screen.astype(np.int16) + noise, 0, 255)
+            run_left -= 1
+        produced += n
+        yield block
+
+def per_pair_loop(blocks, metric: str = "mse", threshold: float = None) -> list:
+    """
+    The old filter as it was: one frame at a time against the last kept frame.
+    "mse" is the original np.mean((a - b) ** 2) on uint8 arrays (wraps around);
+    other metrics use the same score function as the selector, one pair per call.
+    """
+    score_fn = METRICS[metric]
+    threshold = DEFAULT_THRESHOLDS[metric] if threshold is None else threshold
+    kept, reference, seen = [], None, 0
+    for block in blocks:
+        for frame in block:
+            if reference is None:
+                keep = True
+            elif metric == "mse":
+                keep = np.mean((reference - frame) ** 2) >= threshold
+            else:
+                keep = score_fn(reference, frame[None])[0] >= threshold
+            if keep:
+                kept.append(seen)
+                reference = frame
+            seen += 1
+    return kept
+
+def vectorized(blocks, metric: str = "mse", threshold: float = None, tile: int = 0) -> list:
+    selector = KeyframeSelector(metric=metric, threshold=threshold, tile=tile)
+    kept = []
+    for block in blocks:
+        kept.extend(selector.push(block)[0])
+    return kept
+
+def _timed(fn, blocks, repeat: int = 3, **kwargs):
+    # Best of N runs: a single run on a shared box is mostly scheduler noise
+    best, kept = float("inf"), None
+    for _ in range(repeat):
+        start = time.perf_counter()
+        kept = fn(blocks, **kwargs)
+        best = min(best, time.perf_counter() - start)
+    return best, kept
+
+def run_benchmark(sizes: list, max_run: int = 20, metric: str = "mse", seed: int = 0, roi: bool = False) -> dict:
+    results = {}
+    print(f"\n📊 Frame diff benchmark: metric {metric}, static stretches 1-{max_run} frames, "
+          f"changed regions {'on' if roi else 'off'}")
+    for total in sizes:
+        # Frames are generated up front so only the comparison is timed
+        blocks = list(synthetic_blocks(total, max_run, seed))
+        loop_s, loop_kept = _timed(per_pair_loop, blocks, metric=metric)
+        vec_s, vec_kept = _timed(vectorized, blocks, metric=metric, tile=10 if roi else 0)
+        results[total] = {
+            "loop_s": round(loop_s, 3),
+            "vectorized_s": round(vec_s, 3),
+            "speedup": round(loop_s / vec_s, 2) if vec_s else 0.0,
+            "kept": len(vec_kept),
+            "same_frames": loop_kept == vec_kept,
+        }
+        r = results[total]
+        print(f"   {total:>6} frames  loop {r['loop_s']:>7.3f}s  vectorized {r['vectorized_s']:>7.3f}s  "
+              f"speedup {r['speedup']:>5.2f}x  kept {r['kept']:>5}  same frames {r['same_frames']}")
+    return results
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Compare the vectorized KeyframeSelector with the per-pair loop.")
+    parser.add_argument("--frames", type=int, nargs="+", default=[1000, 10000, 50000])
+    parser.add_argument("--max-run", type=int, default=20, help="longest static stretch (frames)")
+    parser.add_argument("--metric", choices=list(METRICS), default="mse")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--roi", action="store_true", help="also localize changed regions (ROI crops)")
+    args = parser.parse_args()
+    run_benchmark(args.frames, args.max_run, args.metric, args.seed, args.roi)
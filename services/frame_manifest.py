@@ -0,0 +1,127 @@
+import os
+import re
+import json
+import numpy as np
+from services.frame_diff import compute_dhash
+
+# ======================================================
+# 🔥 FRAME MANIFEST (index, PTS, path, hash, diff score) 🔥
+# ======================================================
+# Extraction ke waqt bana ek compact array jo filter -> generation -> persistence tak saath chalta hai.
+# Koi stage directory dobara list nahi karta, na file name / list position se time guess karta hai.
+# Disk par frames/frames.json: staged pipeline ke workers aur resumed runs isi ko load karte hain.
+
+MANIFEST_FILENAME = "frames.json"
+MANIFEST_VERSION = 1
+
+# One row per kept frame. hash = 64-bit dHash, score = diff vs the previous kept frame
+# (inf = first frame, nan = unknown; both stored as null), roi = changed region vs the
+# previous kept frame as normalized (x0, y0, x1, y1) (nan = whole frame, stored as null)
+FRAME_DTYPE = np.dtype([
+    ("index", np.int32),
+    ("pts", np.float64),
+    ("hash", np.uint64),
+    ("score", np.float32),
+    ("roi", np.float32, (4,)),
+])
+_NO_ROI = (np.nan,) * 4
+
+_FRAME_NAME_RE = re.compile(r"frame_(\d+)\.jpg$")
+
+def frame_sample_index(frame_path: str) -> int:
+    """frame_001.jpg -> 0. Index of the sampled frame, i.e. timestamp = index * interval."""
+    return int(_FRAME_NAME_RE.search(os.path.basename(frame_path)).group(1)) - 1
+
+class FrameManifest:
+    def __init__(self, frames_dir: str, records: np.ndarray = None, names: list = None):
+        self.frames_dir = frames_dir
+        self.records = records if records is not None else np.empty(0, dtype=FRAME_DTYPE)
+        self.names = list(names or [])
+
+    @classmethod
+    def build(cls, frames_dir: str, frames: list):
+        """
+        frames: [(sample index, pts seconds, file name, diff score, changed region or None)] in time order.
+        Frames whose file wasn't written are dropped; the dHash is computed from the written JPEG.
+        """
+        rows, names = [], []
+        for index, pts, name, score, region in frames:
+            path = os.path.join(frames_dir, name)
+            try:
+                frame_hash = int(compute_dhash(path), 16)
+            except Exception as e:
+                print(f"⚠️ Frame {name} missing from the manifest: {e}")
+                continue
+            rows.append((index, pts, frame_hash, score, _NO_ROI if region is None else region))
+            names.append(name)
+        return cls(frames_dir, np.array(rows, dtype=FRAME_DTYPE), names)
+
+    @classmethod
+    def from_directory(cls, frames_dir: str, interval: int = 1, scores: dict = None, regions: dict = None):
+        """Frames already on disk (disk mode / old runs): time from the sampled index in the name."""
+        # Numeric order: frame_1000.jpg comes after frame_999.jpg
+        names = sorted((f for f in os.listdir(frames_dir) if _FRAME_NAME_RE.search(f)), key=frame_sample_index)
+        frames = []
+        for name in names:
+            index = frame_sample_index(name)
+            frames.append((index, index * interval, name, (scores or {}).get(index, np.nan), (regions or {}).get(index)))
+        return cls.build(frames_dir, frames)
+
+    @classmethod
+    def load(cls, frames_dir: str):
+        """Manifest written at extraction, or None (e.g. frames from before manifests existed)."""
+        try:
+            with open(os.path.join(frames_dir, MANIFEST_FILENAME)) as f:
+                data = json.load(f)
+        except (OSError, ValueError):
+            return None
+        if data.get("version") != MANIFEST_VERSION:
+            return None
+        rows = []
+        for row in data["frames"]:
+            index, pts, _, frame_hash, score = row[:5]
+            region = row[5] if len(row) > 5 else None  # manifests from before ROI have 5 columns
+            rows.append((index, pts, int(frame_hash, 16), np.nan if score is None else score,
+                         _NO_ROI if region is None else region))
+        return cls(frames_dir, np.array(rows, dtype=FRAME_DTYPE), [row[2] for row in data["frames"]])
+
+    def save(self):
+        rows = [
+            [int(r["index"]), round(float(r["pts"]), 3), name, self._hex(r["hash"]),
+             float(r["score"]) if np.isfinite(r["score"]) else None,  # JSON has no inf/nan
+             self._region(r["roi"])]
+            for r, name in zip(self.records, self.names)
+        ]
+        with open(os.path.join(self.frames_dir, MANIFEST_FILENAME), "w") as f:
+            json.dump({"version": MANIFEST_VERSION, "columns": ["index", "pts", "name", "hash", "score", "roi"],
+                       "frames": rows}, f)
+
+    # --- VIEWS (what the generation stage reads) ---
+    def __len__(self):
+        return len(self.records)
+
+    @property
+    def paths(self) -> list:
+        return [os.path.join(self.frames_dir, name) for name in self.names]
+
+    @property
+    def timestamps(self) -> list:
+        return self.records["pts"].tolist()
+
+    @property
+    def hashes(self) -> list:
+        """dHash hex strings, same format as compute_dhash (cache keys stay compatible)."""
+        return [self._hex(h) for h in self.records["hash"]]
+
+    @property
+    def regions(self) -> list:
+        """Changed region per frame as (x0, y0, x1, y1) fractions, None = whole frame."""
+        return [self._region(roi) for roi in self.records["roi"]]
+
+    @staticmethod
+    def _region(roi):
+        return None if np.isnan(roi).any() else [round(float(v), 4) for v in roi]
+
+    @staticmethod
+    def _hex(value) -> str:
+        return f"{int(value):016x}"
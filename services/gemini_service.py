@@ -3,15 +3,19 @@ import os
 import json
 import time
 import re
-import google.generativeai as genai
 from core.config import settings
+from core.lazy import providers
+from services.transcript_index import TranscriptIndex
+from services.frame_manifest import FrameManifest
 
-# Configure Gemini
+# Configure Gemini (lazily - google.generativeai is a heavy import)
+def _configure_gemini():
+    import google.generativeai as genai
+    genai.configure(api_key=settings.GOOGLE_API_KEY)
+    return genai
 
-api_key_google= settings.GOOGLE_API_KEY
-genai.configure(api_key=api_key_google)
-
-model_flash = genai.GenerativeModel("gemini-2.5-flash")
+providers.register("gemini", _configure_gemini)
+providers.register("gemini_flash", lambda: providers.get("gemini").GenerativeModel("gemini-2.5-flash"))
 
 # --- HELPER: JSON CLEANER ---
 def _clean_json_response(response_text: str):
@@ -24,23 +28,6 @@ def _clean_json_response(response_text: str):
     except Exception:
         return response_text
 
-# --- HELPER: AUDIO CONTEXT ---
-def _get_audio_context_for_timestamp(timestamp, transcript):
-    if not transcript:
-        return None
-    
-    context_text = []
-    for segment in transcript:
-        start = segment.get("start", 0)
-        end = segment.get("end", 0)
-        text = segment.get("text", "")
-        
-        # Buffer: 2 seconds before and after
-        if (start - 2.0 <= timestamp <= end + 2.0):
-            context_text.append(text)
-    
-    return " ".join(context_text) if context_text else None
-
 # --- TRANSCRIPTION (Fixed: Thora Lenient) ---
 def transcribe_audio_gemini(audio_path: str):
     if not audio_path or not os.path.exists(audio_path):
@@ -48,6 +35,8 @@ def transcribe_audio_gemini(audio_path: str):
 
     print("✨ Uploading Audio to Gemini...")
     try:
+        genai = providers.get("gemini")
+        model_flash = providers.get("gemini_flash")
         audio_file = genai.upload_file(path=audio_path)
         print("🧠 Gemini Hearing: Analyzing audio...")
         
@@ -74,23 +63,30 @@ def transcribe_audio_gemini(audio_path: str):
 # ======================================================
 # 🔥 THE ENTERPRISE GENERATOR LOGIC (With Logs) 🔥
 # ======================================================
-def generate_documentation_steps(transcript: list, frames_dir: str, interval: int = 2):
+def generate_documentation_steps(transcript: list, frames, interval: int = 2):
+    """frames: FrameManifest from extraction (or its frames dir); timestamps come from the manifest."""
     print("🔹 Mode: Enterprise Production Flow")
     generated_steps = []
+    genai = providers.get("gemini")
+    model_flash = providers.get("gemini_flash")
     
-    # 1. Get all frames
-    frames_paths = sorted([
-        os.path.join(frames_dir, f) for f in os.listdir(frames_dir) if f.endswith(".jpg")
-    ])
+    # 1. Get all frames (kept frames only - static ones were dropped, so index * interval is NOT their time)
+    if not isinstance(frames, FrameManifest):
+        frames = FrameManifest.load(frames) or FrameManifest.from_directory(frames, interval)
+    frames_paths = frames.paths
     
     total_frames = len(frames_paths)
     print(f"📊 Total Frames to Analyze: {total_frames}")
 
+    # Audio context for all frames in one sweep
+    timestamps = frames.timestamps
+    audio_contexts = TranscriptIndex(transcript).contexts_for(timestamps)
+
     # 2. Iterate EVERY frame
     for i, frame_path in enumerate(frames_paths):
         
-        timestamp = i * interval
-        audio_text = _get_audio_context_for_timestamp(timestamp, transcript)
+        timestamp = timestamps[i]
+        audio_text = audio_contexts[i]
         
         # --- LOGGING ADDED: USER KO DIKHAO KYA HO RAHA HAI ---
         print(f"   -> Processing Frame {i+1}/{total_frames} at {timestamp}s | Audio: {'✅' if audio_text else '🔇'}")
@@ -0,0 +1,117 @@
+import io
+from PIL import Image
+from core.config import settings
+
+# ======================================================
+# 🔥 IMAGE PAYLOAD OPTIMIZER (before base64) 🔥
+# ======================================================
+# 1440p/4K frames go out as multi-hundred-KB JPEGs. The vision model doesn't
+# need that many pixels to read a UI, so we shrink the payload in memory:
+# downscale to a max long edge -> (optional) grayscale -> re-encode JPEG/WebP.
+# ROI crop: sirf badla hua hissa (+ margin) bhejo, saath mein optional chhota full-frame thumbnail.
+
+_MIME_TYPES = {"jpeg": "image/jpeg", "webp": "image/webp"}
+
+def crop_box(region, margin: float = 0.1, max_area: float = 0.5):
+    """
+    Changed region (normalized x0, y0, x1, y1) -> crop box with 'margin' of context on every side.
+    None = send the whole frame (no region, or the crop wouldn't be much smaller).
+    """
+    if region is None:
+        return None
+    x0, y0, x1, y1 = region
+    box = (max(0.0, x0 - margin), max(0.0, y0 - margin), min(1.0, x1 + margin), min(1.0, y1 + margin))
+    if (box[2] - box[0]) * (box[3] - box[1]) > max_area:
+        return None
+    return tuple(round(v, 4) for v in box)
+
+class ImagePayloadOptimizer:
+    def __init__(self, max_edge: int = 1568, image_format: str = "jpeg", quality: int = 85, grayscale: bool = False):
+        if image_format not in _MIME_TYPES:
+            raise ValueError(f"Unsupported image format '{image_format}'. Options: {list(_MIME_TYPES)}")
+        self.max_edge = max_edge
+        self.image_format = image_format
+        self.quality = quality
+        self.grayscale = grayscale
+
+        # Per-video report
+        self.images = 0
+        self.crops = 0
+        self.thumbnails = 0
+        self.original_bytes = 0
+        self.optimized_bytes = 0
+
+    @classmethod
+    def from_settings(cls):
+        return cls(
+            max_edge=settings.IMAGE_MAX_EDGE,
+            image_format=settings.IMAGE_FORMAT,
+            quality=settings.IMAGE_QUALITY,
+            grayscale=settings.IMAGE_GRAYSCALE,
+        )
+
+    def optimize(self, source, crop=None):
+        """
+        source: file path, raw bytes or PIL image.
+        crop: normalized (x0, y0, x1, y1) box (see crop_box) - only that part is sent.
+        Returns (payload_bytes, mime_type). Falls back to the original bytes
+        if re-encoding doesn't make the payload smaller.
+        """
+        original = None
+        if isinstance(source, Image.Image):
+            image = source
+        else:
+            if isinstance(source, (bytes, bytearray)):
+                original = bytes(source)
+            else:
+                with open(source, "rb") as f:
+                    original = f.read()
+            image = Image.open(io.BytesIO(original))
+        source_mime = Image.MIME.get(image.format, "image/jpeg")
+
+        image = image.convert("L" if self.grayscale else "RGB")
+        if crop is not None:
+            width, height = image.size
+            image = image.crop((round(crop[0] * width), round(crop[1] * height),
+                                round(crop[2] * width), round(crop[3] * height)))
+            self.crops += 1
+        payload, mime = self._encode(image, self.max_edge)
+
+        if original is not None and crop is None and len(original) <= len(payload):
+            payload, mime = original, source_mime
+
+        self.images += 1
+        self.original_bytes += len(original) if original is not None else len(payload)
+        self.optimized_bytes += len(payload)
+        return payload, mime
+
+    def thumbnail(self, source, max_edge: int):
+        """Small full-frame view sent next to a crop. Counted as extra payload in the report."""
+        mode = "L" if self.grayscale else "RGB"
+        if isinstance(source, Image.Image):
+            payload, mime = self._encode(source.convert(mode), max_edge)
+        else:
+            with Image.open(source) as image:  # path: close the file handle once encoded
+                payload, mime = self._encode(image.convert(mode), max_edge)
+        self.thumbnails += 1
+        self.optimized_bytes += len(payload)
+        return payload, mime
+
+    def _encode(self, image, max_edge):
+        if max_edge and max(image.size) > max_edge:
+            image.thumbnail((max_edge, max_edge), Image.LANCZOS)
+        buffer = io.BytesIO()
+        image.save(buffer, format=self.image_format.upper(), quality=self.quality)
+        return buffer.getvalue(), _MIME_TYPES[self.image_format]
+
+    def report(self) -> dict:
+        saved = self.original_bytes - self.optimized_bytes
+        return {
+            "images": self.images,
+            "crops": self.crops,
+            "thumbnails": self.thumbnails,
+            "original_kb": round(self.original_bytes / 1024, 1),
+            "optimized_kb": round(self.optimized_bytes / 1024, 1),
+            "saved_kb": round(saved / 1024, 1),
+            "saved_pct": round(100 * saved / self.original_bytes, 1) if self.original_bytes else 0.0,
+        }
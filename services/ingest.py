@@ -0,0 +1,43 @@
+import os
+import re
+import uuid
+import hashlib
+from core.config import settings
+from services.cache import hash_file
+
+# ======================================================
+# 🔥 INGESTION (streaming content hash of source videos) 🔥
+# ======================================================
+# Upload disk par 1 MB chunks mein likhi jati hai aur usi loop mein SHA-256 update hota hai:
+# badi se badi video bhi kabhi poori memory mein nahi aati, aur hash ke liye dobara parhni nahi parti.
+# Hash db/video_dedup.py mein duplicate uploads pakarne ke kaam aata hai.
+
+UPLOAD_CHUNK_SIZE = 1024 * 1024
+_SAFE_EXTENSION = re.compile(r"\.[a-z0-9]{1,5}")
+
+def save_upload(stream, filename: str = None, upload_dir: str = None):
+    """Copies a file-like 'stream' into upload_dir under a random name. Returns (path, sha256 hex)."""
+    upload_dir = upload_dir or settings.UPLOAD_DIR
+    os.makedirs(upload_dir, exist_ok=True)
+    extension = os.path.splitext(filename or "")[1].lower()
+    if not _SAFE_EXTENSION.fullmatch(extension):
+        extension = ".mp4"
+    path = os.path.join(upload_dir, f"{uuid.uuid4().hex}{extension}")
+
+    digest = hashlib.sha256()
+    try:
+        with open(path, "wb") as out:
+            for chunk in iter(lambda: stream.read(UPLOAD_CHUNK_SIZE), b""):
+                digest.update(chunk)
+                out.write(chunk)
+    except Exception:
+        if os.path.exists(path):
+            os.remove(path)  # half-written upload
+        raise
+    return path, digest.hexdigest()
+
+def source_content_hash(video_url: str):
+    """Streaming SHA-256 of a local source file. None for remote URLs or missing files (no dedup)."""
+    if not video_url or "://" in video_url or not os.path.isfile(video_url):
+        return None
+    return hash_file(video_url)
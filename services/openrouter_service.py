@@ -1,4 +1,3 @@
-
 import os
 import json
 import time
@@ -6,21 +5,85 @@ import re
 import base64
 import asyncio
 from openai import AsyncOpenAI
-from tenacity import retry, stop_after_attempt, wait_exponential, retry_if_exception_type
+from tenacity import retry, stop_after_attempt, wait_exponential, retry_if_exception, RetryError
 from core.config import settings
+from core.async_runtime import runtime, run_async, create_http_client, http_metrics, gather_or_cancel, cancel_tasks
+from services.concurrency import get_limiter, is_retryable_error, get_retry_after, error_status
+from services.distributed_limiter import get_cluster_limiter, estimate_tokens
+from services.cache import get_cache, make_cache_key
+from services.frame_diff import compute_dhash
+from services.transcript_index import TranscriptIndex, AUDIO_CONTEXT_BUFFER
+from services.image_optimizer import ImagePayloadOptimizer, crop_box
+from services.step_dedup import dedup_steps, FrameDuplicatePredictor
+from services.frame_manifest import FrameManifest
 
-client = AsyncOpenAI(
-    base_url="https://integrate.api.nvidia.com/v1",
-    api_key=settings.NVIDIA_API_KEY,
-)
 MODEL_NAME = settings.NVIDIA_MODEL_NAME
 
+# One client (and connection pool) per event loop - normally the worker's persistent loop
+_client = None
+_client_loop = None
+
+# Bump this whenever the prompts below change (old cached results stop matching)
+PROMPT_VERSION = "sop-v1"
+BATCH_PROMPT_VERSION = "sop-batch-v1"
+
+# Set once the provider rejects multi-image requests -> single frames for the rest of this worker's life
+_batch_mode_rejected = False
+# Statuses that (on a multi-image request) mean "too many images / payload too large"
+_BATCH_REJECT_STATUSES = (400, 413, 422)
+
+_llm_cache = None
+
+# --- CLIENT ---
+def get_client() -> AsyncOpenAI:
+    """Client bound to the running loop, with a keep-alive (HTTP/2) pool reused across videos."""
+    global _client, _client_loop
+    loop = asyncio.get_running_loop()
+    if _client is None or _client_loop is not loop:
+        _client = AsyncOpenAI(
+            base_url="https://integrate.api.nvidia.com/v1",
+            api_key=settings.NVIDIA_API_KEY,
+            http_client=create_http_client(),
+        )
+        _client_loop = loop
+        if loop is runtime.loop:
+            runtime.add_closer(_client.close)
+    return _client
+
 # --- HELPERS ---
 def encode_image(image_path):
     """Encodes an image to Base64 for the API."""
     with open(image_path, "rb") as image_file:
         return base64.b64encode(image_file.read()).decode('utf-8')
 
+def _frame_data_url(frame_path, optimizer=None, crop=None):
+    """Data URL for the API. With an optimizer, the frame is shrunk in memory first."""
+    if optimizer is None and crop is None:
+        return f"data:image/jpeg;base64,{encode_image(frame_path)}"
+    if optimizer is None:
+        optimizer = ImagePayloadOptimizer(max_edge=0, quality=95)  # a crop needs a re-encode anyway
+    return _data_url(*optimizer.optimize(frame_path, crop))
+
+def _data_url(payload, mime):
+    return f"data:{mime};base64,{base64.b64encode(payload).decode('utf-8')}"
+
+def _frame_image_parts(frame_path, optimizer=None, crop=None):
+    """image_url parts for one frame: the full frame, or the changed region + a small full-frame thumbnail."""
+    parts = [{"type": "image_url", "image_url": {"url": _frame_data_url(frame_path, optimizer, crop)}}]
+    if crop is not None and settings.ROI_THUMBNAIL_EDGE:
+        thumbnail = (optimizer or ImagePayloadOptimizer()).thumbnail(frame_path, settings.ROI_THUMBNAIL_EDGE)
+        parts.append({"type": "image_url", "image_url": {"url": _data_url(*thumbnail)}})
+    return parts
+
+def _frame_crop(region):
+    """Manifest region -> crop box for the request (None = whole frame)."""
+    if not settings.ROI_CROP_ENABLED:
+        return None
+    return crop_box(region, margin=settings.ROI_MARGIN, max_area=settings.ROI_MAX_AREA)
+
+def _new_payload_optimizer():
+    return ImagePayloadOptimizer.from_settings() if settings.IMAGE_OPTIMIZER_ENABLED else None
+
 def _clean_json_response(response_text: str):
     """Cleans Markdown formatting from JSON response."""
     try:
@@ -32,44 +95,8 @@ def _clean_json_response(response_text: str):
     except Exception:
         return response_text
 
-def _get_audio_context_for_timestamp(timestamp, transcript):
-    """Finds relevant audio text for a specific timestamp (with buffer)."""
-    if not transcript:
-        return None
-    context_text = []
-    for segment in transcript:
-        start = segment.get("start", 0)
-        end = segment.get("end", 0)
-        text = segment.get("text", "")
-        # Buffer: 2 seconds before and after
-        if (start - 2.0 <= timestamp <= end + 2.0):
-            context_text.append(text)
-    return " ".join(context_text) if context_text else None
-
-# --- SAFETY WRAPPER: RETRY MECHANISM ---
-@retry(
-    stop=stop_after_attempt(5),
-    wait=wait_exponential(multiplier=1, min=2, max=10),
-    retry=retry_if_exception_type(Exception)
-)
-async def _call_api_with_retry(model, messages, temperature):
-    return await client.chat.completions.create(
-        model=model,
-        messages=messages,
-        temperature=temperature
-    )
-
-# --- ASYNC WORKER: PROCESS SINGLE FRAME ---
-async def process_single_frame(semaphore, i, total_frames, frame_path, timestamp, audio_text):
-    async with semaphore:
-        print(f"   -> 🚀 Sending Frame {i+1}/{total_frames} at {timestamp}s...")
-        
-        try:
-            base64_image = encode_image(frame_path)
-            
-            # --- THE "STRIPE/ATLASSIAN" STYLE PROMPT ---
-            
-            system_prompt = """
+# --- THE "STRIPE/ATLASSIAN" STYLE PROMPT ---
+SYSTEM_PROMPT = """
             You are a Lead Documentation Architect for a Tier-1 Enterprise SaaS (like Stripe, AWS, or Atlassian).
             Your goal is to write rich, context-aware, and highly professional SOP steps.
 
@@ -80,10 +107,8 @@ async def process_single_frame(semaphore, i, total_frames, frame_path, timestamp
             }
             """
 
-            user_prompt = f"""
-            Analyze the UI screenshot at timestamp {timestamp}s.
-            **AUDIO CONTEXT:** "{audio_text if audio_text else 'NO AUDIO - INFER CONTEXT FROM VISUALS'}"
-
+# Shared by the single-frame and the batched prompt
+ENTERPRISE_STANDARD = """
             ---
             ### 🚀 THE "ENTERPRISE QUALITY" STANDARD:
             
@@ -107,7 +132,19 @@ async def process_single_frame(semaphore, i, total_frames, frame_path, timestamp
             - **Translator:** "Select the **Translator** icon in the top-right header to open the localization panel and adjust language preferences."
             - **Settings:** "Navigate to the **Settings** tab on the left sidebar to access global account configurations."
             - **Input:** "Enter the customer's full legal name into the **Client Name** field to initialize the record creation process."
+"""
 
+# ROI crop: the model is told what the zoomed-in image is
+CROP_NOTE = """
+            **IMAGES:** The first image is a close-up of the screen region that changed since the previous step.
+            The second one (if attached) is a small thumbnail of the whole screen, for orientation only.
+"""
+
+def _single_user_prompt(timestamp, audio_text, cropped=False):
+    return f"""
+            Analyze the UI screenshot at timestamp {timestamp}s.
+            **AUDIO CONTEXT:** "{audio_text if audio_text else 'NO AUDIO - INFER CONTEXT FROM VISUALS'}"
+{CROP_NOTE if cropped else ""}{ENTERPRISE_STANDARD}
             **5. STATIC CHECK:**
                If the screen is idle, blurry, or shows no meaningful interaction, return:
                {{ "title": "skip", "description": "skip" }}
@@ -115,6 +152,189 @@ async def process_single_frame(semaphore, i, total_frames, frame_path, timestamp
             **GENERATE THE SOP STEP NOW:**
             """
 
+# --- BATCHED PROMPT (K frames per request, long standard paid once) ---
+BATCH_SYSTEM_PROMPT = """
+            You are a Lead Documentation Architect for a Tier-1 Enterprise SaaS (like Stripe, AWS, or Atlassian).
+            Your goal is to write rich, context-aware, and highly professional SOP steps.
+            You will receive several consecutive UI screenshots, each labelled "Frame N".
+
+            **OUTPUT FORMAT (JSON ARRAY ONLY, one object per frame, in order):**
+            [
+                {
+                    "frame": 1,
+                    "title": "Action-Oriented Header",
+                    "description": "Detailed, Explanatory, Clear, Accurate, Pixel Perfect, Precise and Complete instructions with inferred technical context."
+                }
+            ]
+            """
+
+def _batch_user_prompt(frames):
+    """frames: list of (timestamp, audio_text, cropped) in the same order as the attached images."""
+    lines = []
+    for n, (timestamp, audio_text, cropped) in enumerate(frames, start=1):
+        audio = audio_text if audio_text else "NO AUDIO - INFER CONTEXT FROM VISUALS"
+        view = " | **CLOSE-UP** of the changed region" if cropped else ""
+        lines.append(f'            - **Frame {n}** at {timestamp}s | **AUDIO CONTEXT:** "{audio}"{view}')
+    frame_lines = "\n".join(lines)
+    crop_note = ""
+    if any(cropped for _, _, cropped in frames):
+        crop_note = """
+            A CLOSE-UP frame shows only the screen region that changed since the previous step,
+            optionally followed by a small thumbnail of the whole screen (for orientation only).
+"""
+    return f"""
+            Analyze the {len(frames)} UI screenshots below. Write ONE SOP step per frame.
+{frame_lines}
+{crop_note}{ENTERPRISE_STANDARD}
+            **5. STATIC CHECK (per frame):**
+               If a frame is idle, blurry, or shows no meaningful interaction, return for it:
+               {{ "frame": N, "title": "skip", "description": "skip" }}
+
+            **GENERATE A JSON ARRAY WITH EXACTLY {len(frames)} OBJECTS NOW:**
+            """
+
+def _parse_batch_response(response_text, expected):
+    """JSON array -> list of per-frame dicts in frame order, or None if malformed."""
+    try:
+        data = json.loads(_clean_json_response(response_text or ""))
+    except Exception:
+        return None
+    if isinstance(data, dict):
+        data = data.get("steps") or data.get("frames")
+    if not isinstance(data, list) or len(data) != expected:
+        return None
+    if not all(isinstance(item, dict) for item in data):
+        return None
+
+    numbered = {item.get("frame"): item for item in data}
+    if set(numbered) == set(range(1, expected + 1)):
+        return [numbered[n] for n in range(1, expected + 1)]
+    return data
+
+# --- RESULT CACHE ---
+def _get_llm_cache():
+    global _llm_cache
+    if _llm_cache is None:
+        _llm_cache = get_cache(
+            "llm_steps",
+            backend=settings.LLM_CACHE_BACKEND,
+            ttl=settings.LLM_CACHE_TTL,
+            max_entries=settings.LLM_CACHE_MAX_ENTRIES,
+        )
+    return _llm_cache
+
+# Cache calls run off the event loop: a shared SQLite file can make a write wait for its lock
+async def _cache_get(cache, cache_key):
+    return await asyncio.to_thread(cache.get, cache_key) if cache_key else None
+
+async def _cache_set(cache, cache_key, value):
+    if cache_key:
+        await asyncio.to_thread(cache.set, cache_key, value)
+
+def _frame_cache_key(frame_path, audio_text, prompt_version=PROMPT_VERSION, frame_hash=None, crop=None):
+    """
+    Same screen + same narration + same prompt/model = same answer. frame_hash: dHash from the frame manifest.
+    crop: ROI crop box - the model saw a different image, so it's part of the key.
+    """
+    normalized_audio = " ".join(audio_text.lower().split()) if audio_text else ""
+    parts = [frame_hash or compute_dhash(frame_path), normalized_audio, prompt_version, MODEL_NAME]
+    if crop is not None:
+        parts.append(f"crop:{','.join(f'{v:.4f}' for v in crop)}")
+    return make_cache_key(*parts)
+
+def _build_step(step_data, timestamp, frame_path):
+    """Model JSON -> step dict (None for 'skip' frames)."""
+    if not step_data or str(step_data.get("title")).lower() == "skip":
+        return None
+    return {
+        "step_number": 0, 
+        "timestamp": timestamp,
+        "image_path": frame_path,
+        "title": step_data.get("title", "Step"),
+        "description": step_data.get("description", "Action performed.")
+    }
+
+# --- CHECKPOINT HOOKS (services/checkpoint.py; None = no manifest) ---
+def _checkpoint_result(checkpoint, frame_path, audio_text):
+    return checkpoint.frame_result(frame_path, audio_text) if checkpoint is not None else None
+
+def _checkpoint_record(checkpoint, frame_path, audio_text, step_data):
+    if checkpoint is not None:
+        checkpoint.record_frame(frame_path, audio_text, step_data)
+
+def _checkpoint_failure(checkpoint, frame_path, audio_text, error):
+    # Failed frames are NOT answers: a resumed run requests them again
+    if checkpoint is not None:
+        checkpoint.record_failure(frame_path, audio_text, error)
+
+# --- ADAPTIVE CONCURRENCY ---
+def _get_limiter():
+    return get_limiter(
+        "nvidia",
+        initial=settings.LLM_INITIAL_CONCURRENCY,
+        min_limit=settings.LLM_MIN_CONCURRENCY,
+        max_limit=settings.LLM_MAX_CONCURRENCY,
+    )
+
+_exponential_wait = wait_exponential(multiplier=1, min=2, max=10)
+
+def _wait_for_retry(retry_state):
+    """Provider's Retry-After if it sent one, otherwise exponential backoff."""
+    retry_after = get_retry_after(retry_state.outcome.exception())
+    if retry_after:
+        return min(retry_after, 60)
+    return _exponential_wait(retry_state)
+
+# --- SAFETY WRAPPER: RETRY MECHANISM ---
+# Only 429 / 5xx / network errors are retried (a 400 won't fix itself).
+# Every attempt takes a slot from the adaptive limiter, so 429s shrink concurrency,
+# and a lease from the cluster-wide limiter, so all workers share the account quota.
+@retry(
+    stop=stop_after_attempt(5),
+    wait=_wait_for_retry,
+    retry=retry_if_exception(is_retryable_error)
+)
+async def _call_api_with_retry(model, messages, temperature):
+    async with _get_limiter().slot():
+        async with get_cluster_limiter("nvidia").limit(estimate_tokens(messages)):
+            return await get_client().chat.completions.create(
+                model=model,
+                messages=messages,
+                temperature=temperature
+            )
+
+# --- ASYNC WORKER: PROCESS SINGLE FRAME ---
+async def process_single_frame(semaphore, i, total_frames, frame_path, timestamp, audio_text, optimizer=None, checkpoint=None,
+                               frame_hash=None, crop=None):
+    # --- CHECKPOINT (answered in an earlier run of this video) ---
+    recorded = _checkpoint_result(checkpoint, frame_path, audio_text)
+    if recorded is not None:
+        print(f"   -> 📌 Checkpoint: Frame {i+1}/{total_frames} already done")
+        return _build_step(recorded, timestamp, frame_path)
+
+    # --- CACHE LOOKUP (hit = no network call at all) ---
+    cache = _get_llm_cache()
+    try:
+        cache_key = _frame_cache_key(frame_path, audio_text, frame_hash=frame_hash, crop=crop)
+    except Exception as e:
+        print(f"⚠️ Frame {i+1} hash failed, cache bypassed: {e}")
+        cache_key = None
+
+    cached = await _cache_get(cache, cache_key)
+    if cached is not None:
+        print(f"   -> ♻️ Cache hit for Frame {i+1}/{total_frames} at {timestamp}s")
+        _checkpoint_record(checkpoint, frame_path, audio_text, cached)
+        return _build_step(cached, timestamp, frame_path)
+
+    async with semaphore:
+        print(f"   -> 🚀 Sending Frame {i+1}/{total_frames} at {timestamp}s...")
+        
+        try:
+            image_parts = _frame_image_parts(frame_path, optimizer, crop)
+            
+            system_prompt = SYSTEM_PROMPT
+            user_prompt = _single_user_prompt(timestamp, audio_text, cropped=crop is not None)
+
             # API Call
             response = await _call_api_with_retry(
                 model=MODEL_NAME,
@@ -124,12 +344,7 @@ async def process_single_frame(semaphore, i, total_frames, frame_path, timestamp
                         "role": "user",
                         "content": [
                             {"type": "text", "text": user_prompt},
-                            {
-                                "type": "image_url",
-                                "image_url": {
-                                    "url": f"data:image/jpeg;base64,{base64_image}"
-                                }
-                            }
+                            *image_parts
                         ]
                     }
                 ],
@@ -139,64 +354,283 @@ async def process_single_frame(semaphore, i, total_frames, frame_path, timestamp
             raw_content = response.choices[0].message.content
             cleaned_text = _clean_json_response(raw_content)
             
-            if not cleaned_text: return None
+            if not cleaned_text:
+                _checkpoint_failure(checkpoint, frame_path, audio_text, "empty response")
+                return None
             step_data = json.loads(cleaned_text)
 
-            if not step_data or str(step_data.get("title")).lower() == "skip":
-                return None
+            if isinstance(step_data, dict):
+                _checkpoint_record(checkpoint, frame_path, audio_text, step_data)
+                await _cache_set(cache, cache_key, step_data)
 
-            print(f"      ✅ Received: {step_data.get('title')}")
-            
-            return {
-                "step_number": 0, 
-                "timestamp": timestamp,
-                "image_path": frame_path,
-                "title": step_data.get("title", "Step"),
-                "description": step_data.get("description", "Action performed.")
-            }
+            step = _build_step(step_data, timestamp, frame_path)
+            if step:
+                print(f"      ✅ Received: {step['title']}")
+            return step
 
         except Exception as e:
             print(f"❌ Frame {i+1} Failed (Final): {e}")
+            _checkpoint_failure(checkpoint, frame_path, audio_text, e)
             return None
 
+# --- ASYNC WORKER: PROCESS A BATCH OF FRAMES ---
+async def process_frame_batch(semaphore, jobs, total_frames, optimizer=None, checkpoint=None):
+    """
+    jobs: list of (i, frame_path, timestamp, audio_text, frame_hash, crop).
+    Packs the uncached frames into ONE request and returns the steps aligned with 'jobs'.
+    Malformed responses (or a provider that rejects multi-image requests)
+    fall back to single-frame requests. Any other failure (429/5xx/network after
+    the retries, auth, ...) marks the frames failed in the checkpoint for resume -
+    K single requests would only hit the same wall K times.
+    """
+    global _batch_mode_rejected
+    cache = _get_llm_cache()
+    results = [None] * len(jobs)
+    pending = []
+
+    for pos, (i, frame_path, timestamp, audio_text, frame_hash, crop) in enumerate(jobs):
+        recorded = _checkpoint_result(checkpoint, frame_path, audio_text)
+        if recorded is not None:
+            print(f"   -> 📌 Checkpoint: Frame {i+1}/{total_frames} already done")
+            results[pos] = _build_step(recorded, timestamp, frame_path)
+            continue
+        try:
+            cache_key = _frame_cache_key(frame_path, audio_text, BATCH_PROMPT_VERSION, frame_hash, crop)
+        except Exception as e:
+            print(f"⚠️ Frame {i+1} hash failed, cache bypassed: {e}")
+            cache_key = None
+        cached = await _cache_get(cache, cache_key)
+        if cached is not None:
+            print(f"   -> ♻️ Cache hit for Frame {i+1}/{total_frames} at {timestamp}s")
+            _checkpoint_record(checkpoint, frame_path, audio_text, cached)
+            results[pos] = _build_step(cached, timestamp, frame_path)
+        else:
+            pending.append((pos, cache_key, jobs[pos]))
+
+    if not pending:
+        return results
+
+    parsed = None
+    if len(pending) > 1 and not _batch_mode_rejected:
+        async with semaphore:
+            first, last = pending[0][2][0], pending[-1][2][0]
+            print(f"   -> 🚀 Sending Frames {first+1}-{last+1}/{total_frames} as one batch ({len(pending)} images)...")
+            try:
+                content = [{"type": "text", "text": _batch_user_prompt([(job[2], job[3], job[5] is not None)
+                                                                        for _, _, job in pending])}]
+                for n, (_, _, job) in enumerate(pending, start=1):
+                    content.append({"type": "text", "text": f"Frame {n}:"})
+                    content.extend(_frame_image_parts(job[1], optimizer, job[5]))
+
+                response = await _call_api_with_retry(
+                    model=MODEL_NAME,
+                    messages=[
+                        {"role": "system", "content": BATCH_SYSTEM_PROMPT},
+                        {"role": "user", "content": content},
+                    ],
+                    temperature=1.0, # Creative Freedom
+                )
+                parsed = _parse_batch_response(response.choices[0].message.content, len(pending))
+            except Exception as e:
+                error = _final_error(e)
+                if not _is_batch_rejection(error):
+                    print(f"❌ Batch {first+1}-{last+1} Failed (Final): {error}")
+                    for _, _, (_, frame_path, _, audio_text, _, _) in pending:
+                        _checkpoint_failure(checkpoint, frame_path, audio_text, error)
+                    return results
+                # Model/provider doesn't accept this many images
+                _batch_mode_rejected = True
+                print(f"⚠️ Batched request rejected ({error}). Switching to single-frame mode.")
+
+    if parsed is None:
+        if len(pending) > 1 and not _batch_mode_rejected:
+            print(f"⚠️ Batch response malformed. Falling back to {len(pending)} single-frame requests.")
+        singles = await gather_or_cancel(*[
+            process_single_frame(semaphore, i, total_frames, frame_path, timestamp, audio_text, optimizer, checkpoint,
+                                 frame_hash, crop)
+            for _, _, (i, frame_path, timestamp, audio_text, frame_hash, crop) in pending
+        ])
+        for (pos, _, _), step in zip(pending, singles):
+            results[pos] = step
+        return results
+
+    for (pos, cache_key, (i, frame_path, timestamp, audio_text, _, _)), step_data in zip(pending, parsed):
+        _checkpoint_record(checkpoint, frame_path, audio_text, step_data)
+        await _cache_set(cache, cache_key, step_data)
+        results[pos] = _build_step(step_data, timestamp, frame_path)
+        if results[pos]:
+            print(f"      ✅ Received: {results[pos]['title']}")
+    return results
+
+def _final_error(exc):
+    """The last attempt's error when tenacity gave up (RetryError wraps it), else exc itself."""
+    if isinstance(exc, RetryError):
+        return exc.last_attempt.exception() or exc
+    return exc
+
+def _is_batch_rejection(exc) -> bool:
+    """
+    413 = payload too large; 400/422 only when the provider complains about the images
+    (e.g. "At most 1 image may be provided"). 401, content-policy 400s etc. don't disable batching.
+    """
+    code = error_status(exc)
+    if code == 413:
+        return True
+    return code in _BATCH_REJECT_STATUSES and "image" in str(exc).lower()
+
+async def _process_jobs(semaphore, jobs, total_frames, optimizer, checkpoint=None):
+    """One request for 1 frame, a batched request for more. Always returns a list."""
+    if len(jobs) == 1:
+        i, frame_path, timestamp, audio_text, frame_hash, crop = jobs[0]
+        return [await process_single_frame(semaphore, i, total_frames, frame_path, timestamp, audio_text, optimizer,
+                                           checkpoint, frame_hash, crop)]
+    return await process_frame_batch(semaphore, jobs, total_frames, optimizer, checkpoint)
+
+def _new_frame_predictor():
+    if not settings.FRAME_PREDEDUP_ENABLED:
+        return None
+    return FrameDuplicatePredictor(window=settings.FRAME_PREDEDUP_WINDOW, max_distance=settings.FRAME_PREDEDUP_MAX_DISTANCE)
+
+def _is_predicted_duplicate(predictor, frame_hash, audio_text):
+    """True = same screen + same narration was just sent, skip the LLM call."""
+    if predictor is None:
+        return False
+    try:
+        return predictor.is_duplicate(frame_hash, audio_text)
+    except Exception:
+        return False
+
+def _flatten(batched_results):
+    return [step for batch in batched_results for step in batch]
+
 # --- RUNNER ---
-async def _run_parallel_generation(frames_paths, transcript, interval):
-    semaphore = asyncio.Semaphore(7) 
+async def _run_parallel_generation(frames, transcript, checkpoint=None):
+    # Bounds frames being prepared/in flight (memory); API concurrency itself is adaptive
+    semaphore = asyncio.Semaphore(settings.LLM_MAX_CONCURRENCY)
+    optimizer = _new_payload_optimizer()
     tasks = []
-    total_frames = len(frames_paths)
+    total_frames = len(frames)
+    frames_paths, timestamps, hashes = frames.paths, frames.timestamps, frames.hashes
+    crops = [_frame_crop(region) for region in frames.regions]
+    audio_contexts = TranscriptIndex(transcript).contexts_for(timestamps)
+    predictor = _new_frame_predictor()
+    jobs = [
+        (i, frame_path, timestamps[i], audio_contexts[i], hashes[i], crops[i])
+        for i, frame_path in enumerate(frames_paths)
+        if not _is_predicted_duplicate(predictor, hashes[i], audio_contexts[i])
+    ]
+    if predictor and predictor.skipped:
+        print(f"🧹 Pre-Dedup: Skipping {predictor.skipped} frames predicted to repeat a recent step.")
+    k = max(1, settings.LLM_FRAMES_PER_REQUEST)
     
-    for i, frame_path in enumerate(frames_paths):
-        timestamp = i * interval
-        audio_text = _get_audio_context_for_timestamp(timestamp, transcript)
-        tasks.append(
-            process_single_frame(semaphore, i, total_frames, frame_path, timestamp, audio_text)
-        )
+    for start in range(0, len(jobs), k):
+        tasks.append(_process_jobs(semaphore, jobs[start:start + k], total_frames, optimizer, checkpoint))
     
-    print(f"⚡ Starting Parallel Processing of {total_frames} frames...")
-    results = await asyncio.gather(*tasks)
+    print(f"⚡ Starting Parallel Processing of {total_frames} frames ({k} per request)...")
+    results = _flatten(await gather_or_cancel(*tasks))
+    _log_payload_report(optimizer)
     return results
 
-# --- ENTRY POINT ---
-def generate_documentation_steps(transcript: list, frames_dir: str, interval: int = 2):
-    print(f"🔹 Mode: Enterprise SOP Flow (Model: {MODEL_NAME})")
-    
-    frames_paths = sorted([
-        os.path.join(frames_dir, f) for f in os.listdir(frames_dir) if f.endswith(".jpg")
-    ])
-    
-    if not frames_paths:
-        return []
+# --- PIPELINED RUNNER (Transcription + Vision together) ---
+async def _run_pipelined_generation(frames, segments, checkpoint=None):
+    """
+    Consumes transcript segments from a (blocking) generator in a background thread
+    and dispatches each frame to the LLM as soon as its audio window is complete.
+    Segments arrive ordered by start time, so once a segment starts after
+    timestamp + buffer, no later segment can add context to that frame.
+    Returns (results, transcript).
+    """
+    loop = asyncio.get_running_loop()
+    queue = asyncio.Queue()
+    semaphore = asyncio.Semaphore(settings.LLM_MAX_CONCURRENCY)
+    optimizer = _new_payload_optimizer()
+    total_frames = len(frames)
+    frames_paths, timestamps, hashes = frames.paths, frames.timestamps, frames.hashes
+    crops = [_frame_crop(region) for region in frames.regions]
+    transcript = []
+    index = TranscriptIndex()
+    tasks = []
+    ready = []
+    next_frame = 0
+    k = max(1, settings.LLM_FRAMES_PER_REQUEST)
+    predictor = _new_frame_predictor()
+
+    def _produce():
+        try:
+            for segment in segments:
+                loop.call_soon_threadsafe(queue.put_nowait, segment)
+        finally:
+            loop.call_soon_threadsafe(queue.put_nowait, None)
+
+    def _dispatch_ready(horizon, flush=False):
+        nonlocal next_frame
+        while next_frame < total_frames and timestamps[next_frame] + AUDIO_CONTEXT_BUFFER < horizon:
+            timestamp = timestamps[next_frame]
+            audio_text = index.context_at(timestamp)
+            if not _is_predicted_duplicate(predictor, hashes[next_frame], audio_text):
+                ready.append((next_frame, frames_paths[next_frame], timestamp, audio_text, hashes[next_frame],
+                              crops[next_frame]))
+            next_frame += 1
+        # Send full batches right away; the last partial batch only at the end
+        while len(ready) >= k or (flush and ready):
+            jobs = ready[:k]
+            del ready[:k]
+            tasks.append(asyncio.create_task(_process_jobs(semaphore, jobs, total_frames, optimizer, checkpoint)))
+
+    print(f"⚡ Starting Pipelined Processing of {total_frames} frames (dispatching while transcribing)...")
+    producer = loop.run_in_executor(None, _produce)
 
     try:
-        if os.name == 'nt':
-            asyncio.set_event_loop_policy(asyncio.WindowsSelectorEventLoopPolicy())
-        raw_results = asyncio.run(_run_parallel_generation(frames_paths, transcript, interval))
-    except Exception as e:
-        print(f"CRITICAL ASYNC ERROR: {e}")
-        return []
-    
-    valid_steps = [r for r in raw_results if r is not None]
+        while True:
+            segment = await queue.get()
+            if segment is None:
+                break
+            transcript.append(segment)
+            index.append(segment)
+            _dispatch_ready(segment.get("start", 0))
+
+        await producer  # transcription error -> raised here, before the rest of the frames go out
+
+        # Transcription done -> baaki sab frames ready hain
+        _dispatch_ready(float("inf"), flush=True)
+        results = _flatten(await gather_or_cancel(*tasks))
+    except BaseException:
+        # Frames already dispatched must not keep calling the API on the persistent loop
+        await cancel_tasks(tasks)
+        raise
+    if predictor and predictor.skipped:
+        print(f"🧹 Pre-Dedup: Skipped {predictor.skipped} frames predicted to repeat a recent step.")
+    _log_payload_report(optimizer)
+    return results, transcript
+
+def _save_checkpoint(checkpoint):
+    if checkpoint is not None:
+        checkpoint.save()
+        failed = checkpoint.failed_frames()
+        if failed:
+            print(f"📌 Checkpoint: {len(failed)} frames failed and will be re-requested on resume.")
+
+def _log_payload_report(optimizer):
+    if optimizer is not None:
+        print(f"🗜️ Image Payloads: {optimizer.report()}")
+
+def _finalize_steps(raw_results):
+    """Drops empty results, orders by time, removes back-to-back duplicates and numbers the steps."""
+    print(f"♻️ LLM Cache: {_get_llm_cache().stats()}")
+    print(f"🚦 Limiter: {_get_limiter().metrics()}")
+    print(f"🔌 HTTP Pool: {http_metrics.snapshot()}")
+
+    final_steps = finalize_step_list([r for r in raw_results if r is not None])
+    print(f"✅ Parallel Processing Complete. Generated {len(final_steps)} SOP steps.")
+    return final_steps
+
+def finalize_step_list(valid_steps: list) -> list:
+    """Orders steps by time, drops near/exact duplicates and (re)numbers them from 1."""
+    valid_steps = list(valid_steps)
     valid_steps.sort(key=lambda x: x['timestamp'])
+
+    if settings.STEP_DEDUP_ENABLED:
+        valid_steps = dedup_steps(valid_steps, threshold=settings.STEP_DEDUP_THRESHOLD, window=settings.STEP_DEDUP_WINDOW)
     
     final_steps = []
     for step in valid_steps:
@@ -207,6 +641,65 @@ def generate_documentation_steps(transcript: list, frames_dir: str, interval: in
                     continue
         step['step_number'] = len(final_steps) + 1
         final_steps.append(step)
+    return final_steps
 
-    print(f"✅ Parallel Processing Complete. Generated {len(final_steps)} SOP steps.")
-    return final_steps
\ No newline at end of file
+def _resolve_frames(frames, interval):
+    """FrameManifest as is; a frames dir -> its frames.json (or, for frames without one, the dir listing)."""
+    if isinstance(frames, FrameManifest):
+        return frames
+    return FrameManifest.load(frames) or FrameManifest.from_directory(frames, interval)
+
+# --- ENTRY POINT ---
+def generate_documentation_steps(transcript: list, frames, interval: int = 2, checkpoint=None):
+    """
+    frames: FrameManifest from extraction (or its frames dir); timestamps come from the manifest.
+    checkpoint: optional VideoCheckpoint - recorded frames are reused, new results are recorded.
+    """
+    print(f"🔹 Mode: Enterprise SOP Flow (Model: {MODEL_NAME})")
+    
+    frames = _resolve_frames(frames, interval)
+    
+    if not frames:
+        return []
+
+    try:
+        if os.name == 'nt':
+            asyncio.set_event_loop_policy(asyncio.WindowsSelectorEventLoopPolicy())
+        raw_results = run_async(_run_parallel_generation(frames, transcript, checkpoint))
+    except Exception as e:
+        print(f"CRITICAL ASYNC ERROR: {e}")
+        if checkpoint is not None:
+            raise  # caller retries/resumes instead of saving an empty document
+        return []
+    finally:
+        _save_checkpoint(checkpoint)
+    
+    return _finalize_steps(raw_results)
+
+def generate_documentation_steps_pipelined(segments, frames, interval: int = 2, checkpoint=None):
+    """
+    Same output as generate_documentation_steps, but takes a lazy segment generator
+    (e.g. audio_service.iter_transcript_segments) and overlaps Whisper with the LLM calls.
+    End-to-end time becomes ~max(transcribe, generate) instead of the sum.
+    Returns (final_steps, transcript).
+    """
+    print(f"🔹 Mode: Enterprise SOP Flow - Pipelined (Model: {MODEL_NAME})")
+
+    frames = _resolve_frames(frames, interval)
+
+    if not frames:
+        return [], []
+
+    try:
+        if os.name == 'nt':
+            asyncio.set_event_loop_policy(asyncio.WindowsSelectorEventLoopPolicy())
+        raw_results, transcript = run_async(_run_pipelined_generation(frames, segments, checkpoint))
+    except Exception as e:
+        print(f"CRITICAL ASYNC ERROR: {e}")
+        if checkpoint is not None:
+            raise  # an empty transcript must not be checkpointed as "done"
+        return [], []
+    finally:
+        _save_checkpoint(checkpoint)
+
+    return _finalize_steps(raw_results), transcript
@@ -1,30 +1,117 @@
 import subprocess
 import os
+import re
+import math
 import shutil
+import threading
 import numpy as np
 from PIL import Image
+from concurrent.futures import ThreadPoolExecutor
+from core.config import settings
+from services.frame_diff import KeyframeSelector, merge_regions
+from services.frame_manifest import FrameManifest, frame_sample_index
 
-def extract_audio(video_path: str, output_path: str):
+# --- FRAME COMPARISON SETTINGS ---
+# Frames are compared as 100x100 grayscale (64x64 was too blurry for text changes)
+COMPARE_SIZE = 100
+
+# Kitne frames aik vectorized pass mein compare hon
+DIFF_BLOCK_SIZE = 256
+
+# Kitne keyframes aik ffmpeg process mein seek karke likhne hain
+KEYFRAME_WRITE_BATCH = 16
+
+# --- FAST MODES (long, mostly static screen recordings) ---
+# "stream" har frame decode karta hai (fps filter ko har frame chahiye) sirf 1/sec rakhne ke liye.
+# "keyframes": decoder sirf I-frames decode karta hai (-skip_frame nokey), baaqi sab skip.
+# "scene":     B-frames decode hi nahi hote, aur ffmpeg ka scene score sirf badle hue frames aage bhejta hai.
+# Dono mein time sampled index se nahi, frame ke PTS (showinfo) se aata hai.
+FAST_EXTRACTION_MODES = ("keyframes", "scene")
+_PTS_RE = re.compile(r"pts_time:\s*(-?\d+(?:\.\d+)?)")
+
+# --- AUDIO OUTPUT ---
+# Whisper 16 kHz mono float32 hi parhta hai. ".f32" = ffmpeg seedha wohi raw PCM likhta hai
+# (no MP3 encode, no MP3 decode + resample in faster-whisper); ".mp3" = legacy path.
+PCM_SAMPLE_RATE = 16000
+PCM_EXTENSION = ".f32"
+
+def audio_filename(audio_format: str = None) -> str:
+    audio_format = audio_format or settings.AUDIO_FORMAT
+    return "audio" + (PCM_EXTENSION if audio_format == "pcm" else ".mp3")
+
+# --- TIME RANGE (chunked mode processes one slice of the video) ---
+_DURATION_RE = re.compile(r"Duration:\s*(\d+):(\d+):(\d+(?:\.\d+)?)")
+
+def _frame_name(index: int) -> str:
+    return f"frame_{index + 1:03d}.jpg"
+
+def _input_args(video_path: str, start: float = 0.0, duration: float = None) -> list:
+    """-ss/-t before -i = input seek: ffmpeg decodes only [start, start + duration)."""
+    args = []
+    if start:
+        args += ["-ss", f"{start:.3f}"]
+    if duration:
+        args += ["-t", f"{duration:.3f}"]
+    return args + ["-i", video_path]
+
+def probe_duration(video_path: str) -> float:
+    """Video length in seconds (ffprobe, falling back to ffmpeg's banner). 0 if unknown."""
+    try:
+        result = subprocess.run(
+            ["ffprobe", "-v", "error", "-show_entries", "format=duration", "-of", "csv=p=0", video_path],
+            capture_output=True, text=True,
+        )
+        return float(result.stdout.strip())
+    except (OSError, ValueError):
+        pass
+    result = subprocess.run(["ffmpeg", "-i", video_path], capture_output=True, text=True)
+    match = _DURATION_RE.search(result.stderr)
+    if not match:
+        return 0.0
+    hours, minutes, seconds = match.groups()
+    return int(hours) * 3600 + int(minutes) * 60 + float(seconds)
+
+def _audio_output_args(output_path: str) -> list:
+    if output_path.endswith(PCM_EXTENSION):
+        return ["-ac", "1", "-ar", str(PCM_SAMPLE_RATE), "-f", "f32le"]
+    return ["-q:a", "0"]
+
+def extract_audio(video_path: str, output_path: str, start: float = 0.0, duration: float = None):
     """
-    Extracts MP3 audio from the video file using FFmpeg.
+    Extracts audio from the video file using FFmpeg.
+    '.f32' output = raw 16 kHz mono float32 PCM, anything else = MP3.
     """
     command = [
-        "ffmpeg", "-i", video_path, "-q:a", "0", "-map", "a", output_path, "-y"
+        "ffmpeg", *_input_args(video_path, start, duration),
+        *_audio_output_args(output_path), "-map", "a", output_path, "-y"
     ]
     subprocess.run(command, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
     return output_path if os.path.exists(output_path) else None
 
-def extract_frames(video_path: str, output_dir: str, interval: int = 1):
+def extract_frames(video_path: str, output_dir: str, interval: int = 1, mode: str = None,
+                   start: float = 0.0, duration: float = None):
     """
     Extracts frames every 'interval' seconds.
     Note: We extract frequently (e.g., every 1s) and then filter duplicates later.
+    Returns the FrameManifest of the kept frames (also saved as frames/frames.json).
+
+    mode="stream": ffmpeg pipes small grayscale frames into NumPy, the static
+    filter runs in memory and only the surviving keyframes are written to disk.
+    mode="disk": legacy flow, every frame is written as JPEG and filtered after.
+    mode="keyframes"/"scene": like "stream", but ffmpeg only decodes keyframes / only
+    emits changed frames; frames are timed by their PTS.
+    start/duration: only that slice of the video; frame_001.jpg is then the frame at 'start'.
     """
     os.makedirs(output_dir, exist_ok=True)
-    
+    mode = mode or settings.FRAME_EXTRACTION_MODE
+
+    if mode == "stream" or mode in FAST_EXTRACTION_MODES:
+        return _extract_frames_streaming(video_path, output_dir, interval, start=start, duration=duration, mode=mode)
+
     # FFmpeg command to extract frames
     # fps=1/interval means 1 frame every X seconds
     command = [
-        "ffmpeg", "-i", video_path,
+        "ffmpeg", *_input_args(video_path, start, duration),
         "-vf", f"fps=1/{interval}",
         f"{output_dir}/frame_%03d.jpg",
         "-y"
@@ -34,62 +121,263 @@ def extract_frames(video_path: str, output_dir: str, interval: int = 1):
     # --- ENTERPRISE UPGRADE: SMART FILTERING ---
     # After extraction, we immediately remove static/duplicate frames
     # to save AI cost and processing time.
-    _filter_static_frames(output_dir)
+    frames = _filter_static_frames(output_dir, interval)
+    frames.save()
+    return frames
 
-def _filter_static_frames(frames_dir: str):
+# --- COMBINED EXTRACTION STAGE (Audio + Frames) ---
+def extract_media(video_path: str, audio_path: str, frames_dir: str, interval: int = 1, mode: str = None,
+                  start: float = 0.0, duration: float = None) -> dict:
+    """
+    Produces both the audio file and the keyframes in one stage.
+    - stream mode: ONE ffmpeg process decodes the video once and writes both outputs
+      (audio to file, comparison frames to the pipe).
+    - disk mode: the two legacy ffmpeg commands run concurrently.
+    start/duration limit both outputs to one slice of the video (chunked mode);
+    timestamps inside the slice (frame names, transcript) are relative to 'start'.
+
+    Returns a per-output report:
+    {"audio": {"path": str|None, "error": str|None},
+     "frames": {"count": int, "error": str|None, "manifest": FrameManifest}}
+    """
+    os.makedirs(frames_dir, exist_ok=True)
+    mode = mode or settings.FRAME_EXTRACTION_MODE
+
+    if mode == "stream" or mode in FAST_EXTRACTION_MODES:
+        if os.path.exists(audio_path):
+            os.remove(audio_path)  # stale file would hide a failed audio output
+        frames = _extract_frames_streaming(video_path, frames_dir, interval, audio_path=audio_path,
+                                           start=start, duration=duration, mode=mode)
+        if not frames and not _file_ready(audio_path):
+            # Silent video: ffmpeg refuses an audio output with no stream -> frames only
+            print("🔇 No audio stream found, re-running frames only...")
+            frames = _extract_frames_streaming(video_path, frames_dir, interval, start=start, duration=duration,
+                                               mode=mode)
+    else:
+        with ThreadPoolExecutor(max_workers=2) as pool:
+            audio_job = pool.submit(extract_audio, video_path, audio_path, start, duration)
+            frames_job = pool.submit(extract_frames, video_path, frames_dir, interval, mode, start, duration)
+            audio_job.result()
+            frames = frames_job.result()
+
+    audio_ok = _file_ready(audio_path)
+    return {
+        "audio": {
+            "path": audio_path if audio_ok else None,
+            "error": None if audio_ok else "No audio track extracted",
+        },
+        "frames": {
+            "count": len(frames),
+            "error": None if frames else "No frames extracted",
+            "manifest": frames,
+        },
+    }
+
+def _file_ready(path: str) -> bool:
+    return bool(path) and os.path.exists(path) and os.path.getsize(path) > 0
+
+def _new_selector():
+    # Changed regions only feed ROI crops; without them the manifest's roi column stays empty
+    tile = settings.ROI_TILE_SIZE if settings.ROI_CROP_ENABLED else 0
+    return KeyframeSelector(metric=settings.FRAME_DIFF_METRIC, threshold=settings.FRAME_DIFF_THRESHOLD,
+                            tile=tile, tile_threshold=settings.ROI_TILE_THRESHOLD)
+
+# --- STREAMING MODE (Zero-Disk) ---
+def _comparison_filter(mode: str, interval: int) -> tuple:
+    """(input options, video filter chain, output options) for the piped comparison frames."""
+    shrink = f"scale={COMPARE_SIZE}:{COMPARE_SIZE},format=gray"
+    if mode == "keyframes":
+        return ["-skip_frame", "nokey"], f"showinfo,{shrink}", ["-fps_mode", "passthrough"]
+    if mode == "scene":
+        # B-frames are never decoded (a change shows up on the next I/P frame, a few frames later);
+        # then: first frame always + every frame whose scene score crosses the threshold
+        select = f"select='eq(n,0)+gt(scene,{settings.FRAME_SCENE_THRESHOLD})'"
+        return ["-skip_frame", "bidir"], f"{select},showinfo,{shrink}", ["-fps_mode", "passthrough"]
+    return [], f"fps=1/{interval},{shrink}", []
+
+def _stream_comparison_blocks(video_path: str, interval: int, audio_path: str = None,
+                              start: float = 0.0, duration: float = None, mode: str = "stream", pts_out: list = None):
+    """
+    Generator: yields (N, 100, 100) uint8 blocks straight from ffmpeg's stdout.
+    ffmpeg does the fps sampling, scaling and grayscale conversion, so nothing touches the disk.
+    If audio_path is given, the same process (same decode) also writes the audio (PCM or MP3).
+    Fast modes: the PTS of every piped frame (seconds from 'start') is appended to pts_out.
+    """
+    input_options, video_filter, output_options = _comparison_filter(mode, interval)
+    command = [
+        "ffmpeg", "-hide_banner", *input_options, *_input_args(video_path, start, duration),
+        "-map", "0:v:0",
+        "-vf", video_filter, *output_options,
+        "-f", "rawvideo", "-pix_fmt", "gray",
+        "pipe:1"
+    ]
+    if audio_path:
+        command += ["-map", "0:a:0", *_audio_output_args(audio_path), audio_path]
+    command.append("-y")
+    frame_bytes = COMPARE_SIZE * COMPARE_SIZE
+    timed = pts_out is not None
+    process = subprocess.Popen(command, stdout=subprocess.PIPE, stderr=subprocess.PIPE if timed else subprocess.DEVNULL)
+
+    # showinfo logs one line per frame on stderr; drained in a thread so neither pipe blocks
+    reader = None
+    if timed:
+        def _read_pts():
+            for line in process.stderr:
+                match = _PTS_RE.search(line.decode("utf-8", "replace"))
+                if match and b"showinfo" in line:
+                    pts_out.append(float(match.group(1)))
+        reader = threading.Thread(target=_read_pts, daemon=True)
+        reader.start()
+
+    try:
+        while True:
+            buffer = process.stdout.read(frame_bytes * DIFF_BLOCK_SIZE)
+            count = len(buffer) // frame_bytes
+            if count:
+                yield np.frombuffer(buffer[:count * frame_bytes], dtype=np.uint8).reshape(count, COMPARE_SIZE, COMPARE_SIZE)
+            if count < DIFF_BLOCK_SIZE:
+                break
+    finally:
+        process.stdout.close()
+        process.wait()
+        if reader is not None:
+            reader.join()
+            process.stderr.close()
+
+def _extract_frames_streaming(video_path: str, output_dir: str, interval: int, audio_path: str = None,
+                              start: float = 0.0, duration: float = None, mode: str = "stream"):
+    """
+    Runs the static filter in memory on the piped frames,
+    then writes only the unique keyframes to disk at full resolution.
+    Returns their FrameManifest (saved next to them as frames.json).
+    """
+    print(f"👁️  Smart Filter ({mode}): Analyzing piped frames for duplication...")
+
+    selector = _new_selector()
+    kept_indices = []
+    kept_scores = []
+    pts = [] if mode in FAST_EXTRACTION_MODES else None
+
+    for block in _stream_comparison_blocks(video_path, interval, audio_path, start, duration, mode, pts):
+        indices, scores = selector.push(block)
+        kept_indices.extend(indices)
+        kept_scores.extend(scores)
+
+    if not kept_indices:
+        print("⚠️ WARNING: No frames received from ffmpeg.")
+        return FrameManifest(output_dir)
+
+    if pts is None:
+        # fps filter: piped frame i is the sample at i * interval
+        kept = [(index, index * interval, score, selector.regions[index]) for index, score in zip(kept_indices, kept_scores)]
+    else:
+        if len(pts) != selector.seen:
+            print(f"⚠️ WARNING: {selector.seen} frames piped but {len(pts)} timestamps parsed.")
+        kept = _frames_by_pts(kept_indices, kept_scores, selector.regions, pts, interval)
+
+    _write_frames_at(video_path, output_dir, [(index, seconds) for index, seconds, _, _ in kept], start)
+    frames = FrameManifest.build(output_dir, [
+        (index, seconds, _frame_name(index), score, region) for index, seconds, score, region in kept
+    ])
+    frames.save()
+
+    remaining = len(frames)
+    total = selector.seen
+    print(f"📉 Optimization: Skipped {total - remaining} static frames. Kept {remaining} unique keyframes.")
+
+    if remaining < 3 and total > 10:
+        print("⚠️ WARNING: Too many frames removed! Consider lowering threshold further.")
+
+    return frames
+
+def _frames_by_pts(kept_indices: list, kept_scores: list, regions: dict, pts: list, interval: int) -> list:
+    """
+    Fast modes: piped positions -> (sample index, PTS seconds, score, changed region). The file
+    name keeps the frame_NNN = interval slot convention (several changes inside one slot keep
+    the last, settled one, with the union of their regions); the manifest carries the exact PTS.
+    """
+    by_index = {}
+    for position, score in zip(kept_indices, kept_scores):
+        if position < len(pts):
+            index = int(pts[position] // interval)
+            region = regions[position]
+            if index in by_index:
+                region = merge_regions(by_index[index][2], region)
+            by_index[index] = (pts[position], score, region)
+    return [(index, seconds, score, region) for index, (seconds, score, region) in sorted(by_index.items())]
+
+def _write_frames_at(video_path: str, output_dir: str, frames: list, start: float = 0.0):
+    """
+    Writes the selected frames as full resolution JPEGs: [(sample index, seconds from 'start')]
+    -> frame_{index+1}.jpg (same names as the disk mode).
+    Each frame is fetched with an input seek (-ss), so ffmpeg only decodes
+    from the nearest keyframe instead of the whole video again.
+    """
+    batches = [frames[i:i + KEYFRAME_WRITE_BATCH] for i in range(0, len(frames), KEYFRAME_WRITE_BATCH)]
+
+    def _write_batch(batch):
+        command = ["ffmpeg"]
+        for _, seconds in batch:
+            # Rounded down to the ms: an accurate seek never lands on the frame after a PTS
+            command += ["-ss", f"{math.floor((start + seconds) * 1000) / 1000:.3f}", "-i", video_path]
+        for n, (index, _) in enumerate(batch):
+            command += [
+                "-map", f"{n}:v:0", "-frames:v", "1",
+                os.path.join(output_dir, _frame_name(index))
+            ]
+        command.append("-y")
+        subprocess.run(command, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+
+    with ThreadPoolExecutor(max_workers=os.cpu_count() or 4) as pool:
+        list(pool.map(_write_batch, batches))
+
+def _filter_static_frames(frames_dir: str, interval: int = 1):
     """
     Analyzes all extracted frames and deletes duplicates.
     TUNED FOR UI: High sensitivity to catch small mouse movements/typing.
+    Frames are loaded in blocks and scored by the vectorized diff engine.
+    Returns the FrameManifest of the frames left on disk.
     """
     print("👁️  Smart Filter: Analyzing frames for duplication...")
     
     frames = sorted([
         os.path.join(frames_dir, f) for f in os.listdir(frames_dir) if f.endswith(".jpg")
-    ])
+    ], key=frame_sample_index)
     
     if not frames:
-        return
+        return FrameManifest(frames_dir)
+
+    selector = _new_selector()
+    kept = set()
+    scores = {}
+    regions = {}
+    unreadable = set()
+
+    for start in range(0, len(frames), DIFF_BLOCK_SIZE):
+        block_paths = frames[start:start + DIFF_BLOCK_SIZE]
+        block = np.empty((len(block_paths), COMPARE_SIZE, COMPARE_SIZE), dtype=np.uint8)
+        for n, frame_path in enumerate(block_paths):
+            try:
+                block[n] = np.asarray(Image.open(frame_path).convert("L").resize((COMPARE_SIZE, COMPARE_SIZE)))
+            except Exception as e:
+                # Unreadable frame -> left on disk, scored as the previous frame
+                print(f"❌ Error filtering frame {frame_path}: {e}")
+                unreadable.add(start + n)
+                if n:
+                    block[n] = block[n - 1]
+                else:
+                    block[n] = selector.reference if selector.reference is not None else 0
+        indices, kept_scores = selector.push(block)
+        kept.update(indices)
+        scores.update((frame_sample_index(frames[i]), score) for i, score in zip(indices, kept_scores))
+        regions.update((frame_sample_index(frames[i]), selector.regions[i]) for i in indices)
 
-    unique_frames = [frames[0]] 
+    unique_frames = [frames[i] for i in sorted(kept)]
     deleted_count = 0
-    
-    # Increase resolution for comparison (More details visible)
-    # 64x64 was too blurry. 100x100 catches text changes better.
-    prev_image = Image.open(frames[0]).convert("L").resize((100, 100))
-    
-    for i in range(1, len(frames)):
-        current_frame_path = frames[i]
-        
-        try:
-            curr_image_raw = Image.open(current_frame_path).convert("L")
-            curr_image = curr_image_raw.resize((100, 100))
-            
-            img1 = np.array(prev_image)
-            img2 = np.array(curr_image)
-            
-            # Mean Squared Error (Diff nikalna)
-            mse = np.mean((img1 - img2) ** 2)
-            
-            # --- DEBUG LOG (Isay uncomment karke dekh sakte ho values) ---
-            # print(f"   Frame {i} MSE: {mse:.2f}")
-
-            # --- THRESHOLD TUNING ---
-            # Pehle 30 tha (Too aggressive).
-            # Ab 2.0 kar rahe hain (Very sensitive).
-            # Agar MSE 2.0 se kam hai, matlab <1% change hai -> Delete.
-            # Agar MSE > 2.0 hai (Cursor bhi hila), -> Keep.
-            
-            if mse < 2.0: 
-                # DUPLICATE
-                os.remove(current_frame_path)
-                deleted_count += 1
-            else:
-                # UNIQUE ACTION DETECTED
-                unique_frames.append(current_frame_path)
-                prev_image = curr_image 
-                
-        except Exception as e:
-            print(f"❌ Error filtering frame {current_frame_path}: {e}")
+    for i, frame_path in enumerate(frames):
+        if i not in kept and i not in unreadable:
+            os.remove(frame_path)
+            deleted_count += 1
 
     # --- SAFETY NET (Production Guard) ---
     # Agar ghalti se system ne sab ura diya (e.g. < 3 frames bache),
@@ -101,4 +389,6 @@ def _filter_static_frames(frames_dir: str):
     print(f"📉 Optimization: Removed {deleted_count} static frames. Kept {remaining} unique keyframes.")
     
     if remaining < 3 and len(frames) > 10:
-        print("⚠️ WARNING: Too many frames removed! Consider lowering threshold further.")
\ No newline at end of file
+        print("⚠️ WARNING: Too many frames removed! Consider lowering threshold further.")
+
+    return FrameManifest.from_directory(frames_dir, interval, scores, regions)
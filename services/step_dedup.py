@@ -0,0 +1,106 @@
+import re
+import zlib
+import numpy as np
+
+# ======================================================
+# 🔥 SEMANTIC DEDUPLICATION (Local, No Network) 🔥
+# ======================================================
+# 1. After generation: steps are embedded as hashed TF-IDF vectors (content
+#    words, stopwords removed) and near-duplicates are dropped with one cosine
+#    similarity matrix over a sliding window of recent steps.
+# 2. Before generation (opt-in): a frame that brings back a screen sent a few
+#    frames earlier (A -> B -> A) with the same narration is skipped - it would
+#    only produce a duplicate step and cost an LLM call.
+
+EMBEDDING_DIM = 4096
+_TOKEN_RE = re.compile(r"[a-z0-9]+")
+# Filler words make paraphrases of the same step look different
+_STOPWORDS = set("a an the to in on of and for into your this that with is are by at from".split())
+
+def _features(text: str):
+    return [word for word in _TOKEN_RE.findall(text.lower()) if word not in _STOPWORDS]
+
+def embed_texts(texts: list) -> np.ndarray:
+    """(N, EMBEDDING_DIM) float32, L2-normalized TF-IDF with the hashing trick."""
+    n = len(texts)
+    counts = np.zeros((n, EMBEDDING_DIM), dtype=np.float32)
+    for row, text in enumerate(texts):
+        for feature in _features(text):
+            # crc32 is stable across processes (hash() is salted per run)
+            counts[row, zlib.crc32(feature.encode("utf-8")) % EMBEDDING_DIM] += 1.0
+
+    if n == 0:
+        return counts
+
+    doc_freq = np.count_nonzero(counts, axis=0)
+    idf = np.log((1 + n) / (1 + doc_freq)) + 1.0
+    vectors = np.log1p(counts) * idf
+    norms = np.linalg.norm(vectors, axis=1, keepdims=True)
+    return vectors / np.maximum(norms, 1e-12)
+
+def _step_text(step: dict) -> str:
+    return f"{step.get('title', '')}. {step.get('description', '')}"
+
+def dedup_steps(steps: list, threshold: float = 0.8, window: int = 5) -> list:
+    """
+    Drops steps whose cosine similarity with any of the last 'window' kept steps
+    is >= threshold. Steps must already be in time order. Returns the kept steps.
+    """
+    if len(steps) < 2:
+        return list(steps)
+
+    vectors = embed_texts([_step_text(step) for step in steps])
+    similarity = vectors @ vectors.T  # one matrix product for all pairs
+
+    kept = []
+    for j in range(len(steps)):
+        recent = kept[-window:]
+        if recent and similarity[j, recent].max() >= threshold:
+            continue
+        kept.append(j)
+
+    dropped = len(steps) - len(kept)
+    if dropped:
+        print(f"🧹 Semantic Dedup: Removed {dropped} near-duplicate steps.")
+    return [steps[j] for j in kept]
+
+# --- PRE-GENERATION: FRAME HASH DEDUP ---
+_POPCOUNT = np.array([bin(b).count("1") for b in range(256)], dtype=np.uint8)
+
+class FrameDuplicatePredictor:
+    """
+    Sequential filter over frames in time order. A frame is predicted to produce a
+    duplicate step only when the screen RETURNS: its dHash is within 'max_distance'
+    bits of an older sent frame, the last sent frame is clearly different (more than
+    'max_distance' bits away) AND the narration around it is the same.
+    (e.g. dropdown opened -> closed again -> the same screen comes back)
+    A 9x8 dHash can't see small edits (typed text, a toggle), so a frame that is
+    close to the last sent frame is never skipped - the static filter kept it for a reason.
+    """
+
+    def __init__(self, window: int = 8, max_distance: int = 3):
+        self.window = window
+        self.max_distance = max_distance
+        self._hashes = []  # uint64 dHashes of recently sent frames
+        self._audio = []
+        self.skipped = 0
+
+    def is_duplicate(self, dhash_hex: str, audio_text) -> bool:
+        value = np.uint64(int(dhash_hex, 16))
+        audio = " ".join(audio_text.lower().split()) if audio_text else ""
+
+        if len(self._hashes) >= 2:
+            recent = np.array(self._hashes, dtype=np.uint64)
+            distances = _POPCOUNT[(recent ^ value).view(np.uint8)].reshape(len(recent), 8).sum(axis=1)
+            # A -> B -> A: the screen in between must really be a different one
+            if distances[-1] > self.max_distance:
+                for k in np.flatnonzero(distances[:-1] <= self.max_distance):
+                    if self._audio[k] == audio:
+                        self.skipped += 1
+                        return True
+
+        self._hashes.append(int(value))
+        self._audio.append(audio)
+        if len(self._hashes) > self.window:
+            del self._hashes[0], self._audio[0]
+        return False
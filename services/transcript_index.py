@@ -0,0 +1,67 @@
+import bisect
+import numpy as np
+
+# Audio context window: segments within 2 seconds before/after a frame
+AUDIO_CONTEXT_BUFFER = 2.0
+
+class TranscriptIndex:
+    """
+    Sorted interval index over transcript segments, built once per video.
+    A segment matches timestamp t when  start - buffer <= t <= end + buffer.
+
+    Segments are kept sorted by window start, so a query only scans the few
+    segments whose window can still reach t (found by bisection) instead of
+    the whole transcript. Matching texts are joined in start order.
+    """
+
+    def __init__(self, transcript: list = None, buffer: float = AUDIO_CONTEXT_BUFFER):
+        self.buffer = buffer
+        self._lo = []      # start - buffer (sorted)
+        self._hi = []      # end + buffer
+        self._texts = []
+        self._max_span = 0.0  # longest window, bounds how far back a query has to look
+        for segment in transcript or []:
+            self.append(segment)
+
+    def __len__(self):
+        return len(self._lo)
+
+    def append(self, segment: dict):
+        """Adds one segment. O(1) when segments arrive in order (Whisper streaming)."""
+        lo = segment.get("start", 0) - self.buffer
+        hi = segment.get("end", 0) + self.buffer
+        pos = len(self._lo)
+        if self._lo and lo < self._lo[-1]:
+            pos = bisect.bisect_right(self._lo, lo)
+        self._lo.insert(pos, lo)
+        self._hi.insert(pos, hi)
+        self._texts.insert(pos, segment.get("text", ""))
+        self._max_span = max(self._max_span, hi - lo)
+
+    def context_at(self, timestamp: float):
+        """Joined audio text around 'timestamp' (None if nothing was said)."""
+        first = bisect.bisect_left(self._lo, timestamp - self._max_span)
+        last = bisect.bisect_right(self._lo, timestamp)
+        texts = [self._texts[k] for k in range(first, last) if self._hi[k] >= timestamp]
+        return " ".join(texts) if texts else None
+
+    def contexts_for(self, timestamps) -> list:
+        """
+        Batch lookup: audio context for every frame timestamp in one sweep.
+        Candidate ranges for all timestamps come from two vectorized searchsorted calls.
+        """
+        if not self._lo:
+            return [None] * len(timestamps)
+
+        lo = np.asarray(self._lo)
+        ts = np.asarray(timestamps, dtype=np.float64)
+        firsts = np.searchsorted(lo, ts - self._max_span, side="left").tolist()
+        lasts = np.searchsorted(lo, ts, side="right").tolist()
+
+        hi = self._hi
+        texts = self._texts
+        contexts = []
+        for t, first, last in zip(ts.tolist(), firsts, lasts):
+            matches = [texts[k] for k in range(first, last) if hi[k] >= t]
+            contexts.append(" ".join(matches) if matches else None)
+        return contexts
@@ -0,0 +1,68 @@
+import time
+import argparse
+import numpy as np
+from services.transcript_index import TranscriptIndex, AUDIO_CONTEXT_BUFFER
+
+# ======================================================
+# 🔥 TRANSCRIPT INDEX BENCHMARK (index vs linear scan) 🔥
+# ======================================================
+# Usage: python -m services.transcript_index_benchmark [--segments 10000] [--frames 10000]
+# Synthetic transcript (back-to-back segments, 1-6s each) aur frame timestamps usi range mein.
+# Purana tareeqa: har frame ke liye poori transcript scan. Output dono ka same hona chahiye.
+
+def synthetic_transcript(segments: int, seed: int = 0) -> list:
+    rng = np.random.default_rng(seed)
+    transcript, t = [], 0.0
+    for n in range(segments):
+        length = float(rng.uniform(1.0, 6.0))
+        transcript.append({"start": t, "end": t + length, "text": f"segment {n}"})
+        t += length + float(rng.uniform(0.0, 1.5))  # pauses between sentences
+    return transcript
+
+def linear_scan(timestamp: float, transcript: list):
+    """The old per-frame lookup: every segment checked for every frame."""
+    context_text = []
+    for segment in transcript:
+        start = segment.get("start", 0)
+        end = segment.get("end", 0)
+        if start - AUDIO_CONTEXT_BUFFER <= timestamp <= end + AUDIO_CONTEXT_BUFFER:
+            context_text.append(segment.get("text", ""))
+    return " ".join(context_text) if context_text else None
+
+def _timed(fn):
+    start = time.perf_counter()
+    result = fn()
+    return time.perf_counter() - start, result
+
+def run_benchmark(segments: int = 10000, frames: int = 10000, seed: int = 0) -> dict:
+    transcript = synthetic_transcript(segments, seed)
+    duration = transcript[-1]["end"]
+    timestamps = np.sort(np.random.default_rng(seed + 1).uniform(0, duration, frames)).tolist()
+
+    scan_s, expected = _timed(lambda: [linear_scan(t, transcript) for t in timestamps])
+    build_s, index = _timed(lambda: TranscriptIndex(transcript))
+    single_s, singles = _timed(lambda: [index.context_at(t) for t in timestamps])
+    batch_s, batch = _timed(lambda: index.contexts_for(timestamps))
+
+    results = {
+        "linear_scan_s": round(scan_s, 3),
+        "build_index_s": round(build_s, 3),
+        "context_at_s": round(single_s, 3),
+        "contexts_for_s": round(batch_s, 3),
+        "identical": singles == expected and batch == expected,
+    }
+    print(f"\n📊 Transcript index benchmark: {segments} segments x {frames} frame timestamps")
+    print(f"   linear scan     {results['linear_scan_s']:>8.3f}s")
+    print(f"   build index     {results['build_index_s']:>8.3f}s")
+    print(f"   context_at loop {results['context_at_s']:>8.3f}s")
+    print(f"   contexts_for    {results['contexts_for_s']:>8.3f}s")
+    print(f"   output identical to the scan: {results['identical']}")
+    return results
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Compare TranscriptIndex lookups with the old linear scan.")
+    parser.add_argument("--segments", type=int, default=10000)
+    parser.add_argument("--frames", type=int, default=10000)
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+    run_benchmark(args.segments, args.frames, args.seed)
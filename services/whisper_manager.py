@@ -0,0 +1,278 @@
+import os
+import time
+import secrets
+import threading
+import multiprocessing
+import numpy as np
+from multiprocessing.connection import Listener, Client
+from core.config import settings
+from services.processing import PCM_EXTENSION
+
+# ======================================================
+# 🔥 WHISPER MODEL LIFECYCLE 🔥
+# ======================================================
+# Prefork pool ke N children = RAM mein N model copies + har recycle par dobara load.
+# "Parent mein load karo, fork ke baad share karo" CTranslate2 ke saath nahi chalta:
+# model apne worker threads constructor mein banata hai aur fork ke baad child mein
+# woh threads nahi hote -> pehli transcribe() call hang ho jati hai.
+#
+# Is liye do modes:
+# - "server": worker_init (parent) AIK alag process spawn karta hai jo model load karta hai.
+#             Children Unix socket par audio bhejte hain aur segments stream hote hue wapis aate hain.
+#             RAM mein sirf ek copy; child recycle par koi reload nahi.
+# - "local":  har child apna model load karta hai (worker_process_init ya first use par).
+# Server down ho to child khud "local" par fallback karta hai.
+
+# How often start_server checks that the server process is still alive while the model loads
+SERVER_POLL_INTERVAL = 0.5
+
+def memory_usage() -> dict:
+    """RSS + PSS (shared pages split between processes) of this process in MB. Linux only."""
+    usage = {}
+    try:
+        with open("/proc/self/smaps_rollup") as f:
+            for line in f:
+                key, _, value = line.partition(":")
+                if key in ("Rss", "Pss"):
+                    usage[f"{key.lower()}_mb"] = round(int(value.split()[0]) / 1024, 1)
+    except OSError:
+        import resource
+        usage["max_rss_mb"] = round(resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024, 1)
+    return usage
+
+class WhisperModelManager:
+    def __init__(self, model_size: str = "base", device: str = "cpu", compute_type: str = "int8",
+                 cpu_threads: int = 0, num_workers: int = 1, mode: str = "local"):
+        if mode not in ("local", "server"):
+            raise ValueError(f"Unknown WHISPER_MODE '{mode}'. Options: ['local', 'server']")
+        self.model_size = model_size
+        self.device = device
+        self.compute_type = compute_type
+        self.cpu_threads = cpu_threads
+        self.num_workers = num_workers
+        self.mode = mode
+
+        self._model = None
+        self._model_loaded = False
+        self._lock = threading.Lock()
+
+        # Server mode: set in the parent, inherited by forked children
+        self.address = None
+        self.authkey = None
+        self._server = None
+        self._server_owner = None  # pid that spawned the server (only it may stop it)
+
+    @classmethod
+    def from_settings(cls):
+        return cls(
+            model_size=settings.WHISPER_MODEL_SIZE,
+            device=settings.WHISPER_DEVICE,
+            compute_type=settings.WHISPER_COMPUTE_TYPE,
+            cpu_threads=settings.WHISPER_CPU_THREADS,
+            num_workers=settings.WHISPER_NUM_WORKERS,
+            mode=settings.WHISPER_MODE,
+        )
+
+    @property
+    def config(self) -> dict:
+        return {
+            "model_size": self.model_size,
+            "device": self.device,
+            "compute_type": self.compute_type,
+            "cpu_threads": self.cpu_threads,
+            "num_workers": self.num_workers,
+        }
+
+    # --- LOCAL MODEL ---
+    def get_model(self):
+        """This process's own model (local mode / fallback). None if loading failed."""
+        if not self._model_loaded:
+            with self._lock:
+                if not self._model_loaded:
+                    self._model = _load_model(self.config)
+                    self._model_loaded = True
+        return self._model
+
+    # --- SERVER ---
+    def start_server(self, timeout: float = 600.0) -> bool:
+        """Call in the Celery parent BEFORE the pool forks. Returns False if the server didn't come up."""
+        if self._server is not None:
+            return True
+        self._server_owner = os.getpid()
+        self.address = os.path.join(settings.WHISPER_SOCKET_DIR, f"docpilot-whisper-{os.getpid()}.sock")
+        self.authkey = secrets.token_bytes(16)
+
+        # spawn (not fork): the server starts clean, without the parent's threads/sockets
+        context = multiprocessing.get_context("spawn")
+        ready = context.Event()
+        self._server = context.Process(
+            target=_serve,
+            args=(self.config, self.address, self.authkey, ready),
+            name="whisper-server",
+            daemon=True,
+        )
+        self._server.start()
+
+        if not self._wait_ready(ready, timeout):
+            print("❌ Whisper server did not start. Children will load their own model.")
+            self.stop_server()
+            return False
+        print(f"🎙️ Whisper server ready (pid {self._server.pid}) at {self.address}")
+        return True
+
+    def _wait_ready(self, ready, timeout: float) -> bool:
+        """Waits for the model load, but gives up as soon as the server process dies (OOM, bad model name)."""
+        deadline = time.monotonic() + timeout
+        while not ready.wait(SERVER_POLL_INTERVAL):
+            if not self._server.is_alive():
+                print(f"❌ Whisper server exited during model load (exit code {self._server.exitcode}).")
+                return False
+            if time.monotonic() >= deadline:
+                return False
+        return self._server.is_alive()
+
+    def stop_server(self):
+        if self._server is None or self._server_owner != os.getpid():
+            return
+        self._server.terminate()
+        self._server.join(5)
+        self._server = None
+        if os.path.exists(self.address):
+            os.unlink(self.address)
+        self.address = None
+
+    # --- TRANSCRIBE (same shape as faster-whisper: (segments iterator, info)) ---
+    def transcribe(self, audio, **options):
+        if self.mode == "server" and self.address:
+            try:
+                return _remote_transcribe(self.address, self.authkey, audio, options)
+            except (OSError, EOFError) as e:
+                print(f"⚠️ Whisper server unreachable ({e}). Falling back to a local model.")
+                self.address = None
+
+        model = self.get_model()
+        if model is None:
+            raise RuntimeError("Whisper model not loaded")
+        segments, info = _transcribe_with(model, audio, options)
+        segments = ({"start": s.start, "end": s.end, "text": s.text} for s in segments)
+        return segments, {"language": info.language, "language_probability": info.language_probability}
+
+def _transcribe_with(model, audio, options: dict):
+    """options with 'batch_size' -> batched pipeline over VAD speech chunks, else the sequential decoder."""
+    options = dict(options)
+    batch_size = options.pop("batch_size", 0)
+    if batch_size:
+        from faster_whisper import BatchedInferencePipeline
+        # Pipeline sirf model ka wrapper hai (no extra weights), har call par banana sasta hai
+        return BatchedInferencePipeline(model).transcribe(audio, batch_size=batch_size, **options)
+    return model.transcribe(audio, **options)
+
+def _load_model(config: dict):
+    print(f"⏳ Loading Faster-Whisper model ({config['model_size']}, {config['compute_type']})...")
+    try:
+        # Import yahan hai: faster_whisper/ctranslate2 sirf worker mein load hon, API mein nahi
+        from faster_whisper import WhisperModel
+        # It downloads the model on first run
+        model = WhisperModel(
+            config["model_size"],
+            device=config["device"],
+            compute_type=config["compute_type"],
+            cpu_threads=config["cpu_threads"],
+            num_workers=config["num_workers"],  # parallel transcriptions on one model
+        )
+        print(f"✅ Faster-Whisper model loaded successfully! Memory: {memory_usage()}")
+        return model
+    except Exception as e:
+        print(f"❌ Error loading model: {e}")
+        return None
+
+def _wire_audio(audio):
+    """
+    A memmap of a whole .f32 file goes over the socket as its path; the server maps the
+    same file itself (no pickled copy of the PCM). Other arrays and paths are sent as they are.
+    """
+    filename = getattr(audio, "filename", None)
+    if (filename and filename.endswith(PCM_EXTENSION) and audio.dtype == np.float32 and audio.flags.c_contiguous
+            and os.path.exists(filename) and audio.nbytes == os.path.getsize(filename)):
+        return filename
+    return audio
+
+def _remote_transcribe(address, authkey, audio, options):
+    conn = Client(address, family="AF_UNIX", authkey=authkey)
+    try:
+        conn.send((_wire_audio(audio), options))
+        status, payload = conn.recv()
+    except Exception:
+        conn.close()
+        raise
+    if status == "error":
+        conn.close()
+        raise RuntimeError(f"Whisper server: {payload}")
+
+    def _segments():
+        try:
+            while True:
+                kind, segment = conn.recv()
+                if kind == "end":
+                    return
+                if kind == "error":
+                    raise RuntimeError(f"Whisper server: {segment}")
+                yield segment
+        finally:
+            conn.close()
+
+    return _segments(), payload
+
+# --- SERVER PROCESS ---
+def _serve(config: dict, address: str, authkey: bytes, ready):
+    parent = os.getppid()
+
+    def _watch_parent():
+        # Celery parent SIGKILL ho jaye to server orphan na bane
+        while os.getppid() == parent:
+            time.sleep(5)
+        os._exit(0)
+
+    threading.Thread(target=_watch_parent, daemon=True).start()
+    from services.audio_service import load_audio  # audio_service imports this module
+    model = _load_model(config)
+    if model is None:
+        return
+
+    if os.path.exists(address):
+        os.unlink(address)
+    listener = Listener(address, family="AF_UNIX", authkey=authkey)
+    ready.set()
+
+    def _handle(conn):
+        try:
+            audio, options = conn.recv()
+            # '.f32' path -> memmap here (same as the client would have); MP3 paths/arrays pass through
+            segments, info = _transcribe_with(model, load_audio(audio), options)
+            conn.send(("ok", {"language": info.language, "language_probability": info.language_probability}))
+            # Segment decode hote hi bhej do (pipelined generation isi par chalti hai)
+            for s in segments:
+                conn.send(("segment", {"start": s.start, "end": s.end, "text": s.text}))
+            conn.send(("end", None))
+        except (EOFError, BrokenPipeError, ConnectionResetError):
+            pass  # client went away mid-stream
+        except Exception as e:
+            try:
+                conn.send(("error", str(e)))
+            except OSError:
+                pass
+        finally:
+            conn.close()
+
+    # One thread per request; model.transcribe runs num_workers jobs in parallel
+    while True:
+        try:
+            conn = listener.accept()
+        except OSError:
+            break  # socket closed
+        except Exception as e:
+            print(f"⚠️ Whisper server rejected a connection: {e}")  # e.g. wrong authkey
+            continue
+        threading.Thread(target=_handle, args=(conn,), daemon=True).start()
+
+whisper_manager = WhisperModelManager.from_settings()
@@ -0,0 +1,12 @@
+import os
+import sys
+import tempfile
+
+# Tests run from a checkout: repo root on the path, and the settings that core.config
+# reads at import time pointed at throwaway local resources
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+# File DB, not :memory: - db/session.py passes pool sizes that SingletonThreadPool rejects
+os.environ.setdefault("DATABASE_URL", f"sqlite:///{os.path.join(tempfile.gettempdir(), 'docpilot-tests.db')}")
+os.environ.setdefault("REDIS_URL", "redis://localhost:6379/0")
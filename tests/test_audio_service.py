@@ -0,0 +1,75 @@
+import numpy as np
+import pytest
+from services import audio_service
+from services.audio_service import TranscriptStream
+
+AUDIO = np.zeros(16000 * 3, dtype=np.float32)
+INFO = {"language": "en", "language_probability": 0.99}
+
+class MemoryCache:
+    def __init__(self):
+        self.data = {}
+
+    def get(self, key):
+        return self.data.get(key)
+
+    def set(self, key, value):
+        self.data[key] = value
+
+@pytest.fixture
+def whisper(monkeypatch):
+    cache = MemoryCache()
+    monkeypatch.setattr(audio_service, "_get_transcript_cache", lambda: cache)
+    calls = {"fail_after": None}
+
+    def transcribe(audio, **options):
+        def segments():
+            for n in range(3):
+                if calls["fail_after"] == n:
+                    raise RuntimeError("CUDA out of memory")
+                yield {"start": float(n), "end": n + 1.0, "text": f" segment {n} "}
+        return segments(), INFO
+
+    monkeypatch.setattr(audio_service.whisper_manager, "transcribe", transcribe)
+    calls["cache"] = cache
+    return calls
+
+def test_full_run_is_complete_and_cached(whisper):
+    stream = TranscriptStream(AUDIO, refresh=False)
+    assert [s["text"] for s in stream] == ["segment 0", "segment 1", "segment 2"]
+    assert stream.complete
+    assert len(whisper["cache"].data) == 1
+
+    # Cache hit counts as a full transcript too
+    cached = TranscriptStream(AUDIO, refresh=False)
+    assert len(list(cached)) == 3 and cached.complete
+
+def test_store_false_leaves_the_cache_alone(whisper, monkeypatch):
+    def no_hashing(audio):
+        raise AssertionError("audio hashed although the cache is neither read nor written")
+    monkeypatch.setattr(audio_service, "audio_content_hash", no_hashing)
+    segments = audio_service.transcribe_audio_local(AUDIO, refresh=True, store=False)
+    assert len(segments) == 3
+    assert whisper["cache"].data == {}
+
+def test_failed_run_is_not_complete(whisper):
+    whisper["fail_after"] = 1
+    stream = TranscriptStream(AUDIO, refresh=False)
+    assert len(list(stream)) == 1  # error is still swallowed, the stream just ends
+    assert not stream.complete
+    assert whisper["cache"].data == {}
+
+def test_missing_file_is_not_complete(whisper):
+    stream = TranscriptStream("/nonexistent/audio.f32")
+    assert list(stream) == [] and not stream.complete
+
+@pytest.mark.parametrize("vad_setting", [None, True, False])
+def test_batched_mode_always_uses_vad(monkeypatch, vad_setting):
+    # Batched pipeline without VAD fails on audio over 30s ("No clip timestamps found")
+    monkeypatch.setattr(audio_service.settings, "WHISPER_VAD_FILTER", vad_setting)
+    assert audio_service.transcription_options("batched")["vad_filter"] is True
+
+@pytest.mark.parametrize("vad_setting, expected", [(None, False), (True, True), (False, False)])
+def test_sequential_mode_follows_vad_setting(monkeypatch, vad_setting, expected):
+    monkeypatch.setattr(audio_service.settings, "WHISPER_VAD_FILTER", vad_setting)
+    assert audio_service.transcription_options("sequential")["vad_filter"] is expected
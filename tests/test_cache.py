@@ -0,0 +1,46 @@
+import fakeredis
+import pytest
+
+import core.redis_client
+import services.cache as cache_module
+from services.cache import RedisCache
+
+@pytest.fixture
+def redis(monkeypatch):
+    client = fakeredis.FakeRedis()
+    monkeypatch.setattr(core.redis_client, "get_redis", lambda: client)
+    return client
+
+def test_corrupt_entry_is_a_miss(redis):
+    cache = RedisCache("test", ttl=60, max_entries=10)
+    cache.set("good", {"title": "Save"})
+    redis.set(f"{cache.prefix}:bad", b"{not json")
+
+    assert cache.get("bad") is None
+    assert cache.get("good") == {"title": "Save"}
+    assert (cache.hits, cache.misses) == (1, 1)
+
+def test_expired_keys_are_pruned_from_the_lru_set(redis, monkeypatch):
+    now = [1000.0]
+    monkeypatch.setattr(cache_module.time, "time", lambda: now[0])
+    cache = RedisCache("test", ttl=60, max_entries=10)
+    for n in range(5):
+        cache.set(f"old{n}", n)
+
+    now[0] += 61  # old* expired in Redis (EX), still members of the LRU set
+    cache.set("fresh", 1)
+    assert [member.decode() for member in redis.zrange(cache.lru_key, 0, -1)] == ["fresh"]
+
+def test_overflow_evicts_least_recently_used(redis, monkeypatch):
+    now = [1000.0]
+    monkeypatch.setattr(cache_module.time, "time", lambda: now[0])
+    cache = RedisCache("test", ttl=0, max_entries=2)
+    for key in ("a", "b"):
+        cache.set(key, key)
+        now[0] += 1
+    cache.get("a")
+    now[0] += 1
+    cache.set("c", "c")
+
+    assert cache.get("b") is None
+    assert cache.get("a") == "a" and cache.get("c") == "c"
@@ -0,0 +1,59 @@
+import os
+
+import pytest
+
+import services.checkpoint as checkpoint_module
+from services.checkpoint import VideoCheckpoint
+
+@pytest.fixture
+def artifacts(tmp_path):
+    frames = tmp_path / "frames"
+    frames.mkdir()
+    for n in range(3):
+        (frames / f"frame_{n}.jpg").write_bytes(bytes([n]) * 100)
+    audio = tmp_path / "audio.f32"
+    audio.write_bytes(b"\0" * 400)
+    return tmp_path, str(frames), str(audio)
+
+def test_is_complete_does_not_rehash(artifacts, monkeypatch):
+    base_dir, frames, audio = artifacts
+    VideoCheckpoint(str(base_dir)).complete("extract", audio=audio, frames=frames)
+
+    def no_hashing(path):
+        raise AssertionError("is_complete re-hashed an artifact")
+    monkeypatch.setattr(checkpoint_module, "artifact_hash", no_hashing)
+    assert VideoCheckpoint(str(base_dir)).is_complete("extract")
+
+def test_changed_or_missing_artifact_reruns_stage(artifacts):
+    base_dir, frames, audio = artifacts
+    VideoCheckpoint(str(base_dir)).complete("extract", audio=audio, frames=frames)
+
+    with open(os.path.join(frames, "frame_1.jpg"), "ab") as f:
+        f.write(b"more")
+    assert not VideoCheckpoint(str(base_dir)).is_complete("extract")
+
+    VideoCheckpoint(str(base_dir)).complete("extract", audio=audio, frames=frames)
+    os.remove(audio)
+    assert not VideoCheckpoint(str(base_dir)).is_complete("extract")
+
+def test_force_catches_same_size_same_mtime_edit(artifacts):
+    base_dir, frames, audio = artifacts
+    VideoCheckpoint(str(base_dir)).complete("transcribe", transcript=audio)
+
+    stat = os.stat(audio)
+    with open(audio, "r+b") as f:
+        f.write(b"\1")
+    os.utime(audio, ns=(stat.st_atime_ns, stat.st_mtime_ns))
+
+    checkpoint = VideoCheckpoint(str(base_dir))
+    assert checkpoint.is_complete("transcribe")
+    assert not checkpoint.is_complete("transcribe", force=True)
+
+def test_manifest_without_fingerprint_falls_back_to_hash(artifacts):
+    base_dir, frames, audio = artifacts
+    checkpoint = VideoCheckpoint(str(base_dir))
+    checkpoint.complete("extract", audio=audio, frames=frames)
+    for artifact in checkpoint.data["stages"]["extract"]["artifacts"].values():
+        del artifact["stat"]
+    checkpoint.save()
+    assert VideoCheckpoint(str(base_dir)).is_complete("extract")
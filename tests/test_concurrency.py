@@ -0,0 +1,50 @@
+import asyncio
+from services.concurrency import AdaptiveLimiter
+
+class RateLimited(Exception):
+    status_code = 429
+
+async def _throttled_burst(limiter, n):
+    """n requests in flight at once, all answered with a 429."""
+    entered = 0
+    all_in = asyncio.Event()
+
+    async def request():
+        nonlocal entered
+        try:
+            async with limiter.slot():
+                entered += 1
+                if entered == n:
+                    all_in.set()
+                await asyncio.wait_for(all_in.wait(), timeout=5)  # fail, don't hang, if the slots never fill
+                raise RateLimited()
+        except (RateLimited, asyncio.TimeoutError):
+            pass
+
+    await asyncio.gather(*(request() for _ in range(n)))
+
+def test_concurrent_throttles_halve_the_limit_once():
+    limiter = AdaptiveLimiter("test", initial=16, max_limit=32)
+    asyncio.run(_throttled_burst(limiter, 16))
+    assert limiter.throttled == 16
+    assert limiter.limit == 8.0  # one congestion event, not 16 halvings down to min_limit
+
+def test_new_congestion_event_halves_again():
+    limiter = AdaptiveLimiter("test", initial=16, max_limit=32)
+
+    async def scenario():
+        await _throttled_burst(limiter, 16)
+        await _throttled_burst(limiter, 8)  # requests sent after the first decrease
+
+    asyncio.run(scenario())
+    assert limiter.limit == 4.0
+
+def test_release_without_generation_still_decreases():
+    limiter = AdaptiveLimiter("test", initial=8)
+
+    async def scenario():
+        await limiter.acquire()
+        await limiter.release(status="throttled")
+
+    asyncio.run(scenario())
+    assert limiter.limit == 4.0
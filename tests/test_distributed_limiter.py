@@ -0,0 +1,112 @@
+import time
+import asyncio
+import fakeredis
+import pytest
+from services.distributed_limiter import ClusterRateLimiter, LocalRateLimiter
+
+# Two ClusterRateLimiter instances on one (fake) Redis = two Celery workers sharing the account quota
+
+@pytest.fixture
+def redis_server():
+    return fakeredis.FakeServer()
+
+def _worker(server, **limits):
+    limits = {"rpm": 0, "tpm": 0, "max_concurrency": 0, **limits}
+    return ClusterRateLimiter("test", redis_client=fakeredis.FakeRedis(server=server), **limits)
+
+class FlakyRedis:
+    """fakeredis client whose script calls fail while 'down' is set."""
+
+    def __init__(self, server):
+        self.client = fakeredis.FakeRedis(server=server)
+        self.down = False
+
+    def register_script(self, source):
+        script = self.client.register_script(source)
+
+        def call(**kwargs):
+            if self.down:
+                raise ConnectionError("redis down")
+            return script(**kwargs)
+        return call
+
+    def zrem(self, *args):
+        if self.down:
+            raise ConnectionError("redis down")
+        return self.client.zrem(*args)
+
+def test_rpm_is_shared_across_workers(redis_server):
+    a, b = _worker(redis_server, rpm=3), _worker(redis_server, rpm=3)
+    assert a.try_acquire(0, "1") == 0
+    assert b.try_acquire(0, "2") == 0
+    assert a.try_acquire(0, "3") == 0
+    # Quota spent by both workers together -> the 4th request waits ~20s (60s / 3 rpm)
+    wait = b.try_acquire(0, "4")
+    assert 19 < wait <= 20
+
+def test_tpm_counts_estimated_tokens(redis_server):
+    a, b = _worker(redis_server, tpm=1000), _worker(redis_server, tpm=1000)
+    assert a.try_acquire(600, "1") == 0
+    assert b.try_acquire(600, "2") > 0
+    assert b.try_acquire(400, "3") == 0
+
+def test_concurrency_leases_are_cluster_wide(redis_server):
+    a, b = _worker(redis_server, max_concurrency=2), _worker(redis_server, max_concurrency=2)
+    assert a.try_acquire(0, "1") == 0
+    assert b.try_acquire(0, "2") == 0
+    assert a.try_acquire(0, "3") > 0
+    b.release("2")
+    assert a.try_acquire(0, "3") == 0
+
+def test_expired_lease_of_a_dead_worker_is_reclaimed(redis_server):
+    a = ClusterRateLimiter("test", 0, 0, 1, lease_ttl=1, redis_client=fakeredis.FakeRedis(server=redis_server))
+    b = _worker(redis_server, max_concurrency=1)
+    assert a.try_acquire(0, "dead") == 0  # never released
+    assert b.try_acquire(0, "2") > 0
+    time.sleep(1.1)
+    assert b.try_acquire(0, "2") == 0
+
+def test_redis_outage_falls_back_then_recovers(redis_server):
+    flaky = FlakyRedis(redis_server)
+    limiter = ClusterRateLimiter("test", 0, 0, 1, redis_client=flaky, retry_cooldown=0.2)
+    other = _worker(redis_server, max_concurrency=1)
+
+    flaky.down = True
+    assert limiter.try_acquire(0, "local") == 0  # local limiter granted it
+    assert limiter.using_fallback
+    flaky.down = False
+    # Still inside the cooldown: Redis is not hammered, the local limiter keeps deciding
+    assert limiter.try_acquire(0, "local-2") > 0
+
+    time.sleep(0.25)
+    limiter.release("local")  # granted locally -> released locally, never touches Redis
+    assert not limiter.local.holds("local")
+    assert limiter.try_acquire(0, "shared") == 0
+    assert not limiter.using_fallback
+    assert limiter.fallbacks == 1
+    # Back on Redis: the other worker sees this lease
+    assert other.try_acquire(0, "other") > 0
+
+def test_local_limiter_keeps_no_leases_without_a_concurrency_cap():
+    local = LocalRateLimiter(rpm=0, tpm=0, max_concurrency=0)
+    for n in range(1000):
+        assert local.try_acquire(0, str(n)) == 0
+    assert not local._leases
+
+def test_limit_context_waits_for_a_free_slot(redis_server):
+    a, b = _worker(redis_server, max_concurrency=1), _worker(redis_server, max_concurrency=1)
+    order = []
+
+    async def call(limiter, name, hold):
+        async with limiter.limit():
+            order.append(f"{name} start")
+            await asyncio.sleep(hold)
+            order.append(f"{name} end")
+
+    async def main():
+        first = asyncio.create_task(call(a, "a", 0.3))
+        await asyncio.sleep(0.05)
+        await asyncio.gather(first, call(b, "b", 0))
+
+    asyncio.run(main())
+    assert order == ["a start", "a end", "b start", "b end"]
@@ -0,0 +1,50 @@
+import numpy as np
+import pytest
+
+from services.frame_diff import DEFAULT_THRESHOLDS, METRICS, KeyframeSelector, mse, mean_abs_diff
+
+def _frames(n, seed=0):
+    return np.random.default_rng(seed).integers(0, 256, (n, 100, 100), dtype=np.uint8)
+
+def test_scores_do_not_wrap_around_uint8():
+    # 0 vs 255 everywhere: uint8 subtraction would wrap to 1 (MSE 1, "static")
+    black = np.zeros((100, 100), dtype=np.uint8)
+    white = np.full((1, 100, 100), 255, dtype=np.uint8)
+    assert mse(black, white)[0] == 255 ** 2
+    assert mean_abs_diff(black, white)[0] == 255
+    assert mse(white[0], black[None])[0] == 255 ** 2
+
+@pytest.mark.parametrize("metric", list(METRICS))
+def test_single_frame_score_matches_block_score(metric):
+    reference, frames = _frames(1)[0], _frames(5, seed=1)
+    block = METRICS[metric](reference, frames)
+    single = [METRICS[metric](reference, frame) for frame in frames]
+    np.testing.assert_allclose(single, block, rtol=1e-6)
+    exact = [np.mean((reference.astype(np.float64) - frame) ** 2) for frame in frames]
+    if metric == "mse":
+        np.testing.assert_allclose(block, exact)
+
+@pytest.mark.parametrize("runs", [[1] * 40, [3, 1, 17, 2, 40, 1, 1, 9]])
+def test_selector_keeps_the_same_frames_as_a_per_pair_loop(runs):
+    # Static stretches of the given lengths, +-1 noise inside each stretch
+    rng = np.random.default_rng(2)
+    frames = []
+    for length in runs:
+        screen = rng.integers(0, 256, (100, 100)).astype(np.int16)
+        for _ in range(length):
+            frames.append(np.clip(screen + rng.integers(-1, 2, screen.shape), 0, 255).astype(np.uint8))
+    frames = np.stack(frames)
+
+    expected, reference = [], None
+    for index, frame in enumerate(frames):
+        if reference is None or mse(reference, frame) >= DEFAULT_THRESHOLDS["mse"]:
+            expected.append(index)
+            reference = frame
+
+    selector = KeyframeSelector(tile=0)
+    kept = []
+    for start in range(0, len(frames), 7):  # odd block size: stretches cross push() boundaries
+        kept.extend(selector.push(frames[start:start + 7])[0])
+    assert kept == expected
+    assert kept == list(np.cumsum([0] + runs[:-1]))
+    assert all(region is None for region in selector.regions.values())
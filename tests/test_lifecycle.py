@@ -0,0 +1,22 @@
+import pytest
+from celery import Celery
+from core.config import settings
+from workers.lifecycle import transcribes
+
+def _worker_app(queues=None):
+    """Celery app with the queue selection a worker started with '-Q <queues>' would have."""
+    app = Celery("test", broker="memory://")
+    app.conf.task_routes = {"cpu_task": {"queue": settings.CELERY_CPU_QUEUE},
+                            "io_task": {"queue": settings.CELERY_IO_QUEUE}}
+    if queues:
+        app.amqp.queues.select(queues)
+    return app
+
+@pytest.mark.parametrize("queues, expected", [
+    (None, True),                                                   # default queue: inline pipeline
+    ([settings.CELERY_CPU_QUEUE], True),                            # staged extract/transcribe
+    ([settings.CELERY_IO_QUEUE], False),                            # generate/persist only
+    ([settings.CELERY_IO_QUEUE, settings.CELERY_CPU_QUEUE], True),
+])
+def test_only_transcribing_workers_load_whisper(queues, expected):
+    assert transcribes(_worker_app(queues)) is expected
@@ -0,0 +1,22 @@
+import os
+import sys
+import json
+import subprocess
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+# The API process only enqueues work: importing the routes must not pull in
+# Whisper / LLM SDKs or the Celery task module (they cost seconds and hundreds of MB)
+HEAVY_MODULES = ("faster_whisper", "ctranslate2", "openai", "google.generativeai", "workers.tasks")
+
+def test_routes_import_stays_light():
+    code = (
+        "import sys, json\n"
+        "import routes.video\n"
+        f"print(json.dumps([m for m in {HEAVY_MODULES!r} if m in sys.modules]))\n"
+    )
+    # Fresh interpreter: this test process may already have them imported
+    result = subprocess.run([sys.executable, "-c", code], cwd=ROOT, env=os.environ.copy(),
+                            capture_output=True, text=True, timeout=120)
+    assert result.returncode == 0, result.stderr
+    assert json.loads(result.stdout.strip().splitlines()[-1]) == []
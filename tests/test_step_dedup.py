@@ -0,0 +1,55 @@
+from services.step_dedup import FrameDuplicatePredictor, dedup_steps
+
+# dHashes as hex: A and A_EDIT differ in 1 bit (small edit dHash can't see), B is a different screen
+A = "00000000ffffffff"
+A_EDIT = "00000000fffffffe"
+A_EDIT2 = "00000000fffffffc"
+B = "ffffffff00000000"
+
+def test_adjacent_kept_frames_are_not_skipped():
+    # Silent video: the static filter kept every frame, dHash barely moves
+    predictor = FrameDuplicatePredictor()
+    frames = [A, A_EDIT, A_EDIT2, A_EDIT, A, A_EDIT2]
+    assert [predictor.is_duplicate(h, None) for h in frames] == [False] * len(frames)
+    assert predictor.skipped == 0
+
+def test_screen_return_with_same_narration_is_skipped():
+    predictor = FrameDuplicatePredictor()
+    narration = "Open the settings menu"
+    assert not predictor.is_duplicate(A, narration)
+    assert not predictor.is_duplicate(B, narration)  # dropdown opened
+    assert predictor.is_duplicate(A, "open the  settings menu")  # closed again
+    assert predictor.skipped == 1
+
+def test_screen_return_with_new_narration_is_sent():
+    predictor = FrameDuplicatePredictor()
+    assert not predictor.is_duplicate(A, "open the menu")
+    assert not predictor.is_duplicate(B, "open the menu")
+    assert not predictor.is_duplicate(A, "now click save")
+
+def _step(title, description):
+    return {"title": title, "description": description}
+
+def test_near_duplicate_consecutive_steps_collapse():
+    steps = [
+        _step("Click the Save button", "Click the Save button to save your changes."),
+        _step("Click the Save button", "Click on the Save button to save the changes."),
+        _step("Open the Reports tab", "Open the Reports tab from the sidebar."),
+    ]
+    assert dedup_steps(steps, threshold=0.8) == [steps[0], steps[2]]
+
+def test_distinct_steps_with_shared_boilerplate_survive():
+    # Same "Click the ... button" template, only the target differs
+    steps = [_step(f"Click the {name} button", "Click the button to continue.")
+             for name in ("Save", "Cancel", "Export", "Share", "Delete")]
+    assert dedup_steps(steps, threshold=0.8) == steps
+
+def test_window_bounds_how_far_back_duplicates_are_matched():
+    first = _step("Click the Save button", "Click the Save button to save your changes.")
+    middle = [_step(f"Open the {name} tab", f"Open the {name} tab from the sidebar.")
+              for name in ("Reports", "Billing", "Users", "Projects", "Alerts")]
+    repeat = _step("Click the Save button", "Click on the Save button to save the changes.")
+    steps = [first, *middle, repeat]
+    # window=5: 'first' slid out of the last 5 kept steps -> the repeat is a new step
+    assert dedup_steps(steps, threshold=0.8, window=5) == steps
+    assert dedup_steps(steps, threshold=0.8, window=6) == [first, *middle]
@@ -0,0 +1,49 @@
+import io
+import os
+import csv
+import pytest
+from db.step_writer import StepWriter, copy_buffer, step_rows, _COPY_COLUMNS, _COPY_NULLABLE, _COPY_SQL
+
+STEPS = [
+    {"step_number": 1, "timestamp": None, "description": 'Click "Save", then close', "image_path": None},
+    {"step_number": 2, "timestamp": 4.5, "description": "Open settings", "image_path": "s3://bucket/2.png"},
+]
+
+def test_copy_csv_encodes_none_as_quoted_empty():
+    lines = copy_buffer(step_rows(7, STEPS)).getvalue().splitlines()
+    assert lines[0] == '7,1,"","Click ""Save"", then close",""'
+    assert lines[1] == '7,2,4.5,"Open settings","s3://bucket/2.png"'
+
+def test_copy_forces_null_for_every_column_that_can_be_none():
+    # Quoted "" is an empty string in CSV COPY; without FORCE_NULL a None timestamp aborts the COPY
+    # and a None image_url is stored as ''
+    row = next(csv.reader(io.StringIO(copy_buffer(step_rows(7, STEPS[:1])).getvalue())))
+    empty = {column for column, value in zip(_COPY_COLUMNS, row) if value == ""}
+    assert empty == {"timestamp", "image_url"}
+    assert empty <= set(_COPY_NULLABLE)
+    assert "description" not in _COPY_NULLABLE
+    assert f"FORCE_NULL ({', '.join(_COPY_NULLABLE)})" in _COPY_SQL
+
+@pytest.mark.skipif(not os.getenv("TEST_POSTGRES_URL"), reason="TEST_POSTGRES_URL not set (real Postgres + psycopg2)")
+def test_copy_round_trip_on_postgres():
+    pytest.importorskip("psycopg2")
+    from sqlalchemy import create_engine, select
+    from sqlalchemy.orm import Session
+    from db.session import Base
+    from models import Video, Step
+
+    engine = create_engine(os.environ["TEST_POSTGRES_URL"])
+    Base.metadata.create_all(engine)
+    with Session(engine) as db:
+        video = Video(video_url="test://copy", status="processing")
+        db.add(video)
+        db.flush()
+        try:
+            writer = StepWriter(db, video.id, method="copy")
+            writer.add(STEPS)
+            writer.flush()
+            rows = db.execute(select(Step.timestamp, Step.description, Step.image_url)
+                              .where(Step.video_id == video.id).order_by(Step.step_number)).all()
+            assert rows == [(None, 'Click "Save", then close', None), (4.5, "Open settings", "s3://bucket/2.png")]
+        finally:
+            db.rollback()
@@ -0,0 +1,48 @@
+from celery.signals import worker_init, worker_process_init, worker_process_shutdown, worker_shutdown
+import os
+import threading
+from core.async_runtime import runtime
+from core.config import settings
+from core.celery_app import celery_app
+from services.whisper_manager import whisper_manager, memory_usage
+
+# --- WORKER LIFECYCLE HOOKS ---
+# worker_process_init runs in every pool child (after fork), so each process
+# gets its own persistent event loop + HTTP pool, shared by all of its tasks.
+
+def transcribes(app) -> bool:
+    """
+    True if this worker consumes a queue that runs Whisper: the CPU stage queue, or the
+    default queue (inline pipeline + chunk tasks). A '-Q io' worker never transcribes,
+    so it must not spawn a Whisper server or preload a model.
+    (-Q is applied to app.amqp.queues before worker_init fires.)
+    """
+    consumed = set(app.amqp.queues.consume_from)
+    return bool(consumed & {settings.CELERY_CPU_QUEUE, app.conf.task_default_queue})
+
+@worker_init.connect
+def start_model_server(sender=None, **kwargs):
+    # Main worker process, before the pool forks. The model itself is never loaded
+    # here (CTranslate2 threads don't survive fork) - server mode spawns it instead.
+    if settings.WHISPER_MODE == "server" and transcribes(sender.app):
+        whisper_manager.start_server()
+    print(f"🧠 Worker parent {os.getpid()} memory: {memory_usage()}")
+
+@worker_process_init.connect
+def start_async_runtime(**kwargs):
+    runtime.start()
+    if settings.WHISPER_MODE == "local" and settings.WHISPER_PRELOAD and transcribes(celery_app):
+        # Background thread: Celery kills children whose init takes > 4s.
+        # A task that needs the model before it is ready just waits on the manager's lock.
+        threading.Thread(target=whisper_manager.get_model, name="whisper-preload", daemon=True).start()
+    print(f"🧠 Worker child {os.getpid()} memory: {memory_usage()}")
+
+@worker_process_shutdown.connect
+def stop_async_runtime(**kwargs):
+    runtime.stop()
+
+@worker_shutdown.connect
+def stop_async_runtime_main(**kwargs):
+    # solo / threads pools run tasks in the main process
+    runtime.stop()
+    whisper_manager.stop_server()
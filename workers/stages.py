@@ -0,0 +1,159 @@
+import os
+import json
+import time
+import shutil
+import logging
+from celery import chain
+from core.celery_app import celery_app
+from db.session import SessionLocal
+from models.video import Video
+from db.step_writer import StepWriter
+from db.video_dedup import settle_duplicates
+from services.processing import extract_media, audio_filename
+from services.audio_service import TranscriptStream
+from services.openrouter_service import generate_documentation_steps
+from services.checkpoint import VideoCheckpoint
+
+# ======================================================
+# 🔥 STAGED PIPELINE (Celery canvas, CPU + I/O queues) 🔥
+# ======================================================
+# extract (cpu) -> transcribe (cpu) -> generate (io) -> persist (io)
+# CPU stages (ffmpeg, NumPy filter, Whisper) prefork pool par, network stages
+# (vision API, DB) high-concurrency threads pool par. Har pool alag size hota hai:
+#   celery -A core.celery_app worker -Q cpu -P prefork -c <cores>
+#   celery -A core.celery_app worker -Q io  -P threads -c 64
+# Stages ke beech sirf ek chhota JSON context jata hai; audio/frames/transcript/steps
+# temp_data mein files hain (by reference). Workers ko shared storage chahiye.
+# Har stage manifest.json (services/checkpoint.py) dekhta hai: complete stage skip hota hai.
+
+logger = logging.getLogger(__name__)
+
+def _write_json(path: str, data):
+    with open(path, "w") as f:
+        json.dump(data, f, indent=4)
+
+def _read_json(path: str):
+    with open(path) as f:
+        return json.load(f)
+
+def build_stage_chain(video_id: int, video_path: str, refresh_transcript: bool = False):
+    base_dir = f"temp_data/{video_id}"
+    context = {
+        "video_id": video_id,
+        "base_dir": base_dir,
+        "video_path": video_path,
+        "refresh_transcript": refresh_transcript,
+        "audio_path": os.path.join(base_dir, audio_filename()),
+        "frames_dir": os.path.join(base_dir, "frames"),
+        "transcript_path": os.path.join(base_dir, "transcript.json"),
+        "steps_path": os.path.join(base_dir, "documentation.json"),
+    }
+    return chain(
+        extract_stage_task.s(context),
+        transcribe_stage_task.s(),
+        generate_stage_task.s(),
+        persist_stage_task.s(),
+    ).on_error(mark_video_failed_task.s(video_id))
+
+# --- CPU STAGES (queue: CELERY_CPU_QUEUE, routed in core/celery_app.py) ---
+@celery_app.task(bind=True)
+def extract_stage_task(self, context: dict):
+    os.makedirs(context["base_dir"], exist_ok=True)
+    checkpoint = VideoCheckpoint(context["base_dir"])
+    if checkpoint.is_complete("extract"):
+        logger.info(f"📌 [Video {context['video_id']}] Stage 1 already done, reusing audio + frames.")
+        context["audio_path"] = checkpoint.artifact("extract", "audio")
+        return context
+
+    logger.info(f"⚙️ [Video {context['video_id']}] Stage 1: extracting frames & audio...")
+    stage_start = time.perf_counter()
+
+    shutil.rmtree(context["frames_dir"], ignore_errors=True)  # half-written frames of a failed run
+    media = extract_media(context["video_path"], context["audio_path"], context["frames_dir"], interval=1)
+    context["audio_path"] = media["audio"]["path"]  # None = silent video
+    checkpoint.complete("extract", audio=context["audio_path"], frames=context["frames_dir"])
+
+    logger.info(f"⏱️ Extraction stage: {time.perf_counter() - stage_start:.2f}s ({media['frames']['count']} keyframes)")
+    return context
+
+@celery_app.task(bind=True)
+def transcribe_stage_task(self, context: dict):
+    checkpoint = VideoCheckpoint(context["base_dir"])
+    if checkpoint.is_complete("transcribe"):
+        logger.info(f"📌 [Video {context['video_id']}] Stage 2 already done, reusing transcript.")
+        return context
+
+    transcript = []
+    complete = True  # silent video = nothing to transcribe
+    stage_start = time.perf_counter()
+    if context["audio_path"]:
+        logger.info(f"🔊 [Video {context['video_id']}] Stage 2: transcribing...")
+        stream = TranscriptStream(context["audio_path"], refresh=context["refresh_transcript"])
+        transcript = list(stream)
+        complete = stream.complete
+    else:
+        logger.warning("🔇 No Audio Track Found (Silent Video).")
+
+    _write_json(context["transcript_path"], transcript)
+    if complete:
+        checkpoint.complete("transcribe", transcript=context["transcript_path"])
+    else:
+        # Generation still runs on what we have; a resume transcribes again
+        logger.warning(f"📌 [Video {context['video_id']}] Transcription incomplete, 'transcribe' not checkpointed.")
+    logger.info(f"⏱️ Transcription stage: {time.perf_counter() - stage_start:.2f}s ({len(transcript)} segments)")
+    return context
+
+# --- I/O STAGES (queue: CELERY_IO_QUEUE) ---
+@celery_app.task(bind=True)
+def generate_stage_task(self, context: dict):
+    checkpoint = VideoCheckpoint(context["base_dir"])
+    if checkpoint.is_complete("generate"):
+        logger.info(f"📌 [Video {context['video_id']}] Stage 3 already done, reusing steps.")
+        return context
+
+    logger.info(f"🤖 [Video {context['video_id']}] Stage 3: generating documentation...")
+    stage_start = time.perf_counter()
+
+    transcript = _read_json(context["transcript_path"])
+    final_steps = generate_documentation_steps(transcript, context["frames_dir"], interval=1, checkpoint=checkpoint)
+    _write_json(context["steps_path"], final_steps)
+    failed = checkpoint.failed_frames()
+    if failed:
+        # Steps are still saved; 'generate' stays open so a resume re-requests only these frames
+        logger.warning(f"📌 {len(failed)} frames failed: {failed[:10]}")
+    elif checkpoint.is_complete("transcribe"):
+        # Steps built on a partial transcript are not final either
+        checkpoint.complete("generate", steps=context["steps_path"])
+
+    logger.info(f"⏱️ Generation stage: {time.perf_counter() - stage_start:.2f}s ({len(final_steps)} steps)")
+    return context
+
+@celery_app.task(bind=True)
+def persist_stage_task(self, context: dict):
+    final_steps = _read_json(context["steps_path"])
+    db = SessionLocal()
+    try:
+        logger.info(f"💾 Saving {len(final_steps)} steps to Database...")
+        writer = StepWriter(db, context["video_id"], replace=True)
+        writer.add(final_steps)
+        writer.finish("completed")
+        VideoCheckpoint(context["base_dir"]).complete("persist")
+        logger.info(f"✅ Staged pipeline for Video {context['video_id']} Finished Successfully!")
+        return "Done"
+    except Exception:
+        db.rollback()
+        raise
+    finally:
+        db.close()
+
+@celery_app.task
+def mark_video_failed_task(request, exc, traceback, video_id: int):
+    # Errback for chains/chords: any failed stage or chunk fails the whole video
+    logger.error(f"❌ Processing failed for Video {video_id}: {exc}")
+    db = SessionLocal()
+    try:
+        db.query(Video).filter(Video.id == video_id).update({"status": "failed"})
+        settle_duplicates(db, video_id, "failed")
+        db.commit()
+    finally:
+        db.close()
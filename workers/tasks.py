@@ -1,24 +1,36 @@
 import os
 import json
+import time
+import shutil
 import logging
-from core.celery_app import celery_app
+from celery import chord
+from core.celery_app import celery_app, PROCESS_VIDEO_TASK
 from db.session import SessionLocal
 from models.video import Video
-from models.step import Step
-from services.processing import extract_audio, extract_frames
-from services.audio_service import transcribe_audio_local
-from services.openrouter_service import generate_documentation_steps
+from db.step_writer import StepWriter
+from db.video_dedup import settle_duplicates
+from services.processing import extract_media, audio_filename, probe_duration
+from core.config import settings
+from services.audio_service import TranscriptStream
+from services.openrouter_service import generate_documentation_steps, generate_documentation_steps_pipelined, finalize_step_list
+from services.chunking import plan_chunks, to_global_time, merge_chunk_results
+from services.checkpoint import open_checkpoint
+from workers.stages import build_stage_chain, mark_video_failed_task
 
 # --- LOGGER SETUP ---
 logger = logging.getLogger(__name__)
 
-@celery_app.task(bind=True)
-def process_video_task(self, video_id: int, video_path: str):
-    logger.info(f"🚀 Worker Started: Processing Video ID {video_id}")
-    
+@celery_app.task(bind=True, name=PROCESS_VIDEO_TASK)
+def process_video_task(self, video_id: int, video_path: str, refresh_transcript: bool = False, resume_from: str = None):
+    """
+    Completed stages (temp_data/<id>/manifest.json) are skipped on a retry.
+    resume_from: re-run this stage and all later ones (see services/checkpoint.STAGES).
+    """
+    logger.info(f"🚀 Worker Started: Processing Video ID {video_id}" + (f" (resume from '{resume_from}')" if resume_from else ""))
+
     db = SessionLocal()
     video = db.query(Video).filter(Video.id == video_id).first()
-    
+
     if not video:
         logger.error(f"Video ID {video_id} not found in Database")
         return "Failed"
@@ -27,59 +39,184 @@ def process_video_task(self, video_id: int, video_path: str):
     db.commit()
 
     base_dir = f"temp_data/{video_id}"
-    
+
     try:
         os.makedirs(base_dir, exist_ok=True)
-        audio_path = os.path.join(base_dir, "audio.mp3")
-        frames_dir = os.path.join(base_dir, "frames")
 
-        # 1. Splitting
-        logger.info("⚙️ Splitting Video into Frames & Audio...")
-        extracted_audio_path = extract_audio(video_path, audio_path)
-        extract_frames(video_path, frames_dir, interval=1) # Extracting every 1s (Smart filter will clean it)
+        # Long video -> chunks on many workers (merge task saves the steps + status)
+        if settings.CHUNKED_PROCESSING_ENABLED:
+            duration = probe_duration(video_path)
+            if duration >= settings.CHUNK_MIN_VIDEO_SECONDS:
+                return _dispatch_chunks(video_id, video_path, duration, refresh_transcript, resume_from)
 
-        # 2. Transcription
-        transcript = []
-        if extracted_audio_path:
-            logger.info("🔊 Transcribing locally with Faster-Whisper...")
-            transcript = transcribe_audio_local(extracted_audio_path)
-        else:
-            logger.warning("🔇 No Audio Track Found (Silent Video).")
+        checkpoint = open_checkpoint(base_dir, resume_from, refresh_transcript)
 
-        # 3. AI Generation
-        logger.info("🤖 Generating Documentation via OpenRouter (Parallel Mode)...")
-        final_steps = generate_documentation_steps(transcript, frames_dir, interval=1)
+        # Stage tasks on separate CPU / I/O queues (artifacts passed as file paths)
+        if settings.STAGED_PIPELINE_ENABLED:
+            build_stage_chain(video_id, video_path, refresh_transcript).apply_async()
+            logger.info(f"🧱 Video {video_id} dispatched as staged pipeline")
+            return "Dispatched stages"
 
-        # 4. Save Debug JSON
-        json_path = os.path.join(base_dir, "documentation.json")
-        with open(json_path, "w") as f:
-            json.dump(final_steps, f, indent=4)
-        logger.info(f"📂 Debug JSON Saved: {json_path}")
+        final_steps, _ = _extract_and_generate(base_dir, video_path, checkpoint, refresh_transcript)
 
-        # 5. Save to DB
+        # 5. Save to DB (bulk insert + final status in one transaction; replaces steps of an earlier run)
         logger.info(f"💾 Saving {len(final_steps)} steps to Database...")
-        for step_data in final_steps:
-            new_step = Step(
-                video_id=video_id,
-                step_number=step_data['step_number'],
-                timestamp=step_data['timestamp'],
-                description=step_data['description'],
-                image_url=step_data['image_path']
-            )
-            db.add(new_step)
-        
-        video.status = "completed"
-        db.commit()
-        
+        writer = StepWriter(db, video_id, replace=True)
+        writer.add(final_steps)
+        writer.finish("completed")
+        checkpoint.complete("persist")
+
         logger.info(f"✅ Task for Video {video_id} Finished Successfully!")
         return "Done"
 
     except Exception as e:
         # exc_info=True saves complete error trace in log file
         logger.error(f"❌ Worker Failed for Video {video_id}: {e}", exc_info=True)
-        
+
+        db.rollback()  # drop a half-written step batch, if any
         video.status = "failed"
+        settle_duplicates(db, video_id, "failed")
         db.commit()
         return f"Error: {e}"
     finally:
-        db.close()
\ No newline at end of file
+        db.close()
+
+def _extract_and_generate(base_dir: str, video_path: str, checkpoint, refresh_transcript: bool = False,
+                          start: float = 0.0, duration: float = None):
+    """
+    Stages 1-3 for the whole video, or for one slice of it (chunked mode).
+    Stages already in the checkpoint are skipped, their artifacts reused.
+    Returns (final_steps, transcript) with timestamps relative to 'start'.
+    """
+    audio_path = os.path.join(base_dir, audio_filename())  # audio.f32 (raw PCM) or audio.mp3
+    frames_dir = os.path.join(base_dir, "frames")
+    frames = frames_dir  # reused extraction -> its frames.json manifest
+    transcript_path = os.path.join(base_dir, "transcript.json")
+    steps_path = os.path.join(base_dir, "documentation.json")
+
+    # 1. Splitting
+    stage_start = time.perf_counter()
+    if checkpoint.is_complete("extract"):
+        extracted_audio_path = checkpoint.artifact("extract", "audio")
+        logger.info("📌 Checkpoint: extraction already done, reusing audio + frames.")
+    else:
+        logger.info("⚙️ Splitting Video into Frames & Audio (single pass)...")
+        shutil.rmtree(frames_dir, ignore_errors=True)  # half-written frames of a failed run
+        media = extract_media(video_path, audio_path, frames_dir, interval=1, start=start, duration=duration) # Extracting every 1s (Smart filter will clean it)
+        extracted_audio_path = media["audio"]["path"]
+        frames = media["frames"]["manifest"]
+        if media["frames"]["error"]:
+            logger.warning(f"🖼️ Frames: {media['frames']['error']}")
+        else:
+            logger.info(f"🖼️ Frames: {media['frames']['count']} keyframes ready")
+        checkpoint.complete("extract", audio=extracted_audio_path, frames=frames_dir)
+    logger.info(f"⏱️ Extraction stage: {time.perf_counter() - stage_start:.2f}s")
+    stage_start = time.perf_counter()
+
+    # 2 + 3. Transcription & AI Generation
+    if checkpoint.is_complete("generate"):
+        logger.info("📌 Checkpoint: transcription + generation already done.")
+        return _read_json(steps_path), _read_json(transcript_path)
+
+    if checkpoint.is_complete("transcribe"):
+        logger.info("📌 Checkpoint: transcript already done. Generating via OpenRouter (Parallel Mode)...")
+        transcript = _read_json(transcript_path)
+        final_steps = generate_documentation_steps(transcript, frames, interval=1, checkpoint=checkpoint)
+    elif extracted_audio_path and settings.PIPELINED_GENERATION:
+        # Frames go to the LLM as soon as Whisper has covered their audio window
+        logger.info("🔊🤖 Transcribing with Faster-Whisper + Generating via OpenRouter (Pipelined Mode)...")
+        stream = TranscriptStream(extracted_audio_path, refresh=refresh_transcript)
+        final_steps, transcript = generate_documentation_steps_pipelined(stream, frames, interval=1, checkpoint=checkpoint)
+        logger.info(f"🔊 Transcript: {len(transcript)} segments")
+        _complete_transcribe(checkpoint, transcript_path, transcript, stream.complete)
+    else:
+        transcript = []
+        transcript_done = True  # silent video = nothing to transcribe
+        if extracted_audio_path:
+            logger.info("🔊 Transcribing locally with Faster-Whisper...")
+            stream = TranscriptStream(extracted_audio_path, refresh=refresh_transcript)
+            transcript = list(stream)
+            transcript_done = stream.complete
+        else:
+            logger.warning("🔇 No Audio Track Found (Silent Video).")
+        _complete_transcribe(checkpoint, transcript_path, transcript, transcript_done)
+
+        logger.info("🤖 Generating Documentation via OpenRouter (Parallel Mode)...")
+        final_steps = generate_documentation_steps(transcript, frames, interval=1, checkpoint=checkpoint)
+
+    # 4. Save Debug JSON (also the 'generate' artifact)
+    _save_debug_json(base_dir, final_steps)
+    failed = checkpoint.failed_frames()
+    if failed:
+        # Steps are still saved; 'generate' stays open so a resume re-requests only these frames
+        logger.warning(f"📌 {len(failed)} frames failed: {failed[:10]}")
+    elif checkpoint.is_complete("transcribe"):
+        checkpoint.complete("generate", steps=steps_path)
+
+    logger.info(f"⏱️ Transcription + generation stage: {time.perf_counter() - stage_start:.2f}s")
+    return final_steps, transcript
+
+def _complete_transcribe(checkpoint, transcript_path: str, transcript: list, complete: bool = True):
+    with open(transcript_path, "w") as f:
+        json.dump(transcript, f, indent=4)
+    if complete:
+        checkpoint.complete("transcribe", transcript=transcript_path)
+    else:
+        # Failed/partial Whisper run: steps still get generated, but 'transcribe' (and so
+        # 'generate') stay open and a resume transcribes again
+        logger.warning(f"📌 Transcription incomplete ({len(transcript)} segments), not checkpointed.")
+
+def _read_json(path: str):
+    with open(path) as f:
+        return json.load(f)
+
+def _save_debug_json(base_dir: str, final_steps: list):
+    json_path = os.path.join(base_dir, "documentation.json")
+    with open(json_path, "w") as f:
+        json.dump(final_steps, f, indent=4)
+    logger.info(f"📂 Debug JSON Saved: {json_path}")
+
+# ======================================================
+# 🔥 CHUNKED MODE: group of chunk tasks -> merge callback (chord) 🔥
+# ======================================================
+def _dispatch_chunks(video_id: int, video_path: str, duration: float, refresh_transcript: bool, resume_from: str = None):
+    chunks = plan_chunks(duration, settings.CHUNK_SECONDS, settings.CHUNK_OVERLAP_SECONDS)
+    logger.info(f"🧩 Video {video_id} ({duration:.0f}s) split into {len(chunks)} chunks of {settings.CHUNK_SECONDS:.0f}s")
+
+    # Each chunk has its own manifest (temp_data/<id>/chunk_NNN), so a retry skips finished chunks' stages
+    header = [process_video_chunk_task.s(video_id, video_path, chunk, refresh_transcript, resume_from) for chunk in chunks]
+    callback = merge_video_chunks_task.s(video_id).on_error(mark_video_failed_task.s(video_id))
+    chord(header)(callback)
+    return f"Dispatched {len(chunks)} chunks"
+
+@celery_app.task(bind=True)
+def process_video_chunk_task(self, video_id: int, video_path: str, chunk: dict, refresh_transcript: bool = False,
+                             resume_from: str = None):
+    logger.info(f"🧩 Chunk {chunk['index']} of Video {video_id}: {chunk['start']:.0f}s - {chunk['end']:.0f}s")
+    base_dir = f"temp_data/{video_id}/chunk_{chunk['index']:03d}"
+    os.makedirs(base_dir, exist_ok=True)
+
+    steps, _ = _extract_and_generate(
+        base_dir, video_path, open_checkpoint(base_dir, resume_from, refresh_transcript), refresh_transcript,
+        start=chunk["extract_start"], duration=chunk["extract_duration"],
+    )
+    return {"index": chunk["index"], "steps": to_global_time(steps, chunk)}
+
+@celery_app.task(bind=True)
+def merge_video_chunks_task(self, chunk_results: list, video_id: int):
+    final_steps = merge_chunk_results(chunk_results, finalize_step_list)
+    _save_debug_json(f"temp_data/{video_id}", final_steps)
+
+    db = SessionLocal()
+    try:
+        logger.info(f"💾 Saving {len(final_steps)} steps to Database...")
+        writer = StepWriter(db, video_id, replace=True)
+        writer.add(final_steps)
+        writer.finish("completed")
+        logger.info(f"✅ Chunked Task for Video {video_id} Finished Successfully!")
+        return "Done"
+    except Exception:
+        db.rollback()
+        raise
+    finally:
+        db.close()